@@ -0,0 +1,193 @@
+"""
+Ranking por lotes: muchas descripciones de puesto en una sola llamada.
+
+A diferencia de buscar_cvs (un puesto por llamada, con su conexión, su carga
+del índice y su embedding), aquí el índice se carga una vez, todas las
+descripciones se embeben en una sola pasada del modelo y FAISS las busca con
+una única llamada multi-consulta (una por cada combinación distinta de
+filtros). El rerank opcional se ejecuta con concurrencia limitada y cada
+resultado se escribe en cuanto termina.
+
+Entrada (JSONL, un puesto por línea):
+    {"id": "p1", "descripcion": "Desarrollador Python...", "ubicacion": "Madrid",
+     "idioma": "Inglés", "nivel_idioma": "Avanzado", "anios_min": 3, "nivel_educativo": "Máster"}
+Solo "descripcion" es obligatoria; sin "id" se usa el número de línea.
+
+Salida (JSONL, en orden de finalización):
+    {"id": "p1", "descripcion": "...", "candidatos": [...], "segundos": 1.2}
+
+Uso:
+    python batch_ranking.py puestos.jsonl [-o ranking.jsonl] [--modo rag|llm|paralelo|cross]
+                            [--top-k 40] [--concurrencia 4] [--peso-lexico 0.4]
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+import numpy as np
+from config import (
+    MODO_SOLO_RAG, MODO_RAG_LLM, MODO_RAG_LLM_PARALELO, MODO_CROSS_ENCODER,
+    HYBRID_LEXICAL_WEIGHT, RERANK_CONCURRENCY
+)
+from vector_index import VectorIndexManager, buscar_lote
+from lexical_search import buscar_bm25
+from structured_filters import construir_filtros, ids_permitidos, clave_filtros
+from query_cache import QUERY_VECTOR_CACHE, normalizar_consulta
+from llm_client import ejecutar
+from utils import (
+    cargar_indice, formatear_documento, fusionar_candidatos,
+    rerank, rerank_paralelo, rerank_cross_encoder
+)
+
+MODOS = {
+    "rag": MODO_SOLO_RAG,
+    "llm": MODO_RAG_LLM,
+    "paralelo": MODO_RAG_LLM_PARALELO,
+    "cross": MODO_CROSS_ENCODER,
+}
+
+def leer_puestos(lineas):
+    """Convierte las líneas JSONL en [{"id", "descripcion", "filtros"}]; las no válidas se avisan y se saltan."""
+    puestos = []
+    for numero, linea in enumerate(lineas, start=1):
+        if not linea.strip():
+            continue
+        try:
+            datos = json.loads(linea)
+        except json.JSONDecodeError as e:
+            print(f"⚠️ Línea {numero} ignorada: JSON no válido ({e})")
+            continue
+        descripcion = (datos.get("descripcion") or datos.get("descripcion_puesto") or "").strip()
+        if not descripcion:
+            print(f"⚠️ Línea {numero} ignorada: falta 'descripcion'")
+            continue
+        filtros = construir_filtros(
+            datos.get("ubicacion"), datos.get("idioma"), datos.get("nivel_idioma"),
+            datos.get("anios_min"), datos.get("nivel_educativo")
+        )
+        puestos.append({"id": str(datos.get("id", numero)), "descripcion": descripcion, "filtros": filtros})
+    return puestos
+
+def embeber_consultas(indice, textos):
+    """Vectores de todas las consultas en una sola llamada al modelo (reutiliza el caché de vectores)."""
+    modelo = getattr(indice.embedding_function, "model_name", "")
+    claves = [(modelo, normalizar_consulta(t)) for t in textos]
+    vectores = [QUERY_VECTOR_CACHE.get(clave) for clave in claves]
+    faltan = [i for i, v in enumerate(vectores) if v is None]
+    if faltan:
+        # Las consultas no pasan por el caché persistente de embeddings de los CVs
+        base = getattr(indice.embedding_function, "base", indice.embedding_function)
+        nuevos = base.embed_documents([textos[i] for i in faltan])
+        for i, vector in zip(faltan, nuevos):
+            vectores[i] = vector
+            QUERY_VECTOR_CACHE.set(claves[i], vector)
+    return np.ascontiguousarray(np.asarray(vectores, dtype="float32"))
+
+def buscar_vectorial(indice, matriz, puestos, top_k):
+    """Una búsqueda multi-consulta por cada combinación distinta de filtros."""
+    grupos = {}
+    for i, puesto in enumerate(puestos):
+        grupos.setdefault(clave_filtros(puesto["filtros"]), []).append(i)
+
+    manager = VectorIndexManager.get_instance()
+    candidatos = [None] * len(puestos)
+    for filas in grupos.values():
+        filtros = puestos[filas[0]]["filtros"]
+        permitidos = ids_permitidos(filtros)
+        posiciones = manager.posiciones(permitidos, indice) if permitidos is not None else None
+        for i, resultados in zip(filas, buscar_lote(indice, matriz[filas], top_k, posiciones)):
+            candidatos[i] = [formatear_documento(doc, dist) for doc, dist in resultados]
+    return candidatos
+
+async def reordenar(candidatos, descripcion, modo):
+    if not candidatos or modo == MODO_SOLO_RAG:
+        return candidatos
+    if modo == MODO_RAG_LLM:
+        return await rerank(candidatos, descripcion)
+    if modo == MODO_RAG_LLM_PARALELO:
+        return await rerank_paralelo(candidatos, descripcion)
+    return await asyncio.to_thread(rerank_cross_encoder, candidatos, descripcion)
+
+# =============================================================================
+# Generador asíncrono: un resultado por puesto, según van terminando.
+# =============================================================================
+async def rankear_lote(puestos, modo=MODO_SOLO_RAG, top_k=40, peso_lexico=HYBRID_LEXICAL_WEIGHT,
+                       concurrencia=RERANK_CONCURRENCY):
+    if not puestos:
+        return
+    inicio = time.perf_counter()
+    indice = await asyncio.to_thread(cargar_indice)
+    if not indice:
+        for puesto in puestos:
+            yield {"id": puesto["id"], "descripcion": puesto["descripcion"],
+                   "error": "No se pudo construir/cargar el índice FAISS."}
+        return
+
+    textos = [p["descripcion"] for p in puestos]
+    matriz = await asyncio.to_thread(embeber_consultas, indice, textos)
+    busqueda_vectorial = asyncio.to_thread(buscar_vectorial, indice, matriz, puestos, top_k)
+    if peso_lexico > 0:
+        vectoriales, *lexicos = await asyncio.gather(
+            busqueda_vectorial,
+            *(asyncio.to_thread(buscar_bm25, p["descripcion"], top_k, "cv_database.db", p["filtros"])
+              for p in puestos)
+        )
+        candidatos = [
+            fusionar_candidatos(v, l, indice, peso_lexico, top_k) for v, l in zip(vectoriales, lexicos)
+        ]
+    else:
+        candidatos = await busqueda_vectorial
+    print(f"🔍 Recuperación de {len(puestos)} puestos en {time.perf_counter() - inicio:.2f}s.")
+
+    semaforo = asyncio.Semaphore(concurrencia)
+
+    async def procesar(puesto, candidatos_puesto):
+        async with semaforo:
+            inicio_puesto = time.perf_counter()
+            resultado = {"id": puesto["id"], "descripcion": puesto["descripcion"]}
+            try:
+                ranking = await reordenar(candidatos_puesto, puesto["descripcion"], modo)
+                resultado["candidatos"] = ranking
+            except Exception as e:
+                resultado["error"] = f"{type(e).__name__}: {e}"
+            resultado["segundos"] = round(time.perf_counter() - inicio_puesto, 3)
+            return resultado
+
+    tareas = [asyncio.create_task(procesar(p, c)) for p, c in zip(puestos, candidatos)]
+    for tarea in asyncio.as_completed(tareas):
+        yield await tarea
+
+async def main():
+    parser = argparse.ArgumentParser(description="Rankea muchas descripciones de puesto (JSONL) en una sola llamada.")
+    parser.add_argument("entrada", help="Archivo JSONL con un puesto por línea ('-' para la entrada estándar)")
+    parser.add_argument("-o", "--salida", default="ranking.jsonl", help="Archivo JSONL de resultados")
+    parser.add_argument("--modo", choices=list(MODOS), default="rag")
+    parser.add_argument("--top-k", type=int, default=40)
+    parser.add_argument("--concurrencia", type=int, default=RERANK_CONCURRENCY, help="Reranks simultáneos")
+    parser.add_argument("--peso-lexico", type=float, default=HYBRID_LEXICAL_WEIGHT)
+    args = parser.parse_args()
+
+    if args.entrada == "-":
+        puestos = leer_puestos(sys.stdin)
+    else:
+        with open(args.entrada, "r", encoding="utf-8") as f:
+            puestos = leer_puestos(f)
+    if not puestos:
+        print("⚠️ No hay puestos que procesar.")
+        return
+
+    inicio = time.perf_counter()
+    errores = 0
+    with open(args.salida, "w", encoding="utf-8") as f:
+        async for resultado in rankear_lote(puestos, MODOS[args.modo], args.top_k,
+                                            args.peso_lexico, args.concurrencia):
+            errores += "error" in resultado
+            f.write(json.dumps(resultado, ensure_ascii=False) + "\n")
+            f.flush()
+    segundos = time.perf_counter() - inicio
+    print(f"✅ {len(puestos)} puestos en {segundos:.1f}s ({len(puestos) / segundos:.2f} puestos/s), "
+          f"{errores} con error → {args.salida}")
+
+if __name__ == "__main__":
+    ejecutar(main())
@@ -0,0 +1,94 @@
+"""
+Benchmark de los tipos de índice FAISS (Flat, HNSW, IVFFlat, IVFPQ).
+
+Sobre corpus sintéticos agrupados (parecidos a embeddings reales, que no se
+reparten de forma uniforme) construye cada tipo de índice con las mismas
+funciones que vector_index y, para cada valor de nprobe / efSearch, informa:
+
+- tiempo de construcción (incluido el entrenamiento de los IVF),
+- recall@k frente a la búsqueda exacta de Flat,
+- latencia p50/p99 de consultas individuales,
+- memoria del índice (tamaño serializado).
+
+Uso:
+    python bench_ann.py --sizes 100000 1000000 [--dim 512] [--k 10]
+                        [--tipos Flat HNSW IVFFlat IVFPQ]
+                        [--nprobe 4 16 64] [--ef-search 32 64 128]
+"""
+import argparse
+import time
+import faiss
+import numpy as np
+from vector_index import TIPOS_INDICE, crear_index_faiss, ajustar_busqueda, extraer_ivf, extraer_hnsw
+
+def generar_corpus(n, dim, consultas, grupos=256, semilla=42):
+    """Vectores alrededor de 'grupos' centros; las consultas son perturbaciones de vectores del corpus."""
+    rng = np.random.default_rng(semilla)
+    centros = rng.normal(size=(grupos, dim)).astype("float32")
+    datos = centros[rng.integers(0, grupos, n)] + 0.5 * rng.normal(size=(n, dim)).astype("float32")
+    origen = datos[rng.integers(0, n, consultas)]
+    preguntas = origen + 0.1 * rng.normal(size=origen.shape).astype("float32")
+    return np.ascontiguousarray(datos, dtype="float32"), np.ascontiguousarray(preguntas, dtype="float32")
+
+def recall(encontrados, exactos, k):
+    aciertos = sum(len(set(f[:k]) & set(e[:k])) for f, e in zip(encontrados, exactos))
+    return aciertos / (len(exactos) * k)
+
+def latencias(index, preguntas, k, maximo):
+    tiempos = []
+    for vector in preguntas[:maximo]:
+        inicio = time.perf_counter()
+        index.search(vector.reshape(1, -1), k)
+        tiempos.append(time.perf_counter() - inicio)
+    return np.percentile(tiempos, 50) * 1000, np.percentile(tiempos, 99) * 1000
+
+def variantes(index, args):
+    """Valores de búsqueda a barrer según el tipo de índice: [(etiqueta, parámetros)]."""
+    if extraer_ivf(index) is not None:
+        return [(f"nprobe={p}", {"nprobe": p}) for p in args.nprobe]
+    if extraer_hnsw(index) is not None:
+        return [(f"efSearch={ef}", {"ef_search": ef}) for ef in args.ef_search]
+    return [("exacto", {})]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de recall, latencia y memoria de los índices FAISS.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100000])
+    parser.add_argument("--dim", type=int, default=512, help="Dimensión (512 = distiluse-base-multilingual)")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--consultas", type=int, default=1000, help="Consultas para medir el recall")
+    parser.add_argument("--latencia", type=int, default=500, help="Consultas individuales para p50/p99")
+    parser.add_argument("--tipos", nargs="+", default=list(TIPOS_INDICE), choices=TIPOS_INDICE)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 16, 64])
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[32, 64, 128])
+    parser.add_argument("--hilos", type=int, default=0, help="Hilos de FAISS (0 = por defecto)")
+    args = parser.parse_args()
+
+    if args.hilos:
+        faiss.omp_set_num_threads(args.hilos)
+
+    for n in args.sizes:
+        print(f"\n📦 Corpus sintético: {n} vectores de dimensión {args.dim}")
+        datos, preguntas = generar_corpus(n, args.dim, args.consultas)
+        exacto = faiss.IndexFlatL2(args.dim)
+        exacto.add(datos)
+        _, verdad = exacto.search(preguntas, args.k)
+        del exacto
+
+        print(f"{'tipo':<8} {'factory':<18} {'búsqueda':<13} {'build (s)':>10} "
+              f"{f'recall@{args.k}':>10} {'p50 (ms)':>9} {'p99 (ms)':>9} {'RAM (MB)':>9}")
+        for tipo in args.tipos:
+            inicio = time.perf_counter()
+            index, descriptor = crear_index_faiss(datos, tipo)
+            construccion = time.perf_counter() - inicio
+            memoria = faiss.serialize_index(index).nbytes / 1024 ** 2
+
+            for etiqueta, parametros in variantes(index, args):
+                ajustar_busqueda(index, **parametros)
+                _, encontrados = index.search(preguntas, args.k)
+                p50, p99 = latencias(index, preguntas, args.k, args.latencia)
+                print(f"{tipo:<8} {descriptor:<18} {etiqueta:<13} {construccion:>10.1f} "
+                      f"{recall(encontrados, verdad, args.k):>10.3f} {p50:>9.2f} {p99:>9.2f} {memoria:>9.1f}")
+            del index
+
+if __name__ == "__main__":
+    main()
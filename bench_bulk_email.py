@@ -0,0 +1,80 @@
+"""
+Benchmark del envío masivo de correos contra el servidor SMTP local
+(smtp_stub.py), con una latencia simulada por respuesta y por conexión.
+
+Compara:
+- secuencial: una conexión nueva por correo y uno detrás de otro (lo que
+  hacía send_email_now en un bucle),
+- por_correo: una conexión nueva por correo, con la misma concurrencia,
+- pool: send_bulk_emails con SMTPPool (conexiones reutilizadas).
+
+Uso:
+    python bench_bulk_email.py [-n 500] [--pool 5] [--latencia 0.01]
+                               [--latencia-conexion 0.2] [--tasa 0] [--sin-secuencial]
+"""
+import argparse
+import asyncio
+import time
+import aiosmtplib
+from smtp_stub import SMTPStub
+from bulk_email import SMTPPool, construir_mensaje, send_bulk_emails
+
+REMITENTE = "rrhh@example.com"
+
+def candidatos(n):
+    return [{"ID": str(i), "Nombre": f"Candidato {i}", "Correo": f"candidato{i}@example.com"} for i in range(n)]
+
+async def enviar_secuencial(stub, lista):
+    for c in lista:
+        mensaje = construir_mensaje(REMITENTE, c["Correo"], "Entrevista", f"Hola {c['Nombre']}")
+        await aiosmtplib.send(mensaje, hostname=stub.host, port=stub.port, start_tls=False)
+
+async def enviar_por_correo(stub, lista, concurrencia):
+    semaforo = asyncio.Semaphore(concurrencia)
+
+    async def enviar(c):
+        async with semaforo:
+            mensaje = construir_mensaje(REMITENTE, c["Correo"], "Entrevista", f"Hola {c['Nombre']}")
+            await aiosmtplib.send(mensaje, hostname=stub.host, port=stub.port, start_tls=False)
+
+    await asyncio.gather(*(enviar(c) for c in lista))
+
+async def enviar_pool(stub, lista, tamano, tasa):
+    async with SMTPPool(stub.host, stub.port, start_tls=False, size=tamano) as pool:
+        resultados = await send_bulk_emails(lista, "Entrevista", "Hola {name}", pool=pool,
+                                            por_segundo=tasa, remitente=REMITENTE)
+    fallidos = sum(not r["success"] for r in resultados)
+    if fallidos:
+        print(f"⚠️ {fallidos} correos fallidos en el pool")
+
+async def medir(nombre, stub, corrutina, n):
+    recibidos, conexiones = len(stub.mensajes), stub.conexiones
+    inicio = time.perf_counter()
+    await corrutina
+    segundos = time.perf_counter() - inicio
+    print(f"{nombre:<12} {segundos:>8.2f}s {n / segundos:>10.1f} msg/s "
+          f"{len(stub.mensajes) - recibidos:>9} {stub.conexiones - conexiones:>11}")
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark del envío masivo de correos con y sin pool SMTP.")
+    parser.add_argument("-n", type=int, default=500, help="Número de correos")
+    parser.add_argument("--pool", type=int, default=5, help="Conexiones del pool (y concurrencia de por_correo)")
+    parser.add_argument("--latencia", type=float, default=0.01, help="Segundos por respuesta del servidor")
+    parser.add_argument("--latencia-conexion", type=float, default=0.2,
+                        help="Segundos por conexión nueva (TLS + login en un servidor real)")
+    parser.add_argument("--tasa", type=float, default=0, help="Correos por segundo en el pool (0 = sin límite)")
+    parser.add_argument("--sin-secuencial", action="store_true", help="No medir el envío secuencial (lento)")
+    args = parser.parse_args()
+
+    lista = candidatos(args.n)
+    async with SMTPStub(latencia=args.latencia, latencia_conexion=args.latencia_conexion) as stub:
+        print(f"📨 {args.n} correos, latencia {args.latencia * 1000:.0f} ms por respuesta, "
+              f"{args.latencia_conexion * 1000:.0f} ms por conexión")
+        print(f"{'modo':<12} {'tiempo':>9} {'ritmo':>14} {'recibidos':>9} {'conexiones':>11}")
+        if not args.sin_secuencial:
+            await medir("secuencial", stub, enviar_secuencial(stub, lista), args.n)
+        await medir("por_correo", stub, enviar_por_correo(stub, lista, args.pool), args.n)
+        await medir("pool", stub, enviar_pool(stub, lista, args.pool, args.tasa), args.n)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,69 @@
+"""
+Benchmark del modo cross-encoder local frente al ranking del LLM.
+
+Para cada consulta de un conjunto fijo recupera los candidatos de FAISS, mide
+la latencia del cross-encoder (la carga del modelo se informa aparte) y
+compara su top-5 con el ranking del LLM (rerank). Como referencia muestra
+también la coincidencia del top-5 por distancia de FAISS (Solo RAG).
+
+Uso:
+    python bench_cross_encoder.py [--top-k 40] [--repeticiones 3] [--sin-cache]
+                                  [--consultas "Desarrollador Python" ...]
+"""
+import argparse
+import asyncio
+import time
+from cross_encoder_rerank import CrossEncoderReranker
+from utils import recuperar_candidatos, rerank, textos_candidatos
+from bench_rerank import CONSULTAS, ids
+
+def coincidencia(a, b, n=5):
+    return len(set(a[:n]) & set(b[:n]))
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark del cross-encoder frente al ranking del LLM.")
+    parser.add_argument("--consultas", nargs="*", default=CONSULTAS)
+    parser.add_argument("--top-k", type=int, default=40)
+    parser.add_argument("--repeticiones", type=int, default=3, help="Mediciones por consulta (se toma la mejor)")
+    parser.add_argument("--sin-cache", action="store_true", help="No usar el caché de respuestas del LLM")
+    args = parser.parse_args()
+
+    reranker = CrossEncoderReranker.get_instance()
+    inicio = time.perf_counter()
+    reranker.get_modelo()
+    print(f"Carga del modelo {reranker.model_name}: {time.perf_counter() - inicio:.1f}s\n")
+
+    filas = []
+    print(f"{'consulta':<45} {'cross (ms)':>11} {'cross∩LLM':>10} {'RAG∩LLM':>8}")
+    for consulta in args.consultas:
+        candidatos = await recuperar_candidatos(consulta, top_k=args.top_k)
+        if not candidatos:
+            print(f"{consulta[:45]:<45} sin candidatos")
+            continue
+
+        textos = textos_candidatos(candidatos)
+        mejor = float("inf")
+        for _ in range(args.repeticiones):
+            inicio = time.perf_counter()
+            cross = reranker.reordenar(consulta, [dict(c) for c in candidatos], textos=textos)
+            mejor = min(mejor, time.perf_counter() - inicio)
+
+        llm = await rerank([dict(c) for c in candidatos], consulta, cache=None if args.sin_cache else "rerank")
+        ids_llm = ids(llm)
+        if not ids_llm:
+            print(f"{consulta[:45]:<45} {mejor * 1000:>11.0f} {'(el LLM no devolvió ranking)':>20}")
+            continue
+
+        con_cross = coincidencia(ids(cross), ids_llm)
+        con_rag = coincidencia(ids(candidatos), ids_llm)
+        filas.append((mejor, con_cross, con_rag))
+        print(f"{consulta[:45]:<45} {mejor * 1000:>11.0f} {con_cross:>8}/5 {con_rag:>6}/5")
+
+    if filas:
+        n = len(filas)
+        print(f"\nMedia: {sum(f[0] for f in filas) / n * 1000:.0f} ms por consulta; "
+              f"top-5 común con el LLM: cross-encoder {sum(f[1] for f in filas) / n:.1f}/5, "
+              f"Solo RAG {sum(f[2] for f in filas) / n:.1f}/5")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,41 @@
+"""
+Benchmark del motor de plantillas de correo: correos renderizados por segundo
+para un lote de candidatos, analizando la consulta una sola vez (como hacen
+redactar_borradores y send_bulk_emails) o una vez por correo.
+
+Uso:
+    python bench_email_templates.py [-n 10000] [--consulta "entrevista el viernes a las 10h"]
+"""
+import argparse
+import time
+from email_templates import valores_consulta, elegir_plantilla, renderizar_correo
+
+def medir(nombre, funcion, n):
+    inicio = time.perf_counter()
+    funcion()
+    segundos = time.perf_counter() - inicio
+    print(f"{nombre:<22} {segundos * 1000:>9.1f} ms {n / segundos:>12,.0f} correos/s")
+
+def main():
+    parser = argparse.ArgumentParser(description="Correos por segundo del motor de plantillas.")
+    parser.add_argument("-n", type=int, default=10000, help="Número de candidatos")
+    parser.add_argument("--consulta", default="Envía un correo para la entrevista del viernes a las 10h")
+    parser.add_argument("--descripcion", default="Desarrollador Python")
+    args = parser.parse_args()
+
+    candidatos = [{"ID": str(i), "Nombre": f"Candidato {i}"} for i in range(args.n)]
+    valores = valores_consulta(args.consulta, args.descripcion)
+    plantilla = elegir_plantilla(args.consulta, valores)
+    if plantilla is None:
+        print("⚠️ La consulta no encaja en ninguna plantilla: se escalaría al LLM.")
+        return
+    print(f"📄 Plantilla '{plantilla.clave}' para {args.n} candidatos")
+    medir("consulta por lote", lambda: [
+        renderizar_correo(c, args.consulta, plantilla=plantilla, valores=valores) for c in candidatos
+    ], args.n)
+    medir("consulta por correo", lambda: [
+        renderizar_correo(c, args.consulta, args.descripcion) for c in candidatos
+    ], args.n)
+
+if __name__ == "__main__":
+    main()
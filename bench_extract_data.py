@@ -0,0 +1,39 @@
+"""
+Micro-benchmark del extractor de campos: versión con nueve búsquedas regex
+(extract_data_regex) frente al extractor de una sola pasada (extract_data).
+
+Uso:
+    python bench_extract_data.py [--repeticiones 50] [--fichero Base_datos_final.txt]
+"""
+import argparse
+import time
+from load_txt_to_db import read_txt_file, split_profiles, preprocess_text, extract_data, extract_data_regex
+
+def medir(funcion, perfiles, repeticiones):
+    mejor = float("inf")
+    for _ in range(3):
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            for perfil in perfiles:
+                funcion(perfil)
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return len(perfiles) * repeticiones / mejor
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de extract_data.")
+    parser.add_argument("--fichero", default="Base_datos_final.txt")
+    parser.add_argument("--repeticiones", type=int, default=50)
+    args = parser.parse_args()
+
+    perfiles = [preprocess_text(p) for p in split_profiles(read_txt_file(args.fichero))]
+    perfiles = [p for p in perfiles if p]
+    diferentes = sum(1 for p in perfiles if extract_data(p) != extract_data_regex(p))
+    print(f"{len(perfiles)} perfiles, {diferentes} con resultado distinto")
+
+    antes = medir(extract_data_regex, perfiles, args.repeticiones)
+    despues = medir(extract_data, perfiles, args.repeticiones)
+    print(f"regex (antes):       {antes:>12,.0f} perfiles/s")
+    print(f"una pasada (ahora):  {despues:>12,.0f} perfiles/s  (x{despues / antes:.1f})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Benchmark de construcción del índice FAISS.
+
+Compara el bucle anterior (FAISS.from_documents + add_documents en lotes de 10)
+con la construcción masiva de vector_index (una pasada de embeddings y un único
+index.add) sobre corpus sintéticos de CVs.
+
+Uso:
+    python bench_index_build.py --sizes 1000 10000 100000
+    python bench_index_build.py --sizes 1000 --fake     # embeddings deterministas, aísla el coste de FAISS
+
+Cada combinación (modo, tamaño) se ejecuta en un subproceso para poder medir
+su memoria pico (ru_maxrss) de forma independiente.
+"""
+import argparse
+import json
+import random
+import resource
+import subprocess
+import sys
+import time
+from langchain.docstore.document import Document
+from langchain_community.vectorstores import FAISS
+
+from config import EMBEDDING_MODEL
+from vector_index import crear_embeddings, crear_store, embeber_textos
+
+HABILIDADES = ["Python", "Java", "SQL", "Tableau", "Machine Learning", "Spring Boot", "React",
+               "Docker", "Kubernetes", "Excel", "SAP", "Liderazgo de Equipos", "Power BI", "AWS"]
+IDIOMAS = ["Español (Nativo)", "Inglés (Fluido)", "Francés (Intermedio)", "Alemán (Básico)"]
+CIUDADES = ["Madrid, España", "Barcelona, España", "Lisboa, Portugal", "Londres, Reino Unido"]
+
+def generar_documentos(n, semilla=42):
+    rng = random.Random(semilla)
+    documentos = []
+    for i in range(1, n + 1):
+        habilidades = ", ".join(rng.sample(HABILIDADES, 4))
+        idiomas = ", ".join(rng.sample(IDIOMAS, 2))
+        ubicacion = rng.choice(CIUDADES)
+        inicio = rng.randint(2005, 2020)
+        page_content = f"""
+                RESUMEN: profesional con {2024 - inicio} años de experiencia en {habilidades.lower()}.
+                IDIOMAS: {idiomas}
+                HABILIDADES: {habilidades}
+                EXPERIENCIA: empresa {i % 97}, consultor, {inicio}-2024
+                UBICACIÓN: {ubicacion}
+                EDUCACIÓN: universidad {i % 13}, grado, {inicio - 4}
+                """
+        documentos.append(Document(page_content=page_content, metadata={"id": i, "name": f"candidato {i}"}))
+    return documentos
+
+def crear_modelo(fake, batch_size):
+    if fake:
+        from langchain_community.embeddings import DeterministicFakeEmbedding
+        return DeterministicFakeEmbedding(size=512)
+    return crear_embeddings(EMBEDDING_MODEL, batch_size=batch_size)
+
+def construir_bucle(documentos, embeddings, lote=10):
+    """Réplica del camino anterior de build_or_load_vector_index."""
+    indice = None
+    for i in range(0, len(documentos), lote):
+        batch = documentos[i : i + lote]
+        if indice is None:
+            indice = FAISS.from_documents(batch, embeddings)
+        else:
+            indice.add_documents(batch)
+    return indice
+
+def construir_masivo(documentos, embeddings):
+    ids = [str(doc.metadata["id"]) for doc in documentos]
+    matriz = embeber_textos(embeddings, [doc.page_content for doc in documentos])
+    return crear_store(embeddings, matriz, documentos, ids)
+
+def ejecutar(modo, n, fake, batch_size):
+    documentos = generar_documentos(n)
+    embeddings = crear_modelo(fake, batch_size)
+    # Calentamiento del modelo fuera de la medición
+    embeddings.embed_query("calentamiento")
+    inicio = time.perf_counter()
+    if modo == "bucle":
+        indice = construir_bucle(documentos, embeddings)
+    else:
+        indice = construir_masivo(documentos, embeddings)
+    segundos = time.perf_counter() - inicio
+    # En Linux ru_maxrss viene en KB
+    pico_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return {"modo": modo, "n": n, "segundos": round(segundos, 2),
+            "docs_por_segundo": round(n / segundos, 1), "pico_mb": round(pico_mb, 1),
+            "ntotal": indice.index.ntotal}
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de construcción del índice FAISS.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--modos", nargs="+", default=["bucle", "masivo"], choices=["bucle", "masivo"])
+    parser.add_argument("--batch-size", type=int, default=256, help="Lote del modelo en el modo masivo")
+    parser.add_argument("--fake", action="store_true", help="Usar embeddings deterministas en lugar del modelo")
+    parser.add_argument("--run", nargs=2, metavar=("MODO", "N"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        modo, n = args.run[0], int(args.run[1])
+        print(json.dumps(ejecutar(modo, n, args.fake, args.batch_size)))
+        return
+
+    print(f"{'modo':<8} {'n':>8} {'segundos':>10} {'docs/s':>10} {'pico MB':>10}")
+    for n in args.sizes:
+        for modo in args.modos:
+            cmd = [sys.executable, __file__, "--run", modo, str(n), "--batch-size", str(args.batch_size)]
+            if args.fake:
+                cmd.append("--fake")
+            salida = subprocess.run(cmd, capture_output=True, text=True)
+            if salida.returncode != 0:
+                print(f"❌ {modo} n={n} falló:\n{salida.stderr[-2000:]}")
+                continue
+            r = json.loads(salida.stdout.strip().splitlines()[-1])
+            print(f"{r['modo']:<8} {r['n']:>8} {r['segundos']:>10} {r['docs_por_segundo']:>10} {r['pico_mb']:>10}")
+
+if __name__ == "__main__":
+    main()
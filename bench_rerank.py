@@ -0,0 +1,82 @@
+"""
+Benchmark del rerank con el LLM: un único prompt con toda la lista de FAISS
+(rerank) frente al rerank por grupos en paralelo (rerank_paralelo).
+
+Para cada consulta mide la latencia de ambos caminos (sin caché de respuestas)
+y la concordancia entre sus rankings: candidatos comunes en el top-5 y si
+coincide el primer puesto.
+
+Uso:
+    python bench_rerank.py [--top-k 40] [--grupo 10] [--por-grupo 3] [--concurrencia 4]
+                           [--consultas "Desarrollador Python" "Enfermera con inglés" ...]
+"""
+import argparse
+import time
+from utils import recuperar_candidatos, rerank, rerank_paralelo
+from llm_client import ejecutar
+
+CONSULTAS = [
+    "Desarrollador Python con experiencia en machine learning",
+    "Enfermero/a con inglés avanzado y experiencia en urgencias",
+    "Responsable de marketing digital y redes sociales",
+    "Contable con conocimientos de SAP",
+    "Ingeniero de datos con Spark y AWS",
+]
+
+def ids(ranking):
+    if len(ranking) == 1 and "Error" in ranking[0]:
+        return []
+    return [str(r["ID"]).strip() for r in ranking]
+
+async def medir(consulta, args):
+    candidatos = await recuperar_candidatos(consulta, top_k=args.top_k)
+    if not candidatos:
+        return None
+
+    inicio = time.perf_counter()
+    unico = await rerank([dict(c) for c in candidatos], consulta, cache=None)
+    t_unico = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    paralelo = await rerank_paralelo(
+        [dict(c) for c in candidatos], consulta, tam_grupo=args.grupo,
+        por_grupo=args.por_grupo, concurrencia=args.concurrencia, cache=False
+    )
+    t_paralelo = time.perf_counter() - inicio
+
+    ids_unico, ids_paralelo = ids(unico)[:5], ids(paralelo)[:5]
+    comunes = len(set(ids_unico) & set(ids_paralelo))
+    mismo_primero = bool(ids_unico and ids_paralelo and ids_unico[0] == ids_paralelo[0])
+    return t_unico, t_paralelo, comunes, mismo_primero
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark de rerank único frente a rerank en paralelo.")
+    parser.add_argument("--consultas", nargs="*", default=CONSULTAS)
+    parser.add_argument("--top-k", type=int, default=40)
+    parser.add_argument("--grupo", type=int, default=10)
+    parser.add_argument("--por-grupo", type=int, default=3)
+    parser.add_argument("--concurrencia", type=int, default=4)
+    args = parser.parse_args()
+
+    filas = []
+    print(f"{'consulta':<45} {'único (s)':>10} {'paralelo (s)':>13} {'top-5 común':>12} {'1º igual':>9}")
+    for consulta in args.consultas:
+        resultado = await medir(consulta, args)
+        if resultado is None:
+            print(f"{consulta[:45]:<45} sin candidatos")
+            continue
+        t_unico, t_paralelo, comunes, mismo_primero = resultado
+        filas.append(resultado)
+        print(f"{consulta[:45]:<45} {t_unico:>10.2f} {t_paralelo:>13.2f} {comunes:>10}/5 {'sí' if mismo_primero else 'no':>9}")
+
+    if filas:
+        n = len(filas)
+        media_unico = sum(f[0] for f in filas) / n
+        media_paralelo = sum(f[1] for f in filas) / n
+        print(f"\nMedia: único {media_unico:.2f}s, paralelo {media_paralelo:.2f}s "
+              f"(x{media_unico / media_paralelo:.1f}); "
+              f"top-5 común {sum(f[2] for f in filas) / n:.1f}/5; "
+              f"1º igual en {sum(f[3] for f in filas)}/{n} consultas")
+
+if __name__ == "__main__":
+    ejecutar(main())
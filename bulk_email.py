@@ -0,0 +1,233 @@
+import os
+import time
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from email.message import EmailMessage
+from typing import List, Dict, Any
+import aiosmtplib
+from dotenv import load_dotenv
+from config import SMTP_POOL_SIZE, SMTP_MAX_MESSAGES_PER_CONNECTION, BULK_EMAIL_RATE
+
+load_dotenv("key.env", override=True)
+
+# Errores tras los que la conexión ya no sirve y se sustituye por otra
+ERRORES_CONEXION = (
+    aiosmtplib.SMTPServerDisconnected, aiosmtplib.SMTPConnectError,
+    aiosmtplib.SMTPTimeoutError, ConnectionError, asyncio.TimeoutError
+)
+
+def smtp_config() -> Dict[str, Any]:
+    """Parámetros de conexión a partir de las variables de entorno (las mismas que send_email)."""
+    try:
+        port = int(os.getenv("SMTP_PORT", "587"))
+    except ValueError:
+        logging.error("El valor de SMTP_PORT (%s) no es válido. Usando 587 por defecto.", os.getenv("SMTP_PORT"))
+        port = 587
+    return {
+        "hostname": os.getenv("SMTP_HOST"),
+        "port": port,
+        "username": os.getenv("SMTP_USERNAME"),
+        "password": os.getenv("SMTP_PASSWORD"),
+        # SMTP_STARTTLS=0 para servidores locales sin TLS (p. ej. smtp_stub.py)
+        "start_tls": os.getenv("SMTP_STARTTLS", "1") == "1",
+    }
+
+# =============================================================================
+# Pool de conexiones SMTP: cada conexión hace connect + STARTTLS + login una
+# sola vez y envía muchos mensajes. Como una sesión SMTP es secuencial, el
+# tamaño del pool es también el número de envíos simultáneos.
+# =============================================================================
+class SMTPPool:
+    def __init__(self, hostname, port=587, username=None, password=None, start_tls=True,
+                 size=SMTP_POOL_SIZE, max_mensajes=SMTP_MAX_MESSAGES_PER_CONNECTION, timeout=30):
+        self.hostname = hostname
+        self.port = port
+        self.username = username
+        self.password = password
+        self.start_tls = start_tls
+        self.size = size
+        self.max_mensajes = max_mensajes
+        self.timeout = timeout
+        self.conexiones_abiertas = 0
+        # Se crean dentro del bucle de eventos que usa el pool
+        self._libres = None
+        self._semaforo = None
+
+    async def _conectar(self):
+        cliente = aiosmtplib.SMTP(
+            hostname=self.hostname, port=self.port, username=self.username,
+            password=self.password, start_tls=self.start_tls, timeout=self.timeout
+        )
+        # connect() hace también STARTTLS y el login si hay credenciales
+        await cliente.connect()
+        self.conexiones_abiertas += 1
+        return [cliente, 0]
+
+    async def _adquirir(self):
+        if self._semaforo is None:
+            self._libres = asyncio.Queue()
+            self._semaforo = asyncio.Semaphore(self.size)
+        # El semáforo limita las conexiones en uso; si no hay una libre se abre otra
+        await self._semaforo.acquire()
+        try:
+            return self._libres.get_nowait()
+        except asyncio.QueueEmpty:
+            pass
+        try:
+            return await self._conectar()
+        except Exception:
+            self._semaforo.release()
+            raise
+
+    async def _liberar(self, entrada, rota=False):
+        cliente, enviados = entrada
+        try:
+            if rota or enviados >= self.max_mensajes:
+                await self._cerrar_cliente(cliente)
+            else:
+                self._libres.put_nowait(entrada)
+        finally:
+            self._semaforo.release()
+
+    @staticmethod
+    async def _cerrar_cliente(cliente):
+        try:
+            if cliente.is_connected:
+                await cliente.quit()
+        except Exception:
+            cliente.close()
+
+    @asynccontextmanager
+    async def conexion(self):
+        entrada = await self._adquirir()
+        rota = False
+        try:
+            yield entrada
+        except ERRORES_CONEXION:
+            rota = True
+            raise
+        finally:
+            await self._liberar(entrada, rota)
+
+    async def enviar(self, mensaje, reintentos=1):
+        """Envía un mensaje; si la conexión se cae, se reintenta con otra."""
+        for intento in range(reintentos + 1):
+            try:
+                async with self.conexion() as entrada:
+                    await entrada[0].send_message(mensaje)
+                    entrada[1] += 1
+                    return
+            except ERRORES_CONEXION as e:
+                if intento == reintentos:
+                    raise
+                logging.warning("Conexión SMTP perdida (%s); reintento %d", e, intento + 1)
+
+    async def cerrar(self):
+        if self._libres is None:
+            return
+        while not self._libres.empty():
+            cliente, _ = self._libres.get_nowait()
+            await self._cerrar_cliente(cliente)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.cerrar()
+
+# =============================================================================
+# Ritmo máximo de envío (mensajes por segundo), repartido de forma uniforme.
+# =============================================================================
+class LimitadorTasa:
+    def __init__(self, por_segundo=BULK_EMAIL_RATE):
+        self.intervalo = 1.0 / por_segundo if por_segundo and por_segundo > 0 else 0.0
+        self._siguiente = 0.0
+        self._lock = asyncio.Lock()
+
+    async def esperar(self):
+        if not self.intervalo:
+            return
+        async with self._lock:
+            ahora = asyncio.get_running_loop().time()
+            espera = self._siguiente - ahora
+            self._siguiente = max(ahora, self._siguiente) + self.intervalo
+        if espera > 0:
+            await asyncio.sleep(espera)
+
+def construir_mensaje(remitente: str, destinatario: str, subject: str, body: str) -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = remitente
+    message["To"] = destinatario
+    message["Subject"] = subject
+    message.set_content(body)
+    return message
+
+async def send_bulk_emails(candidates: List[Dict[str, Any]], subject: str, body_template: str,
+                           pool: SMTPPool = None, por_segundo: float = BULK_EMAIL_RATE,
+                           remitente: str = None) -> List[Dict[str, Any]]:
+    """
+    Envía un correo a cada candidato reutilizando las conexiones del pool.
+    '{name}' en body_template se sustituye por el nombre del candidato.
+    Devuelve un resultado por candidato, en el mismo orden:
+    {"ID", "Nombre", "Correo", "success", "message"}.
+    """
+    remitente = remitente or os.getenv("SMTP_FROM_EMAIL")
+    resultados = [
+        {"ID": str(c.get("ID", "")).strip(), "Nombre": c.get("Nombre", ""), "Correo": c.get("Correo", ""),
+         "success": False, "message": ""}
+        for c in candidates
+    ]
+    if not remitente:
+        logging.error("La variable SMTP_FROM_EMAIL no está definida.")
+        for r in resultados:
+            r["message"] = "SMTP_FROM_EMAIL no está definida"
+        return resultados
+
+    propio = pool is None
+    if propio:
+        config = smtp_config()
+        if not config["hostname"]:
+            logging.error("Faltan variables de entorno para SMTP.")
+            for r in resultados:
+                r["message"] = "Faltan variables de entorno para SMTP"
+            return resultados
+        pool = SMTPPool(**config)
+
+    limitador = LimitadorTasa(por_segundo)
+
+    async def enviar(resultado):
+        correo = resultado["Correo"]
+        if not correo or correo == "No disponible":
+            resultado["message"] = "El candidato no tiene un correo registrado"
+            return
+        body = body_template.replace("{name}", resultado["Nombre"] or "candidato/a")
+        await limitador.esperar()
+        try:
+            await pool.enviar(construir_mensaje(remitente, correo, subject, body))
+            resultado["success"] = True
+            resultado["message"] = "Enviado"
+        except Exception as e:
+            logging.error("❌ Error al enviar correo a %s: %s", correo, e)
+            resultado["message"] = f"{type(e).__name__}: {e}"
+
+    inicio = time.perf_counter()
+    try:
+        # El pool limita los envíos simultáneos: el resto espera una conexión libre
+        await asyncio.gather(*(enviar(r) for r in resultados))
+    finally:
+        if propio:
+            await pool.cerrar()
+    enviados = sum(r["success"] for r in resultados)
+    logging.info("📨 %d/%d correos enviados en %.1fs por %d conexiones", enviados, len(resultados),
+                 time.perf_counter() - inicio, pool.conexiones_abiertas)
+    return resultados
+
+def resumen_envio(resultados: List[Dict[str, Any]], titulo: str = "📨 Correos enviados") -> str:
+    """Texto para el chat con el resultado de un envío masivo (o de su paso por la cola)."""
+    enviados = [r for r in resultados if r["success"]]
+    fallidos = [r for r in resultados if not r["success"]]
+    texto = f"{titulo}: {len(enviados)} de {len(resultados)}."
+    for r in fallidos:
+        texto += f"\n❌ {r['Nombre'] or r['ID']} ({r['Correo'] or 'sin correo'}): {r['message']}"
+    return texto
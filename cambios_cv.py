@@ -0,0 +1,62 @@
+import sqlite3
+
+# =============================================================================
+# Huella barata de la tabla 'cv': número de filas, id máximo y un contador que
+# unos triggers incrementan en cada INSERT/UPDATE/DELETE. Si coincide con la
+# del manifest, el índice FAISS está al día sin leer ni hashear todos los CVs.
+# Un DROP TABLE cv (carga con reset) se lleva los triggers pero no el
+# contador: al recrearlos se incrementa, así que la huella nunca se repite.
+# =============================================================================
+TRIGGERS_CAMBIOS = ("cv_cambios_ai", "cv_cambios_ad", "cv_cambios_au")
+
+CAMBIOS_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS cv_cambios (id INTEGER PRIMARY KEY CHECK (id = 1), contador INTEGER NOT NULL)",
+    "INSERT OR IGNORE INTO cv_cambios (id, contador) VALUES (1, 0)",
+    """
+    CREATE TRIGGER IF NOT EXISTS cv_cambios_ai AFTER INSERT ON cv BEGIN
+        UPDATE cv_cambios SET contador = contador + 1 WHERE id = 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS cv_cambios_ad AFTER DELETE ON cv BEGIN
+        UPDATE cv_cambios SET contador = contador + 1 WHERE id = 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS cv_cambios_au AFTER UPDATE ON cv BEGIN
+        UPDATE cv_cambios SET contador = contador + 1 WHERE id = 1;
+    END
+    """,
+)
+
+def asegurar_contador_cambios(conn):
+    """
+    Crea el contador de cambios y sus triggers si falta alguno. Se comprueba
+    en sqlite_master en cada llamada (no por proceso): otro proceso puede
+    haber recreado 'cv'. Si faltaban, se incrementa el contador, porque los
+    cambios hechos sin triggers no se contaron.
+    """
+    presentes = {
+        fila[0] for fila in conn.execute(
+            f"SELECT name FROM sqlite_master WHERE type = 'trigger' AND name IN ({', '.join('?' * len(TRIGGERS_CAMBIOS))})",
+            TRIGGERS_CAMBIOS
+        )
+    }
+    if len(presentes) == len(TRIGGERS_CAMBIOS):
+        return
+    for sentencia in CAMBIOS_SCHEMA:
+        conn.execute(sentencia)
+    conn.execute("UPDATE cv_cambios SET contador = contador + 1 WHERE id = 1")
+    if conn.in_transaction:
+        conn.commit()
+
+def huella_cv(cursor):
+    """[filas, id máximo, contador de cambios] de la tabla 'cv'; None si no se puede leer."""
+    try:
+        filas, id_maximo, contador = cursor.execute(
+            "SELECT (SELECT COUNT(*) FROM cv), (SELECT MAX(id) FROM cv), "
+            "(SELECT contador FROM cv_cambios WHERE id = 1)"
+        ).fetchone()
+    except sqlite3.Error:
+        return None
+    return [filas, id_maximo, contador]
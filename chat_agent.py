@@ -1,17 +1,21 @@
 import asyncio
 import logging
 from typing import List, Dict, Any
-from utils import generar_respuesta
-from send_email import send_email_sync
+from utils import generar_respuesta, generar_respuesta_stream
+from send_email import parse_email_intent, iniciar_outbox, encolar_lote_con_aprobacion
+from bulk_email import resumen_envio
+from llm_client import ejecutar
 import json
 
 # Configuración básica de logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-async def get_candidate_data(query: str, candidates: List[Dict[str, Any]], job_description: str = "") -> str:
-    logging.info("🔍 get_candidate_data – recibido query tipo %s: %r", type(query), query)
+class RespuestaDirecta(Exception):
+    """Respuesta que no necesita pasar por el LLM (faltan candidatos, etc.)."""
+
+def construir_prompt_candidatos(query: str, candidates: List[Dict[str, Any]], job_description: str = "") -> str:
     if not candidates:
-        return "⚠️ No hay candidatos seleccionados aún."
+        raise RespuestaDirecta("⚠️ No hay candidatos seleccionados aún.")
     lineas = []
     # Dentro de la función (por ejemplo, en get_candidate_data o en el bloque de construcción del prompt en rerank)
     for c in candidates:
@@ -63,7 +67,7 @@ async def get_candidate_data(query: str, candidates: List[Dict[str, Any]], job_d
 
     resumen_candidatos = "\n".join(lineas)
     if not resumen_candidatos:
-        return "⚠️ No se encontró información de los candidatos. Revisa si la búsqueda se ejecutó correctamente."
+        raise RespuestaDirecta("⚠️ No se encontró información de los candidatos. Revisa si la búsqueda se ejecutó correctamente.")
     logging.info("=== Prompt al LLM ===")
     logging.info(resumen_candidatos)
     prompt = f"""
@@ -82,8 +86,16 @@ async def get_candidate_data(query: str, candidates: List[Dict[str, Any]], job_d
     Responde de forma clara y directa. Si la pregunta requiere información sobre un candidato, proporciónala.
     Si la pregunta es general, responde con base en los datos disponibles.
     """
+    return prompt
+
+async def get_candidate_data(query: str, candidates: List[Dict[str, Any]], job_description: str = "") -> str:
+    logging.info("🔍 get_candidate_data – recibido query tipo %s: %r", type(query), query)
+    try:
+        prompt = construir_prompt_candidatos(query, candidates, job_description)
+    except RespuestaDirecta as directa:
+        return str(directa)
     try:
-        respuesta = await generar_respuesta(prompt)
+        respuesta = await generar_respuesta(prompt, cache="chat")
     except Exception as e:
         logging.error(f"Error al generar la respuesta: {e}")
         return "⚠️ Ocurrió un error al procesar la solicitud. Inténtalo de nuevo."
@@ -91,35 +103,42 @@ async def get_candidate_data(query: str, candidates: List[Dict[str, Any]], job_d
     logging.info(respuesta)
     return respuesta
 
-def handle_email_command(candidate_data: dict, command: str) -> str:
-    # Verifica que el candidato tenga correo
-    if "Correo" not in candidate_data or candidate_data["Correo"] == "No disponible":
-        logging.warning("El candidato no tiene un correo registrado.")
-        return "El candidato no tiene un correo registrado."
-    recipient_email = candidate_data["Correo"]
-    subject = "Proceso de Selección - Información Actualizada"
-    body = (
-        f"Hola {candidate_data.get('Nombre', 'Candidato')},\n\n"
-        "Te informamos que has sido seleccionado para avanzar al siguiente nivel del proceso de selección. "
-        "Por favor, confirma tus datos de contacto y tu disponibilidad para la siguiente fase.\n\n"
-        "Saludos cordiales,\nEquipo de Reclutamiento"
-    )
-    send_email_sync(recipient_email, subject, body)
-    return f"Correo enviado a {recipient_email}"
-
-def process_user_input_multiple(query: str, candidates: List[Dict[str, Any]]) -> str:
+async def get_candidate_data_stream(query: str, candidates: List[Dict[str, Any]], job_description: str = ""):
+    """Como get_candidate_data, pero produce el texto acumulado a medida que llega del LLM."""
+    logging.info("🔍 get_candidate_data_stream – recibido query tipo %s: %r", type(query), query)
+    try:
+        prompt = construir_prompt_candidatos(query, candidates, job_description)
+    except RespuestaDirecta as directa:
+        yield str(directa)
+        return
+    respuesta = ""
+    try:
+        async for fragmento in generar_respuesta_stream(prompt, cache="chat"):
+            respuesta += fragmento
+            yield respuesta
+    except Exception as e:
+        logging.error(f"Error al generar la respuesta: {e}")
+        yield "⚠️ Ocurrió un error al procesar la solicitud. Inténtalo de nuevo."
+        return
+    logging.info("=== Respuesta de la API ===")
+    logging.info(respuesta)
+
+async def process_user_input_multiple(query: str, candidates: List[Dict[str, Any]]) -> str:
     logging.info(f"Query recibida: {query}")
     if "envia un correo" in query.lower():
         # Usamos la función parse_email_intent para obtener el asunto y cuerpo
         subject, body_template = parse_email_intent(query)
-        result = send_bulk_emails(candidates, subject, body_template)
-        return result
+        # Como "Enviar correo ahora": cada correo pasa por la aprobación de
+        # HumanLayer y lo entrega el worker de la cola, con reintentos
+        resultados = await asyncio.to_thread(encolar_lote_con_aprobacion, candidates, subject, body_template)
+        return resumen_envio(resultados, titulo="📬 Correos en cola, pendientes de aprobación")
     else:
-        return asyncio.run(get_candidate_data(query, candidates, "Ejemplo de puesto"))
+        return await get_candidate_data(query, candidates, "Ejemplo de puesto")
 
 
 # Bloque de prueba
 if __name__ == "__main__":
+    iniciar_outbox()
     candidates_list = [
         {
             "ID": "123",
@@ -139,7 +158,7 @@ if __name__ == "__main__":
         }
     ]
     user_query = "Envía un correo a todos los candidatos para la entrevista el viernes a las 3pm."
-    respuesta = process_user_input_multiple(user_query, candidates_list)
+    respuesta = ejecutar(process_user_input_multiple(user_query, candidates_list))
     print("=== Respuesta ===")
     print(respuesta)
 
@@ -10,7 +10,92 @@ DEEPSEEK_MODEL = "deepseek-chat"  # Modelo actualizado
 
 # Configuración de FAISS
 FAISS_INDEX_PATH = "faiss_index"
-EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+EMBEDDING_MODEL = "sentence-transformers/distiluse-base-multilingual-cased-v2"
+FAISS_MANIFEST_FILE = "manifest.json"  # Manifest del índice (modelo, dimensión, hashes por CV)
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "256"))  # Lote del modelo al construir el índice
+EMBEDDING_MULTI_PROCESS = os.getenv("EMBEDDING_MULTI_PROCESS", "0") == "1"  # Un proceso de encoding por núcleo
+
+# Tipo de índice FAISS: "Flat" (exacto), "HNSW", "IVFFlat" o "IVFPQ" (aproximados)
+FAISS_INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "Flat")
+INDEX_TRAIN_SAMPLE = int(os.getenv("INDEX_TRAIN_SAMPLE", "100000"))  # Vectores usados para entrenar los IVF
+HNSW_M = int(os.getenv("HNSW_M", "32"))  # Vecinos por nodo del grafo
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "200"))
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "64"))  # Más alto = más recall y más latencia
+IVF_NLIST = int(os.getenv("IVF_NLIST", "0"))  # Particiones; 0 = automático (4·√n)
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", "16"))  # Particiones visitadas por consulta
+PQ_M = int(os.getenv("PQ_M", "16"))  # Subvectores de IVFPQ (debe dividir la dimensión)
+PQ_NBITS = int(os.getenv("PQ_NBITS", "8"))  # Bits por subvector
+# Carga perezosa: index.faiss mapeado en memoria y documentos leídos de 'cv' por id (sin index.pkl)
+FAISS_MMAP = os.getenv("FAISS_MMAP", "0") == "1"
+
+# Caché en memoria de consultas (vectores y resultados top-k)
+QUERY_CACHE_SIZE = 256
+QUERY_CACHE_TTL = 15 * 60  # segundos
+
+# Cliente del LLM (API de chat completions compatible con OpenAI)
+LLM_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")  # Permite apuntar a un servidor local en pruebas
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))  # Plazo por llamada, reintentos incluidos (segundos)
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))  # Reintentos ante 429/5xx o errores de red
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "20"))  # Conexiones simultáneas máximas
+
+# Caché en disco de respuestas del LLM (rerank, chat y borradores de correo)
+LLM_CACHE_DB = "llm_cache.db"
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", str(24 * 3600)))  # segundos
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+
+# Modos de búsqueda (opciones del selector de la interfaz)
+MODO_SOLO_RAG = "🔍 Solo RAG"
+MODO_RAG_LLM = "🤖 RAG + LLM (IA Avanzada)"
+MODO_RAG_LLM_PARALELO = "⚡ RAG + LLM en paralelo"
+MODO_CROSS_ENCODER = "🧠 RAG + Cross-encoder local"
+MODOS_BUSQUEDA = [MODO_SOLO_RAG, MODO_RAG_LLM, MODO_RAG_LLM_PARALELO, MODO_CROSS_ENCODER]
+
+# Rerank en paralelo: la lista de FAISS se divide en grupos que el LLM puntúa a la vez
+RERANK_SHARD_SIZE = int(os.getenv("RERANK_SHARD_SIZE", "10"))  # Candidatos por grupo
+RERANK_SHARD_TOP = int(os.getenv("RERANK_SHARD_TOP", "3"))  # Ganadores de cada grupo que pasan a la ronda final
+RERANK_CONCURRENCY = int(os.getenv("RERANK_CONCURRENCY", "4"))  # Peticiones simultáneas al LLM
+
+# Búsqueda híbrida: FAISS + BM25 (SQLite FTS5) fusionados con Reciprocal Rank Fusion
+HYBRID_LEXICAL_WEIGHT = float(os.getenv("HYBRID_LEXICAL_WEIGHT", "0.4"))  # 0 = solo FAISS (desactivada), 1 = solo BM25
+RRF_K = 60  # Constante de RRF: cuanto mayor, menos pesan las primeras posiciones
+
+# Cross-encoder local (reordenación en CPU sin llamadas externas)
+CROSS_ENCODER_MODEL = os.getenv("CROSS_ENCODER_MODEL", "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1")  # Multilingüe
+CROSS_ENCODER_BATCH_SIZE = int(os.getenv("CROSS_ENCODER_BATCH_SIZE", "16"))  # Pares (consulta, CV) por lote
+CROSS_ENCODER_MAX_LENGTH = 512  # Tokens máximos por par; el resto del CV se trunca
+
+# Interfaz Gradio: handlers async en un único bucle de eventos y cola con límites
+GRADIO_CONCURRENCY_LIMIT = int(os.getenv("GRADIO_CONCURRENCY_LIMIT", "16"))  # Eventos simultáneos por handler
+GRADIO_MAX_QUEUE = int(os.getenv("GRADIO_MAX_QUEUE", "100"))  # Peticiones en espera antes de rechazar nuevas
+APPROVAL_WORKERS = int(os.getenv("APPROVAL_WORKERS", "8"))  # Hilos que esperan la aprobación de HumanLayer
+
+# Candidatos seleccionados por sesión (compartidos por búsqueda, chat y correo)
+SHORTLIST_FILE = os.getenv("SHORTLIST_FILE", "shortlists.json")  # Copia en disco; "" = solo en memoria
+SHORTLIST_FLUSH_SECONDS = float(os.getenv("SHORTLIST_FLUSH_SECONDS", "2"))  # Agrupación de escrituras
+SHORTLIST_MAX_SESSIONS = int(os.getenv("SHORTLIST_MAX_SESSIONS", "500"))  # Se descartan las más antiguas
+
+# Envío masivo de correos: conexiones SMTP autenticadas reutilizadas y ritmo máximo
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "5"))  # Conexiones abiertas a la vez (= envíos simultáneos)
+SMTP_MAX_MESSAGES_PER_CONNECTION = int(os.getenv("SMTP_MAX_MESSAGES_PER_CONNECTION", "100"))  # Luego se reconecta
+BULK_EMAIL_RATE = float(os.getenv("BULK_EMAIL_RATE", "50"))  # Mensajes por segundo; 0 = sin límite
+
+# Plantillas de correo (sin LLM para las intenciones habituales)
+EMAIL_SIGNATURE = os.getenv("EMAIL_SIGNATURE", "Equipo de Reclutamiento")  # Firma de las plantillas
+
+# Borradores de correo en lote para una lista de candidatos
+EMAIL_DRAFT_CONCURRENCY = int(os.getenv("EMAIL_DRAFT_CONCURRENCY", "5"))  # Peticiones simultáneas al LLM
+EMAIL_DRAFT_TIMEOUT = float(os.getenv("EMAIL_DRAFT_TIMEOUT", "20"))  # Plazo por borrador; luego se usa la plantilla
+
+# Cola persistente de correos (outbox en SQLite) con un worker de entrega en segundo plano
+OUTBOX_DB = os.getenv("OUTBOX_DB", "outbox.db")
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "5"))  # Intentos antes de marcarlo como fallido
+OUTBOX_BACKOFF_SECONDS = float(os.getenv("OUTBOX_BACKOFF_SECONDS", "30"))  # Espera tras el primer fallo; se duplica
+OUTBOX_BACKOFF_MAX_SECONDS = float(os.getenv("OUTBOX_BACKOFF_MAX_SECONDS", "3600"))
+OUTBOX_POLL_SECONDS = float(os.getenv("OUTBOX_POLL_SECONDS", "10"))  # Revisión periódica de reintentos vencidos
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "50"))  # Correos reclamados por pasada del worker
+OUTBOX_LEASE_SECONDS = float(os.getenv("OUTBOX_LEASE_SECONDS", "300"))  # Tras este plazo, un correo reclamado por un worker caído vuelve a la cola
+OUTBOX_DEDUPE_SECONDS = float(os.getenv("OUTBOX_DEDUPE_SECONDS", "600"))  # Un correo ya enviado se puede repetir pasado este plazo
+OUTBOX_PAGE_SIZE = int(os.getenv("OUTBOX_PAGE_SIZE", "20"))  # Solicitudes por página en la interfaz
 
 # Configuración de la base de datos
 DB_CONFIG = {
@@ -19,4 +104,4 @@ DB_CONFIG = {
 }
 
 def get_db_path():
-    return os.path.abspath(DB_CONFIG["db_name"])
\ No newline at end of file
+    return os.path.abspath(DB_CONFIG["db_name"])
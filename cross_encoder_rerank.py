@@ -0,0 +1,72 @@
+import re
+import time
+import threading
+from sentence_transformers import CrossEncoder
+from config import CROSS_ENCODER_MODEL, CROSS_ENCODER_BATCH_SIZE, CROSS_ENCODER_MAX_LENGTH
+
+def texto_candidato(candidato, contenido=None):
+    """Texto del CV que se empareja con la consulta ('contenido' completo si está disponible)."""
+    texto = contenido or " ".join(
+        str(candidato.get(campo, "")) for campo in ("Descripción", "Idiomas", "Habilidades")
+    )
+    return re.sub(r"\s+", " ", texto).strip()
+
+# =============================================================================
+# Reordenación local con un cross-encoder multilingüe en CPU.
+# El modelo se carga una sola vez por proceso, en el primer uso; cada par
+# (consulta, CV) recibe una puntuación (mayor = más relevante).
+# =============================================================================
+class CrossEncoderReranker:
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = CrossEncoderReranker()
+        return cls._instance
+
+    def __init__(self, model_name=CROSS_ENCODER_MODEL, batch_size=CROSS_ENCODER_BATCH_SIZE,
+                 max_length=CROSS_ENCODER_MAX_LENGTH):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self._modelo = None
+        self._lock = threading.Lock()
+
+    def get_modelo(self):
+        with self._lock:
+            if self._modelo is None:
+                inicio = time.perf_counter()
+                print(f"⏳ Cargando cross-encoder '{self.model_name}'...")
+                self._modelo = CrossEncoder(self.model_name, max_length=self.max_length, device="cpu")
+                print(f"✅ Cross-encoder cargado en {time.perf_counter() - inicio:.1f}s.")
+            return self._modelo
+
+    def puntuar(self, consulta, textos):
+        """Puntuaciones de los pares (consulta, texto), calculadas por lotes."""
+        if not textos:
+            return []
+        pares = [(consulta, texto) for texto in textos]
+        puntuaciones = self.get_modelo().predict(
+            pares, batch_size=self.batch_size, show_progress_bar=False, convert_to_numpy=True
+        )
+        return [float(p) for p in puntuaciones]
+
+    def reordenar(self, consulta, candidatos, top_n=None, textos=None):
+        """
+        Devuelve los candidatos ordenados por puntuación, con los campos
+        'Puntuación' y 'Posición'. 'textos' es el CV completo de cada candidato,
+        en el mismo orden (None = se usan los campos resumidos del candidato).
+        """
+        textos = textos or [None] * len(candidatos)
+        puntuaciones = self.puntuar(consulta, [texto_candidato(c, t) for c, t in zip(candidatos, textos)])
+        for candidato, puntuacion in zip(candidatos, puntuaciones):
+            candidato["Puntuación"] = round(puntuacion, 3)
+        ordenados = sorted(candidatos, key=lambda c: c["Puntuación"], reverse=True)
+        if top_n is not None:
+            ordenados = ordenados[:top_n]
+        for posicion, candidato in enumerate(ordenados, start=1):
+            candidato["Posición"] = posicion
+        return ordenados
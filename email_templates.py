@@ -0,0 +1,227 @@
+import re
+from config import EMAIL_SIGNATURE
+
+# =============================================================================
+# Plantillas de correo con huecos tipados. Cada plantilla se compila una vez
+# al importar el módulo (texto fijo + huecos) y renderizar un correo es solo
+# unir cadenas: miles de correos por segundo sin llamar al LLM. La consulta se
+# analiza una vez por lote (intención, fecha, hora, puesto) y por candidato
+# solo cambia el nombre.
+# =============================================================================
+DIAS = r"lunes|martes|mi[eé]rcoles|jueves|viernes|s[aá]bado|domingo"
+MESES = r"enero|febrero|marzo|abril|mayo|junio|julio|agosto|septiembre|setiembre|octubre|noviembre|diciembre"
+
+RE_DIA_SEMANA = re.compile(rf"\b(?:el\s+)?(pr[oó]ximo\s+)?({DIAS})\b", re.IGNORECASE)
+RE_FECHA_TEXTO = re.compile(rf"\b(\d{{1,2}})\s+de\s+({MESES})\b", re.IGNORECASE)
+RE_FECHA_NUMERICA = re.compile(r"\b(\d{1,2})[/-](\d{1,2})(?:[/-](\d{2,4}))?\b")
+RE_RELATIVA = re.compile(r"\b(pasado\s+mañana|(?<!la\s)mañana|hoy)\b", re.IGNORECASE)
+RE_HORA = re.compile(
+    r"\ba\s+las?\s+(\d{1,2})(?:[:.h](\d{2}))?\s*(am|pm|h|horas)?\b"
+    r"|\b(\d{1,2})[:.](\d{2})\s*(am|pm|h)?\b"
+    r"|\b(\d{1,2})\s*(am|pm|h)\b",
+    re.IGNORECASE
+)
+RE_PUESTO = re.compile(r"\b(?:puesto|posici[oó]n|vacante|plaza)\s+de\s+([^,.;\n]+)", re.IGNORECASE)
+# Peticiones de contenido a medida: una plantilla no las puede cubrir
+RE_A_MEDIDA = re.compile(
+    r"\b(preg[uú]nt\w*|p[ií]d\w*|solicit\w*|feedback|mencion\w*|coment\w*|expl[ií]c\w*|personaliz\w*|incluy\w*|a[ñn]ad\w*)",
+    re.IGNORECASE
+)
+
+def extraer_fecha(query):
+    """Fecha de la consulta tal como se dirá en el correo ("el viernes", "el 15 de marzo", "mañana")."""
+    texto = query or ""
+    coincidencia = RE_FECHA_TEXTO.search(texto)
+    if coincidencia:
+        return f"el {int(coincidencia.group(1))} de {coincidencia.group(2).lower()}"
+    coincidencia = RE_FECHA_NUMERICA.search(texto)
+    if coincidencia and 1 <= int(coincidencia.group(1)) <= 31 and 1 <= int(coincidencia.group(2)) <= 12:
+        return f"el {coincidencia.group(0)}"
+    coincidencia = RE_DIA_SEMANA.search(texto)
+    if coincidencia:
+        return f"el {'próximo ' if coincidencia.group(1) else ''}{coincidencia.group(2).lower()}"
+    coincidencia = RE_RELATIVA.search(texto)
+    if coincidencia:
+        return coincidencia.group(1).lower()
+    return None
+
+def extraer_hora(query):
+    """Hora de la consulta en formato HH:MM ("a las 3pm" → "15:00")."""
+    coincidencia = RE_HORA.search(query or "")
+    if not coincidencia:
+        return None
+    grupos = coincidencia.groups()
+    # Solo uno de los tres patrones coincide: se toma el primer trío con hora
+    hora, minutos, sufijo = next(grupos[i:i + 3] for i in (0, 3, 6) if grupos[i] is not None)
+    hora, minutos = int(hora), int(minutos or 0)
+    sufijo = (sufijo or "").lower()
+    if sufijo == "pm" and hora < 12:
+        hora += 12
+    elif sufijo == "am" and hora == 12:
+        hora = 0
+    if hora > 23 or minutos > 59:
+        return None
+    return f"{hora:02d}:{minutos:02d}"
+
+def extraer_puesto(query, descripcion=None):
+    """Puesto mencionado en la consulta ("para el puesto de ...") o, si es corta, la descripción de la búsqueda."""
+    coincidencia = RE_PUESTO.search(query or "")
+    if coincidencia:
+        return coincidencia.group(1).strip()
+    descripcion = (descripcion or "").strip()
+    if descripcion and len(descripcion) <= 60 and "\n" not in descripcion:
+        return descripcion
+    return None
+
+# -----------------------------------------------------------------------------
+# Huecos tipados: cada tipo define cómo se escribe su valor en el texto
+# -----------------------------------------------------------------------------
+class Slot:
+    def __init__(self, nombre, formatear=str, defecto=None):
+        self.nombre = nombre
+        self.formatear = formatear
+        self.defecto = defecto
+
+    def valor(self, valores):
+        valor = valores.get(self.nombre) or self.defecto
+        if valor is None:
+            raise ValueError(f"Falta el valor de '{self.nombre}'")
+        return self.formatear(valor)
+
+SLOTS = {
+    "nombre": Slot("nombre", lambda v: str(v).strip() or "candidato/a", defecto="candidato/a"),
+    "fecha": Slot("fecha"),
+    # Opcionales: si no hay valor, desaparecen junto con su preposición
+    "hora": Slot("hora", lambda v: f" a las {v}" if v else "", defecto=""),
+    "puesto": Slot("puesto", lambda v: f" para el puesto de {v}" if v else "", defecto=""),
+    "firma": Slot("firma", defecto=EMAIL_SIGNATURE),
+}
+RE_HUECO = re.compile(r"\{(\w+)\}")
+
+def compilar(texto):
+    """Divide el texto en (literal, hueco) una sola vez; renderizar solo concatena."""
+    partes, inicio = [], 0
+    for coincidencia in RE_HUECO.finditer(texto):
+        nombre = coincidencia.group(1)
+        if nombre not in SLOTS:
+            raise ValueError(f"Hueco desconocido en la plantilla: {{{nombre}}}")
+        partes.append((texto[inicio:coincidencia.start()], SLOTS[nombre]))
+        inicio = coincidencia.end()
+    partes.append((texto[inicio:], None))
+    return partes
+
+def unir(partes, valores):
+    return "".join(literal + (slot.valor(valores) if slot else "") for literal, slot in partes)
+
+class Plantilla:
+    def __init__(self, clave, patron, asunto, cuerpo, requiere=()):
+        self.clave = clave
+        self.patron = re.compile(patron, re.IGNORECASE)
+        self.requiere = tuple(requiere)
+        self.asunto = asunto
+        self.cuerpo = cuerpo
+        self._asunto = compilar(asunto)
+        self._cuerpo = compilar(cuerpo)
+        self.huecos = {slot.nombre for _, slot in self._asunto + self._cuerpo if slot}
+
+    def coincide(self, query, valores):
+        return bool(self.patron.search(query or "")) and all(valores.get(s) for s in self.requiere)
+
+    def renderizar(self, valores):
+        """Devuelve (asunto, cuerpo)."""
+        return unir(self._asunto, valores), unir(self._cuerpo, valores)
+
+# El orden importa: se usa la primera que coincide ("no seguiremos tras la
+# entrevista" es un descarte, no una invitación).
+PLANTILLAS = [
+    Plantilla(
+        "descarte", r"descart|no vamos a seguir|no continu|rechaz|no (?:ha|has) sido seleccionad",
+        "Notificación de Proceso de Selección",
+        "Hola {nombre},\n\n"
+        "Te agradecemos el tiempo y la dedicación en nuestro proceso de selección{puesto}, "
+        "pero en esta ocasión no continuaremos con tu candidatura.\n"
+        "Te deseamos mucha suerte en tu búsqueda.\n\n"
+        "Saludos,\n{firma}"
+    ),
+    Plantilla(
+        "entrevista_fecha", r"entrevista",
+        "Invitación a entrevista",
+        "Hola {nombre},\n\n"
+        "Gracias por tu interés en nuestro proceso de selección{puesto}. "
+        "Nos gustaría invitarte a una entrevista {fecha}{hora}.\n"
+        "Por favor, confirma tu disponibilidad respondiendo a este correo.\n\n"
+        "Saludos,\n{firma}",
+        requiere=("fecha",)
+    ),
+    Plantilla(
+        "entrevista_hora", r"entrevista",
+        "Invitación a entrevista",
+        "Hola {nombre},\n\n"
+        "Gracias por tu interés en nuestro proceso de selección{puesto}. "
+        "Nos gustaría invitarte a una entrevista{hora}.\n"
+        "¿Qué día te vendría bien? Por favor, confirma tu disponibilidad respondiendo a este correo.\n\n"
+        "Saludos,\n{firma}",
+        requiere=("hora",)
+    ),
+    Plantilla(
+        "entrevista", r"entrevista",
+        "Invitación a entrevista",
+        "Hola {nombre},\n\n"
+        "Gracias por tu interés en nuestro proceso de selección{puesto}. "
+        "Nos gustaría invitarte a una entrevista.\n"
+        "¿Podrías indicarnos tu disponibilidad para los próximos días?\n\n"
+        "Saludos,\n{firma}"
+    ),
+    Plantilla(
+        "avance", r"avanz|siguiente (?:fase|etapa)|seleccionad",
+        "Proceso de Selección - Siguiente fase",
+        "Hola {nombre},\n\n"
+        "Te informamos que has sido seleccionado/a para avanzar a la siguiente fase del proceso de selección{puesto}. "
+        "Por favor, confirma tus datos de contacto y tu disponibilidad.\n\n"
+        "Saludos cordiales,\n{firma}"
+    ),
+    Plantilla(
+        "informacion", r"informaci[oó]n|actualizaci[oó]n|seguimiento|estado del proceso",
+        "Proceso de Selección - Información Actualizada",
+        "Hola {nombre},\n\n"
+        "Queríamos compartirte información sobre el proceso de selección{puesto}.\n\n"
+        "Saludos,\n{firma}"
+    ),
+]
+PLANTILLA_GENERAL = PLANTILLAS[-1]
+# Datos de la cita: si la consulta los da, la plantilla tiene que incluirlos
+HUECOS_CITA = ("fecha", "hora")
+
+def valores_consulta(query, descripcion=None):
+    """Huecos que dependen solo de la consulta: se calculan una vez por lote."""
+    return {
+        "fecha": extraer_fecha(query),
+        "hora": extraer_hora(query),
+        "puesto": extraer_puesto(query, descripcion),
+        "firma": EMAIL_SIGNATURE,
+    }
+
+def elegir_plantilla(query, valores=None):
+    """
+    Primera plantilla que cubre la consulta, o None si hay que escalar al LLM.
+    También se escala si la plantilla perdería la fecha o la hora de la consulta.
+    """
+    if RE_A_MEDIDA.search(query or ""):
+        return None
+    valores = valores if valores is not None else valores_consulta(query)
+    plantilla = next((p for p in PLANTILLAS if p.coincide(query, valores)), None)
+    if plantilla and any(valores.get(h) and h not in plantilla.huecos for h in HUECOS_CITA):
+        return None
+    return plantilla
+
+def renderizar_correo(candidate, query, descripcion=None, general=False, plantilla=None, valores=None):
+    """
+    (asunto, cuerpo) para el candidato con la plantilla que corresponde a la
+    consulta. Devuelve None si ninguna encaja, salvo con general=True, que usa
+    la plantilla genérica. En lotes, pasar 'plantilla' y 'valores' ya calculados.
+    """
+    valores = valores if valores is not None else valores_consulta(query, descripcion)
+    plantilla = plantilla or elegir_plantilla(query, valores) or (PLANTILLA_GENERAL if general else None)
+    if plantilla is None:
+        return None
+    return plantilla.renderizar({**valores, "nombre": candidate.get("Nombre")})
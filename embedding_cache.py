@@ -0,0 +1,147 @@
+import sqlite3
+import hashlib
+import time
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+# Máximo de parámetros por consulta IN (...) que admite SQLite en versiones antiguas
+_SQLITE_MAX_PARAMS = 900
+
+# =============================================================================
+# Caché persistente de embeddings en cv_database.db.
+# Clave: (modelo, sha256 del page_content). Valor: vector float32 como BLOB.
+# =============================================================================
+def hash_texto(texto):
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()
+
+class EmbeddingCache:
+    def __init__(self, db_name="cv_database.db"):
+        self.db_name = db_name
+        conn = self._connect()
+        try:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS embedding_cache (
+                    model TEXT NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    dim INTEGER NOT NULL,
+                    vector BLOB NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (model, content_hash)
+                ) WITHOUT ROWID
+            """)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _connect(self):
+        # Una conexión por operación: el caché se usa desde los hilos de Gradio
+        return sqlite3.connect(self.db_name, timeout=30)
+
+    def get_many(self, model, hashes):
+        """Devuelve {hash: np.ndarray float32} para los hashes presentes en el caché."""
+        hashes = list(dict.fromkeys(hashes))
+        encontrados = {}
+        conn = self._connect()
+        try:
+            for i in range(0, len(hashes), _SQLITE_MAX_PARAMS):
+                bloque = hashes[i : i + _SQLITE_MAX_PARAMS]
+                marcadores = ",".join("?" * len(bloque))
+                filas = conn.execute(
+                    f"SELECT content_hash, dim, vector FROM embedding_cache "
+                    f"WHERE model = ? AND content_hash IN ({marcadores})",
+                    [model, *bloque]
+                ).fetchall()
+                for content_hash, dim, blob in filas:
+                    vector = np.frombuffer(blob, dtype=np.float32)
+                    if vector.shape[0] == dim:
+                        encontrados[content_hash] = vector
+        finally:
+            conn.close()
+        return encontrados
+
+    def put_many(self, model, vectores):
+        """Guarda {hash: vector} en una sola transacción."""
+        if not vectores:
+            return
+        ahora = time.time()
+        filas = []
+        for content_hash, vector in vectores.items():
+            arr = np.asarray(vector, dtype=np.float32)
+            filas.append((model, content_hash, int(arr.shape[0]), arr.tobytes(), ahora))
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO embedding_cache (model, content_hash, dim, vector, created_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    filas
+                )
+        finally:
+            conn.close()
+
+    def evict_other_models(self, modelos_configurados):
+        """Elimina los vectores de modelos que ya no están configurados. Devuelve las filas borradas."""
+        modelos = list(modelos_configurados)
+        conn = self._connect()
+        try:
+            with conn:
+                if modelos:
+                    marcadores = ",".join("?" * len(modelos))
+                    cur = conn.execute(
+                        f"DELETE FROM embedding_cache WHERE model NOT IN ({marcadores})", modelos
+                    )
+                else:
+                    cur = conn.execute("DELETE FROM embedding_cache")
+                return cur.rowcount
+        finally:
+            conn.close()
+
+    def count(self, model=None):
+        conn = self._connect()
+        try:
+            if model is None:
+                return conn.execute("SELECT COUNT(*) FROM embedding_cache").fetchone()[0]
+            return conn.execute(
+                "SELECT COUNT(*) FROM embedding_cache WHERE model = ?", (model,)
+            ).fetchone()[0]
+        finally:
+            conn.close()
+
+# =============================================================================
+# Envoltorio de LangChain: solo calcula los embeddings que faltan en el caché.
+# =============================================================================
+class CachedEmbeddings(Embeddings):
+    def __init__(self, base, cache, model_name):
+        self.base = base
+        self.cache = cache
+        self.model_name = model_name
+
+    def embed_documents(self, texts):
+        return self.embed_documents_array(texts).tolist()
+
+    def embed_documents_array(self, texts):
+        """Igual que embed_documents, pero devuelve una matriz float32 contigua (n, dim)."""
+        hashes = [hash_texto(t) for t in texts]
+        encontrados = self.cache.get_many(self.model_name, hashes)
+
+        pendientes = {}
+        for h, texto in zip(hashes, texts):
+            if h not in encontrados and h not in pendientes:
+                pendientes[h] = texto
+        print(f"🗃️ Embeddings en caché: {len(texts) - len(pendientes)}/{len(texts)}")
+
+        if pendientes:
+            nuevos = self.base.embed_documents(list(pendientes.values()))
+            calculados = {h: np.asarray(v, dtype=np.float32) for h, v in zip(pendientes.keys(), nuevos)}
+            self.cache.put_many(self.model_name, calculados)
+            encontrados.update(calculados)
+
+        if not hashes:
+            return np.empty((0, 0), dtype=np.float32)
+        matriz = np.empty((len(hashes), encontrados[hashes[0]].shape[0]), dtype=np.float32)
+        for i, h in enumerate(hashes):
+            matriz[i] = encontrados[h]
+        return matriz
+
+    def embed_query(self, text):
+        return self.base.embed_query(text)
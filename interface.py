@@ -1,5 +1,6 @@
 import gradio as gr
 from search_ui import search_interface
+from config import GRADIO_CONCURRENCY_LIMIT, GRADIO_MAX_QUEUE
 
 def main_interface():
     # ✅ CSS mejorado
@@ -197,4 +198,5 @@ def main_interface():
 
 if __name__ == "__main__":
     app = main_interface()
+    app.queue(default_concurrency_limit=GRADIO_CONCURRENCY_LIMIT, max_size=GRADIO_MAX_QUEUE)
     app.launch(server_name="0.0.0.0", server_port=7860)
@@ -0,0 +1,147 @@
+import re
+import sqlite3
+import threading
+import unicodedata
+from config import RRF_K
+from structured_filters import condicion_sql, asegurar_filtros_una_vez
+
+# =============================================================================
+# Índice léxico FTS5 sobre la tabla 'cv' (tabla de contenido externo: no
+# duplica el texto, solo el índice invertido). Unos triggers lo mantienen
+# sincronizado con cada INSERT/UPDATE/DELETE en 'cv'.
+# =============================================================================
+FTS_COLUMNS = ("habilidades", "idiomas", "experiencia", "resumen")
+# Peso de cada columna en bm25(): una coincidencia en habilidades/idiomas cuenta más
+FTS_WEIGHTS = (2.0, 2.0, 1.0, 1.0)
+
+FTS_SCHEMA = (
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS cv_fts USING fts5(
+        {", ".join(FTS_COLUMNS)},
+        content='cv', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS cv_fts_ai AFTER INSERT ON cv BEGIN
+        INSERT INTO cv_fts(rowid, {", ".join(FTS_COLUMNS)})
+        VALUES (new.id, {", ".join(f"new.{c}" for c in FTS_COLUMNS)});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS cv_fts_ad AFTER DELETE ON cv BEGIN
+        INSERT INTO cv_fts(cv_fts, rowid, {", ".join(FTS_COLUMNS)})
+        VALUES ('delete', old.id, {", ".join(f"old.{c}" for c in FTS_COLUMNS)});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS cv_fts_au AFTER UPDATE ON cv BEGIN
+        INSERT INTO cv_fts(cv_fts, rowid, {", ".join(FTS_COLUMNS)})
+        VALUES ('delete', old.id, {", ".join(f"old.{c}" for c in FTS_COLUMNS)});
+        INSERT INTO cv_fts(rowid, {", ".join(FTS_COLUMNS)})
+        VALUES (new.id, {", ".join(f"new.{c}" for c in FTS_COLUMNS)});
+    END
+    """,
+)
+
+# Palabras vacías que no aportan a la búsqueda léxica
+STOPWORDS = {
+    "a", "al", "con", "de", "del", "el", "en", "la", "las", "lo", "los", "o", "para",
+    "por", "que", "se", "sin", "su", "un", "una", "y", "e", "u", "como", "mas", "muy",
+    "nivel", "buscamos", "busco", "experiencia", "conocimientos", "perfil", "puesto",
+    "anos", "minimo", "valorable", "the", "and", "of", "with", "in", "for",
+}
+
+_fts_listo = set()
+_fts_lock = threading.Lock()
+
+def asegurar_fts(conn):
+    """Crea el índice FTS5 y sus triggers si no existen; si se acaban de crear, lo llena desde 'cv'."""
+    existia = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'cv_fts'"
+    ).fetchone() is not None
+    for sentencia in FTS_SCHEMA:
+        conn.execute(sentencia)
+    if not existia:
+        print("ℹ️ Creando índice léxico FTS5 (cv_fts)...")
+        conn.execute("INSERT INTO cv_fts(cv_fts) VALUES ('rebuild')")
+    if conn.in_transaction:
+        conn.commit()
+
+def _asegurar_fts_una_vez(db_name):
+    with _fts_lock:
+        if db_name in _fts_listo:
+            return
+        conn = sqlite3.connect(db_name, timeout=30)
+        try:
+            asegurar_fts(conn)
+        finally:
+            conn.close()
+        _fts_listo.add(db_name)
+
+def _sin_acentos(texto):
+    return "".join(
+        c for c in unicodedata.normalize("NFD", texto) if unicodedata.category(c) != "Mn"
+    )
+
+def consulta_fts(texto):
+    """
+    Convierte la descripción del puesto en una consulta FTS5: términos entre
+    comillas unidos con OR y con búsqueda por prefijo ("franc"* encuentra "Francés").
+    """
+    terminos = []
+    for palabra in re.findall(r"\w+", texto.lower()):
+        if len(palabra) < 2 or _sin_acentos(palabra) in STOPWORDS or palabra.isdigit():
+            continue
+        if palabra not in terminos:
+            terminos.append(palabra)
+    return " OR ".join(f'"{t}"*' for t in terminos)
+
+def buscar_bm25(texto, top_k=40, db_name="cv_database.db", filtros=None):
+    """
+    Devuelve [(id, puntuación bm25)] ordenado por relevancia (bm25 más bajo = mejor).
+    Con 'filtros' solo se consideran los CVs que cumplen los filtros estructurados.
+    """
+    consulta = consulta_fts(texto)
+    if not consulta:
+        return []
+    _asegurar_fts_una_vez(db_name)
+    condicion, parametros = "1", []
+    if filtros:
+        asegurar_filtros_una_vez(db_name)
+        condicion, parametros = condicion_sql(filtros)
+        condicion = f"rowid IN (SELECT id FROM cv WHERE {condicion})"
+    conn = sqlite3.connect(db_name, timeout=30)
+    try:
+        filas = conn.execute(
+            f"""
+            SELECT rowid, bm25(cv_fts, {", ".join(str(p) for p in FTS_WEIGHTS)}) AS puntuacion
+            FROM cv_fts WHERE cv_fts MATCH ? AND {condicion}
+            ORDER BY puntuacion LIMIT ?
+            """,
+            (consulta, *parametros, top_k)
+        ).fetchall()
+    except sqlite3.OperationalError as e:
+        print(f"⚠️ Error en la búsqueda léxica: {e}")
+        return []
+    finally:
+        conn.close()
+    return [(str(cv_id), float(puntuacion)) for cv_id, puntuacion in filas]
+
+def fusion_rrf(ids_vectorial, ids_lexico, peso_lexico=0.5, k=RRF_K):
+    """
+    Reciprocal Rank Fusion ponderada: cada lista aporta peso / (k + posición).
+    peso_lexico=0 reproduce el orden de FAISS; 1 el de BM25.
+    Devuelve [(id, puntuación)] de mayor a menor.
+    """
+    puntuaciones = {}
+    for peso, ids in ((1.0 - peso_lexico, ids_vectorial), (peso_lexico, ids_lexico)):
+        if peso <= 0:
+            continue
+        for posicion, cv_id in enumerate(ids, start=1):
+            puntuaciones[cv_id] = puntuaciones.get(cv_id, 0.0) + peso / (k + posicion)
+    # Empates: se mantiene el orden de FAISS y después el de BM25
+    primero = {}
+    for i, cv_id in enumerate(list(ids_vectorial) + list(ids_lexico)):
+        primero.setdefault(cv_id, i)
+    return sorted(puntuaciones.items(), key=lambda item: (-item[1], primero[item[0]]))
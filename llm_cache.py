@@ -0,0 +1,108 @@
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import Counter
+from config import LLM_CACHE_DB, LLM_CACHE_TTL, LLM_CACHE_MAX_ENTRIES
+
+# =============================================================================
+# Caché en disco de respuestas del LLM, direccionado por contenido:
+# clave = sha256(modelo, temperatura, mensajes). Las entradas caducan tras
+# LLM_CACHE_TTL segundos y, por encima de LLM_CACHE_MAX_ENTRIES, se eliminan
+# las menos usadas recientemente.
+# =============================================================================
+class LLMResponseCache:
+    def __init__(self, db_name=LLM_CACHE_DB, ttl=LLM_CACHE_TTL, max_entries=LLM_CACHE_MAX_ENTRIES):
+        self.db_name = db_name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = Counter()
+        self.misses = Counter()
+        self._lock = threading.Lock()
+        conn = self._connect()
+        try:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    temperature REAL NOT NULL,
+                    response TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_access ON llm_cache(last_access)")
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_name, timeout=30)
+
+    @staticmethod
+    def clave(model, temperature, messages):
+        contenido = json.dumps([model, temperature, messages], ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(contenido.encode("utf-8")).hexdigest()
+
+    def get(self, model, temperature, messages, sitio="general"):
+        """Devuelve la respuesta cacheada o None. 'sitio' identifica la llamada en los contadores."""
+        key = self.clave(model, temperature, messages)
+        ahora = time.time()
+        conn = self._connect()
+        try:
+            fila = conn.execute(
+                "SELECT response, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if fila is None or fila[1] + self.ttl < ahora:
+                with self._lock:
+                    self.misses[sitio] += 1
+                return None
+            with conn:
+                conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (ahora, key))
+        finally:
+            conn.close()
+        with self._lock:
+            self.hits[sitio] += 1
+        return fila[0]
+
+    def put(self, model, temperature, messages, response):
+        key = self.clave(model, temperature, messages)
+        ahora = time.time()
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, model, temperature, response, created_at, last_access) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, model, temperature, response, ahora, ahora)
+                )
+                self._evict(conn, ahora)
+        finally:
+            conn.close()
+
+    def _evict(self, conn, ahora):
+        conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (ahora - self.ttl,))
+        sobrantes = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0] - self.max_entries
+        if sobrantes > 0:
+            conn.execute("""
+                DELETE FROM llm_cache WHERE key IN (
+                    SELECT key FROM llm_cache ORDER BY last_access LIMIT ?
+                )
+            """, (sobrantes,))
+
+    def stats(self):
+        """Aciertos y fallos por sitio de llamada."""
+        with self._lock:
+            sitios = set(self.hits) | set(self.misses)
+            return {s: {"hits": self.hits[s], "misses": self.misses[s]} for s in sorted(sitios)}
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_llm_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMResponseCache()
+        return _cache
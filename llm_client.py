@@ -0,0 +1,237 @@
+import os
+import json
+import asyncio
+import random
+import logging
+import threading
+import weakref
+import aiohttp
+from dotenv import load_dotenv
+from config import LLM_BASE_URL, LLM_TIMEOUT, LLM_MAX_RETRIES, LLM_POOL_SIZE
+
+load_dotenv("key.env", override=True)
+
+# Códigos HTTP que se reintentan (límite de tasa y errores del servidor)
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+class LLMError(Exception):
+    """Error definitivo de la API del LLM (tras agotar los reintentos)."""
+    def __init__(self, mensaje, status=None, detalle=None):
+        super().__init__(mensaje)
+        self.status = status
+        self.detalle = detalle if detalle is not None else {"error": mensaje}
+
+# =============================================================================
+# Cliente HTTP reutilizable para la API de chat completions (OpenAI o compatible).
+# Mantiene un pool de conexiones por bucle de eventos y reintenta con backoff
+# exponencial y jitter ante 429/5xx. El plazo ('timeout') es de la llamada
+# completa: cada intento recibe el tiempo que queda y no se reintenta si la
+# espera ya no cabe.
+# =============================================================================
+class LLMClient:
+    def __init__(self, api_key=None, base_url=LLM_BASE_URL, timeout=LLM_TIMEOUT,
+                 max_retries=LLM_MAX_RETRIES, pool_size=LLM_POOL_SIZE,
+                 backoff_base=0.5, backoff_max=8.0):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.pool_size = pool_size
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        # Las sesiones de aiohttp están ligadas a su bucle de eventos: una por bucle
+        self._sessions = weakref.WeakKeyDictionary()
+
+    def _get_session(self):
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get(loop)
+        if session is None or session.closed:
+            headers = {"Content-Type": "application/json"}
+            if self.api_key:
+                headers["Authorization"] = f"Bearer {self.api_key.strip()}"
+            session = aiohttp.ClientSession(
+                headers=headers,
+                connector=aiohttp.TCPConnector(limit=self.pool_size, ttl_dns_cache=300),
+            )
+            self._sessions[loop] = session
+        return session
+
+    def _backoff(self, intento, retry_after=None):
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        # "Full jitter": espera aleatoria entre 0 y el tope exponencial
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** intento)))
+
+    def _espera_reintento(self, intento, limite, retry_after=None):
+        """Segundos hasta el siguiente intento, o None si ya no caben antes de 'limite' (loop.time())."""
+        espera = self._backoff(intento, retry_after)
+        if asyncio.get_running_loop().time() + espera >= limite:
+            return None
+        return espera
+
+    async def chat(self, messages, model, max_tokens=800, temperature=0.5, timeout=None):
+        """
+        Envía una conversación y devuelve el texto de la respuesta. 'timeout'
+        (por defecto LLM_TIMEOUT) limita la llamada entera, reintentos incluidos.
+        """
+        payload = {
+            "model": model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature
+        }
+        url = f"{self.base_url}/chat/completions"
+        session = self._get_session()
+        loop = asyncio.get_running_loop()
+        limite = loop.time() + (timeout or self.timeout)
+
+        for intento in range(self.max_retries + 1):
+            ultimo = intento == self.max_retries
+            plazo = aiohttp.ClientTimeout(total=max(0.001, limite - loop.time()))
+            try:
+                async with session.post(url, json=payload, timeout=plazo) as response:
+                    if response.status == 200:
+                        return self._contenido(await response.text())
+                    texto = await response.text()
+                    espera = None
+                    if response.status in RETRY_STATUS and not ultimo:
+                        espera = self._espera_reintento(intento, limite, response.headers.get("Retry-After"))
+                    if espera is not None:
+                        logging.warning("LLM respondió %s; reintento %d en %.2fs", response.status, intento + 1, espera)
+                        await asyncio.sleep(espera)
+                        continue
+                    try:
+                        detalle = await response.json(content_type=None)
+                    except Exception:
+                        detalle = {"error": texto}
+                    raise LLMError(f"La API respondió {response.status}", status=response.status, detalle=detalle)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                espera = None if ultimo else self._espera_reintento(intento, limite)
+                if espera is None:
+                    raise LLMError(f"Fallo de conexión con la API: {type(e).__name__}: {e}") from e
+                logging.warning("Error de red con el LLM (%s); reintento %d en %.2fs", e, intento + 1, espera)
+                await asyncio.sleep(espera)
+
+    async def stream(self, messages, model, max_tokens=800, temperature=0.5, timeout=None):
+        """
+        Igual que chat() pero con "stream": true: genera los fragmentos de texto
+        según llegan (Server-Sent Events). Solo se reintenta antes del primer
+        fragmento y dentro de 'timeout'; una vez emitido texto, un fallo se
+        propaga como LLMError.
+        """
+        payload = {
+            "model": model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "stream": True
+        }
+        url = f"{self.base_url}/chat/completions"
+        session = self._get_session()
+        loop = asyncio.get_running_loop()
+        # Los reintentos tienen que caber en 'timeout'; una vez conectados, el
+        # plazo se aplica entre fragmentos, no a la respuesta completa
+        limite = loop.time() + (timeout or self.timeout)
+
+        for intento in range(self.max_retries + 1):
+            ultimo = intento == self.max_retries
+            emitido = False
+            plazo = aiohttp.ClientTimeout(total=None, sock_connect=max(0.001, limite - loop.time()),
+                                          sock_read=timeout or self.timeout)
+            try:
+                async with session.post(url, json=payload, timeout=plazo) as response:
+                    if response.status != 200:
+                        texto = await response.text()
+                        espera = None
+                        if response.status in RETRY_STATUS and not ultimo:
+                            espera = self._espera_reintento(intento, limite, response.headers.get("Retry-After"))
+                        if espera is not None:
+                            logging.warning("LLM respondió %s; reintento %d en %.2fs", response.status, intento + 1, espera)
+                            await asyncio.sleep(espera)
+                            continue
+                        try:
+                            detalle = await response.json(content_type=None)
+                        except Exception:
+                            detalle = {"error": texto}
+                        raise LLMError(f"La API respondió {response.status}", status=response.status, detalle=detalle)
+
+                    async for linea in response.content:
+                        fragmento = self._parse_sse(linea)
+                        if fragmento is None:
+                            return
+                        if fragmento:
+                            emitido = True
+                            yield fragmento
+                    return
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                espera = None if ultimo or emitido else self._espera_reintento(intento, limite)
+                if espera is None:
+                    raise LLMError(f"Fallo de conexión con la API: {type(e).__name__}: {e}") from e
+                logging.warning("Error de red con el LLM (%s); reintento %d en %.2fs", e, intento + 1, espera)
+                await asyncio.sleep(espera)
+
+    @staticmethod
+    def _contenido(texto):
+        """Texto de la respuesta de chat(); un cuerpo inesperado se convierte en LLMError."""
+        try:
+            return json.loads(texto)["choices"][0]["message"]["content"]
+        except (ValueError, KeyError, IndexError, TypeError) as e:
+            raise LLMError(f"Respuesta inesperada de la API: {type(e).__name__}: {e}",
+                           status=200, detalle={"error": texto[:1000]}) from e
+
+    @staticmethod
+    def _parse_sse(linea):
+        """
+        Interpreta una línea SSE. Devuelve el texto del fragmento ("" si la línea
+        no aporta texto) o None al recibir "[DONE]".
+        """
+        linea = linea.decode("utf-8", errors="replace").strip()
+        if not linea.startswith("data:"):
+            return ""
+        datos = linea[len("data:"):].strip()
+        if datos == "[DONE]":
+            return None
+        try:
+            evento = json.loads(datos)
+        except json.JSONDecodeError:
+            logging.warning("Fragmento SSE no válido: %r", datos)
+            return ""
+        opciones = evento.get("choices") or [{}]
+        return (opciones[0].get("delta") or {}).get("content") or ""
+
+    async def aclose(self):
+        """Cierra la sesión del bucle actual; hay que llamarlo antes de que el bucle termine."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        session = self._sessions.pop(loop, None)
+        if session is not None and not session.closed:
+            await session.close()
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_llm_client():
+    """Cliente compartido por rerank, el agente de chat y la redacción de correos."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = LLMClient(api_key=os.getenv("OPENAI_API_KEY"))
+        return _client
+
+def ejecutar(corutina):
+    """
+    asyncio.run() que cierra la sesión del cliente compartido antes de que
+    termine el bucle, para los scripts que lo usan fuera de Gradio.
+    """
+    async def con_cierre():
+        try:
+            return await corutina
+        finally:
+            if _client is not None:
+                await _client.aclose()
+    return asyncio.run(con_cierre())
@@ -1,26 +1,101 @@
+import os
+import glob
+import queue
 import sqlite3
 import re
+import time
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import unicodedata
+from lexical_search import asegurar_fts
+from cambios_cv import asegurar_contador_cambios
+from structured_filters import DERIVED_FIELDS, atributos_derivados, asegurar_filtros
 
-# Conectar a la base de datos
-conn = sqlite3.connect("cv_database.db")
-cursor = conn.cursor()
+# Frontera entre perfiles: "ID: <número> Nombre:"
+PROFILE_BOUNDARY = re.compile(r"(?=ID:\s+\d+\s+Nombre:)")
+# Tamaño de lectura del fichero (caracteres) y filas por transacción
+READ_CHUNK_SIZE = 64 * 1024
+INSERT_CHUNK_SIZE = 1000
+
+# PRAGMAs para la carga masiva: WAL + synchronous=NORMAL evitan un fsync por transacción
+INGEST_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-65536",
+)
+
+CV_FIELDS = ("nombre", "email", "telefono", "educacion", "experiencia",
+             "habilidades", "idiomas", "resumen", "ubicacion")
+
+# Campos que se escriben: los extraídos del TXT y los derivados para los filtros estructurados
+ROW_FIELDS = CV_FIELDS + DERIVED_FIELDS
+
+# Upsert por huella: reimportar un CV actualizado lo reemplaza en su sitio (mismo id).
+# El WHERE evita reescribir filas que no han cambiado.
+INSERT_SQL = f"""
+    INSERT INTO cv (huella, {", ".join(ROW_FIELDS)})
+    VALUES ({", ".join("?" * (len(ROW_FIELDS) + 1))})
+    ON CONFLICT(huella) DO UPDATE SET
+        {", ".join(f"{c}=excluded.{c}" for c in ROW_FIELDS)}
+    WHERE ({", ".join(f"cv.{c}" for c in ROW_FIELDS)})
+        IS NOT ({", ".join(f"excluded.{c}" for c in ROW_FIELDS)})
+"""
 
 # Crear tabla (incluyendo la columna "ubicacion")
-cursor.execute("DROP TABLE IF EXISTS cv")
-cursor.execute("""
-    CREATE TABLE cv (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        nombre TEXT,
-        email TEXT,
-        telefono TEXT,
-        educacion TEXT,
-        experiencia TEXT,
-        habilidades TEXT,
-        idiomas TEXT,
-        resumen TEXT,
-        ubicacion TEXT
-    )
-""")
+def crear_tabla(cursor):
+    cursor.execute("DROP TABLE IF EXISTS cv_fts")
+    cursor.execute("DROP TABLE IF EXISTS cv_idioma")
+    cursor.execute("DROP TABLE IF EXISTS cv")
+    cursor.execute("""
+        CREATE TABLE cv (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nombre TEXT,
+            email TEXT,
+            telefono TEXT,
+            educacion TEXT,
+            experiencia TEXT,
+            habilidades TEXT,
+            idiomas TEXT,
+            resumen TEXT,
+            ubicacion TEXT,
+            huella TEXT
+        )
+    """)
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_cv_huella ON cv(huella)")
+
+# Añadir la columna 'huella' y su índice único a una tabla 'cv' creada por versiones anteriores
+def asegurar_esquema(conn):
+    columnas = {fila[1] for fila in conn.execute("PRAGMA table_info(cv)")}
+    if not columnas:
+        crear_tabla(conn.cursor())
+        return
+    if "huella" in columnas:
+        conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_cv_huella ON cv(huella)")
+        return
+    print("ℹ️ Migrando tabla 'cv': añadiendo columna 'huella'...")
+    conn.execute("BEGIN")
+    try:
+        conn.execute("ALTER TABLE cv ADD COLUMN huella TEXT")
+        filas = conn.execute("SELECT id, nombre, email, telefono FROM cv").fetchall()
+        conn.executemany(
+            "UPDATE cv SET huella = ? WHERE id = ?",
+            [
+                (fingerprint({"nombre": nombre, "email": email, "telefono": telefono}), cv_id)
+                for cv_id, nombre, email, telefono in filas
+            ]
+        )
+        # Los duplicados existentes se resuelven conservando la fila más antigua
+        conn.execute("""
+            DELETE FROM cv WHERE id NOT IN (SELECT MIN(id) FROM cv GROUP BY huella)
+        """)
+        conn.execute("CREATE UNIQUE INDEX idx_cv_huella ON cv(huella)")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
 
 # Leer archivo TXT
 def read_txt_file(filename):
@@ -35,7 +110,27 @@ def preprocess_text(text):
 
 # Dividir perfiles en base al patrón de "ID: <número> Nombre:"
 def split_profiles(text):
-    return re.split(r"(?=ID:\s+\d+\s+Nombre:)", text)
+    return PROFILE_BOUNDARY.split(text)
+
+# Generar perfiles uno a uno desde un fichero abierto, con memoria acotada.
+# Produce los mismos fragmentos que split_profiles sobre el fichero completo
+# (salvo el fragmento vacío inicial).
+def iter_profiles(file, chunk_size=READ_CHUNK_SIZE):
+    buffer = ""
+    while True:
+        chunk = file.read(chunk_size)
+        if not chunk:
+            break
+        buffer += chunk
+        inicio = 0
+        # Solo se corta en fronteras completas; el resto queda en el buffer
+        for match in PROFILE_BOUNDARY.finditer(buffer, 1):
+            if match.start() > inicio:
+                yield buffer[inicio:match.start()]
+            inicio = match.start()
+        buffer = buffer[inicio:]
+    if buffer:
+        yield buffer
 
 # Normalizar texto (convertir a minúsculas y eliminar espacios adicionales)
 def normalize_text(value):
@@ -43,8 +138,53 @@ def normalize_text(value):
         return value.strip().lower()
     return "no especificado"
 
-# Extraer datos usando expresiones regulares (incluyendo ubicación)
+# Etiquetas de los campos en el orden en que aparecen en cada perfil
+FIELD_LABELS = (
+    ("nombre", "Nombre:"),
+    ("email", "Email:"),
+    ("telefono", "Teléfono:"),
+    ("educacion", "Educación:"),
+    ("experiencia", "Experiencia:"),
+    ("habilidades", "Habilidades:"),
+    ("idiomas", "Idiomas:"),
+    ("resumen", "Resumen:"),
+    ("ubicacion", "Ubicación:"),
+)
+FIELD_TOKENIZER = re.compile("|".join(re.escape(label) for _, label in FIELD_LABELS))
+_EXPECTED_LABELS = tuple(label for _, label in FIELD_LABELS)
+# Campos que extract_data_regex busca con re.DOTALL (pueden contener saltos de línea)
+_MULTILINE_FIELDS = {"educacion", "experiencia", "resumen", "ubicacion"}
+
+# Extraer datos en una sola pasada: se localizan todas las etiquetas de izquierda
+# a derecha y cada valor es el texto entre su etiqueta y la siguiente.
+# Si el perfil no tiene la forma habitual (etiquetas ausentes, repetidas o
+# desordenadas, valores sin separación), se usa extract_data_regex, de modo
+# que el resultado es siempre idéntico al de la versión con expresiones regulares.
 def extract_data(profile):
+    etiquetas = list(FIELD_TOKENIZER.finditer(profile))
+    if tuple(m.group() for m in etiquetas) != _EXPECTED_LABELS:
+        return extract_data_regex(profile)
+
+    data = {}
+    ultimo = len(etiquetas) - 1
+    for i, (campo, _) in enumerate(FIELD_LABELS):
+        fin = etiquetas[i + 1].start() if i < ultimo else len(profile)
+        valor = profile[etiquetas[i].end():fin]
+        # La versión regex exige espacio tras la etiqueta y, salvo en el último
+        # campo, también antes de la siguiente etiqueta
+        if not valor[:1].isspace():
+            return extract_data_regex(profile)
+        if i < ultimo and (len(valor) < 2 or not valor[-1].isspace()):
+            return extract_data_regex(profile)
+        valor = valor.strip()
+        if campo not in _MULTILINE_FIELDS and "\n" in valor:
+            return extract_data_regex(profile)
+        data[campo] = normalize_text(valor)
+    return data
+
+# Extraer datos usando expresiones regulares (incluyendo ubicación).
+# Implementación de referencia: extract_data recurre a ella en los casos atípicos.
+def extract_data_regex(profile):
     nombre = re.search(r"Nombre:\s+(.*?)\s+Email:", profile)
     email = re.search(r"Email:\s+(.*?)\s+Teléfono:", profile)
     telefono = re.search(r"Teléfono:\s+(.*?)\s+Educación:", profile)
@@ -69,45 +209,270 @@ def extract_data(profile):
         "ubicacion": normalize_text(ubicacion.group(1)) if ubicacion else "no especificado"
     }
 
-# Verificar duplicados usando múltiples campos
-def is_duplicate(cursor, data):
-    cursor.execute("""
-        SELECT COUNT(*) FROM cv WHERE 
-        nombre=? AND email=? AND telefono=? AND educacion=? AND experiencia=?
-    """, (data['nombre'], data['email'], data['telefono'], 
-          data['educacion'], data['experiencia']))
-    return cursor.fetchone()[0] > 0
-
-# Procesar archivo TXT
-txt_content = read_txt_file("Base_datos_final.txt")
-profiles = split_profiles(txt_content)
-
-# Insertar datos en la base de datos
-for profile in profiles:
-    profile = preprocess_text(profile)
-    data = extract_data(profile)
-
-    # Validar datos antes de insertar
-    if data['nombre'] != "no especificado" and data['email'] != "no especificado":
-        if not is_duplicate(cursor, data):
-            cursor.execute("""
-                INSERT INTO cv (nombre, email, telefono, educacion, experiencia, habilidades, idiomas, resumen, ubicacion)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                data['nombre'],
-                data['email'],
-                data['telefono'],
-                data['educacion'],
-                data['experiencia'],
-                data['habilidades'],
-                data['idiomas'],
-                data['resumen'],
-                data['ubicacion']
-            ))
-
-# Confirmar cambios en la base de datos
-conn.commit()
-print("✅ Base de datos creada y registros insertados exitosamente.")
-
-# Cerrar conexión
-conn.close()
+# Huella normalizada de la identidad del candidato (nombre + email + teléfono):
+# sin acentos ni espacios redundantes, y el teléfono solo con dígitos.
+# Es la clave única de la tabla 'cv'.
+def fingerprint(data):
+    partes = []
+    for campo in ("nombre", "email"):
+        valor = unicodedata.normalize("NFKD", (data.get(campo) or "").lower())
+        valor = "".join(c for c in valor if not unicodedata.combining(c))
+        partes.append(re.sub(r"\s+", " ", valor).strip())
+    partes.append(re.sub(r"\D", "", data.get("telefono") or ""))
+    return hashlib.sha1("|".join(partes).encode("utf-8")).hexdigest()
+
+def row_from_data(data):
+    return (
+        fingerprint(data),
+        data['nombre'],
+        data['email'],
+        data['telefono'],
+        data['educacion'],
+        data['experiencia'],
+        data['habilidades'],
+        data['idiomas'],
+        data['resumen'],
+        data['ubicacion']
+    ) + atributos_derivados(data)
+
+def apply_pragmas(conn):
+    for pragma in INGEST_PRAGMAS:
+        conn.execute(pragma)
+
+def insert_batch(conn, rows):
+    """
+    Inserta un lote de filas dentro de una transacción explícita y devuelve
+    cuántas se insertaron o actualizaron (sin contar los cambios de los triggers).
+    """
+    conn.execute("BEGIN")
+    try:
+        escritos = conn.executemany(INSERT_SQL, rows).rowcount
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return escritos
+
+# Filas listas para insertar a partir de un fichero abierto; actualiza 'stats'
+# con los perfiles leídos y los descartados por no tener nombre o email.
+def iter_rows(file, stats):
+    for profile in iter_profiles(file):
+        profile = preprocess_text(profile)
+        if not profile:
+            continue
+        stats["perfiles"] += 1
+        data = extract_data(profile)
+
+        # Validar datos antes de insertar
+        if data['nombre'] == "no especificado" or data['email'] == "no especificado":
+            stats["descartados"] += 1
+            continue
+        yield row_from_data(data)
+
+def open_db(db_name, reset):
+    # isolation_level=None: las transacciones se controlan explícitamente en insert_batch
+    conn = sqlite3.connect(db_name, isolation_level=None)
+    apply_pragmas(conn)
+    if reset:
+        crear_tabla(conn.cursor())
+    else:
+        asegurar_esquema(conn)
+    # Columnas de filtros estructurados e índice léxico FTS5, sincronizados con 'cv'
+    asegurar_filtros(conn)
+    asegurar_fts(conn)
+    # Contador de cambios para la huella del índice FAISS; tras un reset se recrean sus triggers
+    asegurar_contador_cambios(conn)
+    return conn
+
+# =============================================================================
+# Carga en streaming de un fichero TXT a la base de datos.
+# =============================================================================
+def ingest_file(filename="Base_datos_final.txt", db_name="cv_database.db",
+                chunk_size=INSERT_CHUNK_SIZE, reset=True):
+    """
+    Lee el fichero perfil a perfil, valida y hace upsert por huella en lotes de
+    'chunk_size' filas. Devuelve un diccionario con las estadísticas.
+    """
+    conn = open_db(db_name, reset)
+    stats = {"perfiles": 0, "escritos": 0, "sin_cambios": 0, "descartados": 0}
+    procesados = 0
+    pendientes = []
+    inicio = time.perf_counter()
+    try:
+        with open(filename, "r", encoding="utf-8") as file:
+            for row in iter_rows(file, stats):
+                pendientes.append(row)
+                if len(pendientes) >= chunk_size:
+                    stats["escritos"] += insert_batch(conn, pendientes)
+                    procesados += len(pendientes)
+                    pendientes = []
+                    segundos = time.perf_counter() - inicio
+                    print(f"🔄 {procesados} registros procesados ({procesados / segundos:.0f} filas/s)")
+
+        if pendientes:
+            stats["escritos"] += insert_batch(conn, pendientes)
+            procesados += len(pendientes)
+        # Solo cuentan las inserciones y actualizaciones efectivas (no las filas sin cambios)
+        stats["sin_cambios"] = procesados - stats["escritos"]
+    finally:
+        conn.close()
+
+    segundos = time.perf_counter() - inicio
+    stats["segundos"] = round(segundos, 2)
+    stats["filas_por_segundo"] = round(procesados / segundos, 1) if segundos > 0 else 0.0
+    print(
+        f"✅ {stats['escritos']} registros insertados o actualizados de {stats['perfiles']} perfiles "
+        f"({stats['sin_cambios']} sin cambios o repetidos, {stats['descartados']} sin nombre/email) "
+        f"en {stats['segundos']}s ({stats['filas_por_segundo']} filas/s)."
+    )
+    return stats
+
+# =============================================================================
+# Carga en paralelo de varios ficheros: un pool de procesos parsea y un único
+# escritor (el proceso principal) inserta en SQLite.
+# =============================================================================
+def expand_paths(entradas):
+    """Admite ficheros, directorios (se toman sus *.txt) y patrones glob."""
+    ficheros = []
+    for entrada in entradas:
+        if os.path.isdir(entrada):
+            ficheros.extend(sorted(glob.glob(os.path.join(entrada, "*.txt"))))
+        elif glob.has_magic(entrada):
+            ficheros.extend(sorted(glob.glob(entrada, recursive=True)))
+        else:
+            ficheros.append(entrada)
+    # Sin repetir ficheros, conservando el orden
+    return list(dict.fromkeys(ficheros))
+
+def _parse_file_worker(filename, cola, chunk_size, cancelar=None):
+    """Proceso del pool: parsea un fichero y envía lotes de filas al escritor."""
+    stats = {"perfiles": 0, "descartados": 0}
+    try:
+        lote = []
+        with open(filename, "r", encoding="utf-8") as file:
+            for row in iter_rows(file, stats):
+                lote.append(row)
+                if len(lote) >= chunk_size:
+                    if cancelar is not None and cancelar.is_set():
+                        return
+                    # Bloquea si la cola está llena: el escritor marca el ritmo
+                    cola.put(("filas", filename, lote))
+                    lote = []
+        if lote:
+            cola.put(("filas", filename, lote))
+        cola.put(("fin", filename, stats, None))
+    except Exception as e:
+        cola.put(("fin", filename, stats, f"{type(e).__name__}: {e}"))
+
+def _detener_workers(futuros, cola, cancelar):
+    """
+    Si el escritor falla, los procesos pueden estar bloqueados en cola.put con
+    la cola llena y el shutdown del executor los esperaría para siempre: se
+    cancelan los pendientes, se avisa a los que corren y se vacía la cola
+    hasta que todos terminan.
+    """
+    cancelar.set()
+    for futuro in futuros:
+        futuro.cancel()
+    while not all(futuro.done() for futuro in futuros):
+        try:
+            cola.get(timeout=0.1)
+        except queue.Empty:
+            pass
+
+def _registrar_error(informe, filename, error):
+    informe["error"] = error
+    print(f"❌ {filename}: {error} (tras {informe['perfiles']} perfiles)")
+    # Los lotes del fichero se confirman según llegan: un fallo a mitad deja
+    # parte del fichero cargada. El upsert por huella permite repetir la carga.
+    confirmadas = informe["escritos"] + informe["sin_cambios"]
+    if confirmadas:
+        informe["parcial"] = True
+        print(f"⚠️ {filename}: carga parcial, {confirmadas} filas ya confirmadas. "
+              f"Corrige el fichero y vuelve a cargarlo con --actualizar (no se duplican CVs).")
+
+def ingest_paths(entradas, db_name="cv_database.db", workers=None,
+                 chunk_size=INSERT_CHUNK_SIZE, reset=False, max_queued_batches=8):
+    """
+    Parsea los ficheros en paralelo (ProcessPoolExecutor) y los inserta desde un
+    único escritor. La cola acotada a 'max_queued_batches' lotes aplica
+    contrapresión a los procesos si SQLite va más lento que el parseo.
+    Devuelve las estadísticas por fichero.
+    """
+    ficheros = expand_paths(entradas)
+    if not ficheros:
+        print("⚠️ No se encontraron ficheros para cargar.")
+        return {}
+    print(f"📂 {len(ficheros)} ficheros a cargar con {workers or os.cpu_count()} procesos.")
+
+    conn = open_db(db_name, reset)
+    informes = {f: {"perfiles": 0, "escritos": 0, "sin_cambios": 0, "descartados": 0, "error": None,
+                    "parcial": False}
+                for f in ficheros}
+    terminados = set()
+    inicio = time.perf_counter()
+    try:
+        with multiprocessing.Manager() as manager:
+            cola = manager.Queue(maxsize=max_queued_batches)
+            cancelar = manager.Event()
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futuros = {pool.submit(_parse_file_worker, f, cola, chunk_size, cancelar): f for f in ficheros}
+                try:
+                    while len(terminados) < len(ficheros):
+                        try:
+                            mensaje = cola.get(timeout=0.5)
+                        except queue.Empty:
+                            # Un proceso que muere sin avisar no debe bloquear al escritor
+                            for futuro, f in futuros.items():
+                                if f not in terminados and futuro.done() and futuro.exception():
+                                    terminados.add(f)
+                                    _registrar_error(informes[f], f, repr(futuro.exception()))
+                            continue
+
+                        if mensaje[0] == "filas":
+                            _, f, filas = mensaje
+                            escritos = insert_batch(conn, filas)
+                            informes[f]["escritos"] += escritos
+                            informes[f]["sin_cambios"] += len(filas) - escritos
+                        else:
+                            _, f, stats, error = mensaje
+                            informes[f].update(stats)
+                            terminados.add(f)
+                            if error:
+                                _registrar_error(informes[f], f, error)
+                            else:
+                                print(
+                                    f"📄 {f}: {stats['perfiles']} perfiles, {informes[f]['escritos']} escritos, "
+                                    f"{informes[f]['sin_cambios']} sin cambios, {stats['descartados']} descartados "
+                                    f"[{len(terminados)}/{len(ficheros)}]"
+                                )
+                except BaseException:
+                    _detener_workers(futuros, cola, cancelar)
+                    raise
+    finally:
+        conn.close()
+
+    segundos = time.perf_counter() - inicio
+    total = sum(i["escritos"] + i["sin_cambios"] for i in informes.values())
+    errores = sum(1 for i in informes.values() if i["error"])
+    print(
+        f"✅ {len(ficheros) - errores}/{len(ficheros)} ficheros cargados, {total} registros en "
+        f"{segundos:.2f}s ({total / segundos if segundos > 0 else 0:.0f} filas/s)."
+    )
+    return informes
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Carga de CVs en texto plano a SQLite.")
+    parser.add_argument("rutas", nargs="*", default=["Base_datos_final.txt"],
+                        help="Ficheros, directorios o patrones glob (por defecto Base_datos_final.txt)")
+    parser.add_argument("--db", default="cv_database.db")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Procesos de parseo para la carga de varios ficheros (por defecto, uno por núcleo)")
+    parser.add_argument("--actualizar", action="store_true",
+                        help="No borrar la tabla: insertar los CVs nuevos y reemplazar los existentes")
+    args = parser.parse_args()
+    ficheros = expand_paths(args.rutas)
+    if len(ficheros) == 1 and args.workers is None:
+        ingest_file(ficheros[0], db_name=args.db, reset=not args.actualizar)
+    else:
+        ingest_paths(ficheros, db_name=args.db, workers=args.workers, reset=not args.actualizar)
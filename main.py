@@ -1,29 +1,22 @@
 import gradio as gr
 import asyncio
-import json
-from search_ui import buscar_cvs
+from utils import recuperar_candidatos, rerank_stream, seleccionar_finalistas, rerank_cross_encoder
+from config import (
+    MODO_RAG_LLM, MODO_RAG_LLM_PARALELO, MODO_CROSS_ENCODER, MODOS_BUSQUEDA,
+    GRADIO_CONCURRENCY_LIMIT, GRADIO_MAX_QUEUE
+)
 from interface_chat import chat_interface
-from send_email import preview_email, send_email_now
+from send_email import preview_email, send_email_now, preview_emails_batch, iniciar_outbox
+from vector_index import VectorIndexManager
+from structured_filters import construir_filtros, NIVELES_IDIOMA_UI, NIVELES_EDUCATIVOS_UI
+from shortlist_store import ShortlistStore, clave_sesion, SESION_LOCAL
 
 
-CANDIDATES_FILE = "candidatos.json"
-CANDIDATES_DICT = {}  # Diccionario global para almacenar los datos completos de los candidatos
-
-async def iniciar_busqueda(descripcion_puesto, option_toggle):
+def guardar_candidatos(candidatos_seleccionados, sesion=SESION_LOCAL, descripcion_puesto=""):
     """
-    Función que ejecuta la búsqueda de CVs cuando el usuario lo inicie desde Gradio.
+    Guarda los candidatos de la sesión en el ShortlistStore (lo leen el agente
+    y el correo) y devuelve la lista filtrada con los campos que se muestran en el ranking.
     """
-    global JOB_DESCRIPTION, CANDIDATES_DICT
-    JOB_DESCRIPTION = descripcion_puesto  # Guardamos la descripción del puesto
-
-    print("🔍 Buscando y rankeando candidatos...")
-    candidatos_seleccionados = await buscar_cvs(descripcion_puesto, option_toggle)
-
-    # Guardamos los datos completos con IDs como strings
-    CANDIDATES_DICT = {str(c["ID"]).strip(): c for c in candidatos_seleccionados}
-
-    print("\n=== Candidatos completos guardados en memoria (CANDIDATES_DICT) ===")
-    print(json.dumps(CANDIDATES_DICT, indent=2, ensure_ascii=False))
 
     # Filtrar y mostrar solo datos necesarios para el ranking,
     # pero incluyendo campos de contacto para que el agente pueda usarlos
@@ -36,56 +29,120 @@ async def iniciar_busqueda(descripcion_puesto, option_toggle):
             "Correo": c.get("Correo", "No disponible"),
             "Teléfono": c.get("Teléfono", "No disponible"),
             "Idiomas": c.get("Idiomas", "No disponible"),
-            "Habilidades": c.get("Habilidades", "No disponible")
+            "Habilidades": c.get("Habilidades", "No disponible"),
+            **({"Puntuación": c["Puntuación"]} if "Puntuación" in c else {})
         }
         for c in candidatos_seleccionados
     ]
 
     if not candidatos_filtrados:
-        print("❌ Error: No se encontraron candidatos válidos después del filtrado.")
-        return "❌ No se encontraron candidatos válidos. Intenta nuevamente."
+        return []
 
-    # Guardamos los candidatos completos en JSON para que el agente tenga acceso a toda la información
-    with open(CANDIDATES_FILE, "w", encoding="utf-8") as f:
-        json.dump(candidatos_seleccionados, f, indent=2, ensure_ascii=False)
+    # Datos completos en memoria para que el agente tenga acceso a toda la información
+    ShortlistStore.get_instance().guardar(sesion, candidatos_seleccionados, descripcion_puesto)
+    print(f"✅ {len(candidatos_filtrados)} candidatos guardados para la sesión {sesion}")
+    return candidatos_filtrados
 
-    print("✅ Candidatos guardados en 'candidatos.json'")
-
-    # Devolvemos una versión en texto estructurado para Gradio, mostrando también correo y teléfono
+def texto_ranking(candidatos_filtrados):
+    # Versión en texto estructurado para Gradio, mostrando también correo y teléfono
     resultado_legible = "🔝 Ranking de Candidatos:\n\n"
     for i, candidato in enumerate(candidatos_filtrados, start=1):
         resultado_legible += (
             f"{i}. {candidato['Nombre']}\n"
             f"   - 🆔 ID: {candidato['ID']}\n"
             f"   - 📜 Descripción: {candidato['Descripción']}\n"
-            f"   - ✅ Justificación: {candidato['Justificación']}\n"
-            f"   - 📧 Correo: {candidato['Correo']}\n"
-            f"   - 📞 Teléfono: {candidato['Teléfono']}\n\n"
+            f"   - ✅ Justificación: {candidato.get('Justificación', 'No proporcionada')}\n"
+            f"   - 📧 Correo: {candidato.get('Correo', 'No disponible')}\n"
+            f"   - 📞 Teléfono: {candidato.get('Teléfono', 'No disponible')}\n"
         )
-
+        if "Puntuación" in candidato:
+            resultado_legible += f"   - 🧠 Puntuación: {candidato['Puntuación']}\n"
+        resultado_legible += "\n"
     return resultado_legible
 
-def sync_iniciar_busqueda(descripcion_puesto, option_toggle) -> str:
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
+def texto_preliminar(candidatos, maximo=10):
+    # Lista RAG que se muestra en cuanto termina la búsqueda semántica
+    texto = "🔎 Resultados preliminares (búsqueda semántica):\n\n"
+    for i, candidato in enumerate(candidatos[:maximo], start=1):
+        distancia = candidato.get('Distancia')
+        detalle = f"distancia {distancia:.3f}" if distancia is not None else "coincidencia léxica"
+        texto += f"{i}. {candidato['Nombre']} (🆔 {candidato['ID']}, {detalle})\n"
+    return texto
+
+async def iniciar_busqueda_stream(descripcion_puesto, option_toggle, ubicacion="", idioma="",
+                                  nivel_idioma=None, anios_min=None, nivel_educativo=None,
+                                  request: gr.Request = None):
+    """
+    Búsqueda de CVs en streaming para Gradio: muestra la lista RAG
+    en cuanto está lista y va completando el ranking del LLM (con sus
+    justificaciones) a medida que llegan los tokens. Los filtros estructurados
+    se aplican antes de la búsqueda.
+    """
+    sesion = clave_sesion(request)
+    filtros = construir_filtros(ubicacion, idioma, nivel_idioma, anios_min, nivel_educativo)
+
+    print("🔍 Buscando y rankeando candidatos (streaming)...")
+    # Cualquier error de la búsqueda o del rerank (cross-encoder, grupos en
+    # paralelo, streaming del LLM) se muestra como texto, no como error de Gradio
     try:
-        # Ejecuta la búsqueda y recibe solo el texto preparado para Gradio
-        resultado = loop.run_until_complete(iniciar_busqueda(descripcion_puesto, option_toggle))
-        return resultado
+        async for texto in buscar_y_rankear(descripcion_puesto, option_toggle, filtros, sesion):
+            yield texto
     except Exception as e:
-        print(f"❌ Error en sync_iniciar_busqueda: {e}")
-        return f"❌ Error al procesar la búsqueda: {str(e)}"
-    finally:
-        loop.close()
-
+        print(f"❌ Error en iniciar_busqueda_stream: {e}")
+        yield f"❌ Error al procesar la búsqueda: {str(e)}"
+
+async def buscar_y_rankear(descripcion_puesto, option_toggle, filtros, sesion):
+    candidatos = await recuperar_candidatos(descripcion_puesto, 40, filtros=filtros)
+    if not candidatos:
+        if filtros:
+            yield "❌ Ningún candidato cumple los filtros indicados. Prueba a relajarlos."
+        else:
+            yield "❌ No se encontraron candidatos válidos. Intenta nuevamente."
+        return
+
+    if option_toggle == MODO_CROSS_ENCODER:
+        yield texto_preliminar(candidatos) + "\n⏳ Reordenando con el cross-encoder local..."
+        candidatos = await asyncio.to_thread(rerank_cross_encoder, candidatos, descripcion_puesto)
+
+    if option_toggle not in (MODO_RAG_LLM, MODO_RAG_LLM_PARALELO):
+        yield texto_ranking(guardar_candidatos(candidatos, sesion, descripcion_puesto))
+        return
+
+    preliminar = texto_preliminar(candidatos)
+    yield preliminar + "\n⏳ Generando ranking con IA..."
+
+    if option_toggle == MODO_RAG_LLM_PARALELO:
+        # Ronda por grupos en paralelo; la ronda final se muestra en streaming
+        candidatos = await seleccionar_finalistas(candidatos, descripcion_puesto)
+
+    ranking = []
+    async for parcial in rerank_stream(candidatos, descripcion_puesto):
+        ranking = parcial
+        if len(ranking) == 1 and "Error" in ranking[0]:
+            break
+        yield texto_ranking(ranking) + "⏳ Generando ranking con IA...\n\n" + preliminar
+
+    if not ranking or "Error" in ranking[0]:
+        error = ranking[0]["Error"] if ranking else "El LLM no devolvió ningún candidato."
+        print(f"❌ Error en el ranking del LLM: {error}")
+        yield preliminar + f"\n❌ {error}"
+        return
+
+    candidatos_filtrados = guardar_candidatos(ranking, sesion, descripcion_puesto)
+    yield texto_ranking(candidatos_filtrados)
 
 def principal_interface():
     """
     Interfaz principal que permite realizar la búsqueda y acceder al agente de reclutamiento.
     """
+    # Precarga del modelo de embeddings y del índice FAISS en segundo plano
+    gestor_indice = VectorIndexManager.get_instance()
+    gestor_indice.warm_up()
+
     with gr.Blocks() as ui:
        
         gr.Markdown("## 📑 Búsqueda de Candidatos")
+        estado_indice = gr.Markdown(gestor_indice.estado())
 
         with gr.Tabs():
             with gr.Tab("🔍 Buscar Candidatos"):
@@ -95,16 +152,31 @@ def principal_interface():
                     placeholder="Ejemplo: Desarrollador Python con experiencia en IA"
                 )
                 option_toggle = gr.Radio(
-                    choices=["🔍 Solo RAG", "🤖 RAG + LLM (IA Avanzada)"],
+                    choices=MODOS_BUSQUEDA,
                     label="Modo de búsqueda",
-                    value="🤖 RAG + LLM (IA Avanzada)"
+                    value=MODO_RAG_LLM
                 )
+                with gr.Accordion("🎯 Filtros", open=False):
+                    with gr.Row():
+                        filtro_ubicacion = gr.Textbox(label="Ubicación (ciudad o país)", placeholder="Ejemplo: Madrid")
+                        filtro_anios = gr.Number(label="Años de experiencia mínimos", value=0, precision=0, minimum=0)
+                    with gr.Row():
+                        filtro_idioma = gr.Textbox(label="Idioma", placeholder="Ejemplo: Inglés")
+                        filtro_nivel_idioma = gr.Dropdown(
+                            choices=list(NIVELES_IDIOMA_UI), label="Nivel mínimo del idioma", value=None
+                        )
+                        filtro_educacion = gr.Dropdown(
+                            choices=list(NIVELES_EDUCATIVOS_UI), label="Nivel educativo mínimo", value=None
+                        )
                 search_button = gr.Button("🔎 Iniciar Búsqueda")
                 resultado_output = gr.Textbox(label="Candidatos Encontrados", lines=10)
 
                 search_button.click(
-                    fn=sync_iniciar_busqueda,
-                    inputs=[descripcion_puesto, option_toggle],
+                    fn=iniciar_busqueda_stream,
+                    inputs=[
+                        descripcion_puesto, option_toggle, filtro_ubicacion, filtro_idioma,
+                        filtro_nivel_idioma, filtro_anios, filtro_educacion
+                    ],
                     outputs=[resultado_output]
                 )
 
@@ -130,11 +202,28 @@ def principal_interface():
                 send_btn = gr.Button("Enviar correo ahora")
                 
                 preview_btn.click(fn=preview_email, inputs=[candidate_input, query_email], outputs=[email_preview])
+                # El envío solo redacta y encola: la aprobación y la entrega siguen en segundo plano
                 send_btn.click(fn=send_email_now, inputs=[candidate_input, query_email], outputs=[email_preview])
 
+                gr.Markdown("#### 📝 Borradores para varios candidatos")
+                batch_ids = gr.Textbox(
+                    label="IDs de los candidatos (separados por comas; vacío = toda la lista)",
+                    placeholder="123, 456"
+                )
+                batch_btn = gr.Button("Redactar borradores")
+                batch_output = gr.Markdown()
+                # Los borradores aparecen según terminan, sin esperar a los demás
+                batch_btn.click(fn=preview_emails_batch, inputs=[batch_ids, query_email], outputs=[batch_output])
+
+
+        # Refresca el estado del índice al abrir la página
+        ui.load(fn=gestor_indice.estado, inputs=[], outputs=[estado_indice])
 
     return ui
 
 if __name__ == "__main__":
+    iniciar_outbox()
     ui = principal_interface()
+    # Todos los handlers son async y comparten el bucle de eventos de Gradio
+    ui.queue(default_concurrency_limit=GRADIO_CONCURRENCY_LIMIT, max_size=GRADIO_MAX_QUEUE)
     ui.launch(server_name="0.0.0.0", server_port=7861)
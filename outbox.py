@@ -0,0 +1,416 @@
+import os
+import time
+import uuid
+import random
+import socket
+import sqlite3
+import asyncio
+import hashlib
+import logging
+import threading
+from config import (
+    OUTBOX_DB, OUTBOX_MAX_ATTEMPTS, OUTBOX_BACKOFF_SECONDS, OUTBOX_BACKOFF_MAX_SECONDS,
+    OUTBOX_POLL_SECONDS, OUTBOX_BATCH_SIZE, OUTBOX_PAGE_SIZE, OUTBOX_LEASE_SECONDS, OUTBOX_DEDUPE_SECONDS
+)
+from bulk_email import SMTPPool, smtp_config, construir_mensaje
+
+# Estados de una solicitud en la cola
+ESTADO_APROBACION = "approval"  # Esperando la aprobación de HumanLayer
+ESTADO_PENDIENTE = "pending"    # Lista para entregar (o esperando un reintento)
+ESTADO_ENVIANDO = "sending"     # Reclamada por el worker
+ESTADO_ENVIADO = "sent"
+ESTADO_FALLIDO = "failed"       # Agotados los intentos o error permanente
+ESTADO_RECHAZADO = "rejected"   # Rechazada en la aprobación
+ESTADOS = [ESTADO_APROBACION, ESTADO_PENDIENTE, ESTADO_ENVIANDO, ESTADO_ENVIADO, ESTADO_FALLIDO, ESTADO_RECHAZADO]
+
+def clave_idempotencia(recipient_email, subject, body):
+    """
+    Mismo destinatario, asunto y cuerpo = misma solicitud (un doble clic no
+    envía dos correos). Una vez enviado, el mismo correo se puede volver a
+    pedir pasados OUTBOX_DEDUPE_SECONDS (ver EmailOutbox.encolar).
+    """
+    contenido = "\x1f".join([recipient_email.strip().lower(), subject, body])
+    return hashlib.sha256(contenido.encode("utf-8")).hexdigest()
+
+def error_permanente(error):
+    """Respuestas 5xx del servidor: reintentar no va a cambiar el resultado."""
+    codigos = [getattr(error, "code", None)]
+    codigos += [getattr(r, "code", None) for r in getattr(error, "recipients", [])]
+    codigos = [c for c in codigos if isinstance(c, int)]
+    return bool(codigos) and all(500 <= c < 600 for c in codigos)
+
+# =============================================================================
+# Cola persistente de correos (patrón outbox). Encolar es un INSERT; un hilo
+# en segundo plano reclama los correos vencidos y los entrega por un
+# SMTPPool, con reintentos y espera exponencial. Como todo está en SQLite,
+# los correos en cola sobreviven a un reinicio. Cada worker firma lo que
+# reclama (claimed_by, claimed_at) y renueva claimed_at mientras el lote
+# sigue en curso: si se cae a medio enviar, sus correos vuelven a 'pending'
+# cuando vence el plazo (contando un intento), sin tocar los de otros procesos.
+# =============================================================================
+class EmailOutbox:
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = EmailOutbox()
+        return cls._instance
+
+    def __init__(self, db_name=OUTBOX_DB, smtp=None, max_intentos=OUTBOX_MAX_ATTEMPTS,
+                 espera_base=OUTBOX_BACKOFF_SECONDS, espera_max=OUTBOX_BACKOFF_MAX_SECONDS,
+                 intervalo=OUTBOX_POLL_SECONDS, lote=OUTBOX_BATCH_SIZE, plazo=OUTBOX_LEASE_SECONDS,
+                 ventana=OUTBOX_DEDUPE_SECONDS):
+        self.db_name = db_name
+        # Parámetros de SMTPPool; por defecto, las variables de entorno SMTP_*
+        self.smtp = smtp
+        self.max_intentos = max_intentos
+        self.espera_base = espera_base
+        self.espera_max = espera_max
+        self.intervalo = intervalo
+        self.lote = lote
+        self.plazo = plazo
+        self.ventana = ventana
+        # Identifica a este worker en las filas que reclama
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._aviso = threading.Event()
+        self._parar = threading.Event()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS email_outbox (
+                    id TEXT PRIMARY KEY,
+                    idempotency_key TEXT NOT NULL UNIQUE,
+                    recipient_email TEXT NOT NULL,
+                    subject TEXT NOT NULL,
+                    body TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_attempt_at REAL NOT NULL,
+                    last_error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    sent_at REAL,
+                    claimed_at REAL,
+                    claimed_by TEXT
+                )
+            """)
+            # Colas creadas por versiones anteriores, sin las columnas del reclamo
+            columnas = {fila[1] for fila in conn.execute("PRAGMA table_info(email_outbox)")}
+            for columna, tipo in (("claimed_at", "REAL"), ("claimed_by", "TEXT")):
+                if columna not in columnas:
+                    conn.execute(f"ALTER TABLE email_outbox ADD COLUMN {columna} {tipo}")
+            # Reclamar los vencidos y listar por fecha (todas o de un estado) sin recorrer la tabla
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_email_outbox_due ON email_outbox(status, next_attempt_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_email_outbox_created ON email_outbox(created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_email_outbox_status_created ON email_outbox(status, created_at)")
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_name, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    # -------------------------------------------------------------------------
+    # Solicitudes
+    # -------------------------------------------------------------------------
+    def encolar(self, recipient_email, subject, body, clave=None, aprobado=True):
+        """
+        Inserta la solicitud y devuelve (fila, nueva). Si ya existe una con la
+        misma clave de idempotencia, devuelve esa sin crear otra, salvo que
+        haya fallado, se haya rechazado o se enviara hace más de 'ventana'
+        segundos: entonces vuelve a la cola. Con aprobado=False queda en
+        'approval' hasta que se llame a aprobar().
+        """
+        clave = clave or clave_idempotencia(recipient_email, subject, body)
+        ahora = time.time()
+        estado = ESTADO_PENDIENTE if aprobado else ESTADO_APROBACION
+        conn = self._connect()
+        try:
+            with conn:
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO email_outbox (id, idempotency_key, recipient_email, subject, body, "
+                    "status, next_attempt_at, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (str(uuid.uuid4()), clave, recipient_email, subject, body, estado, ahora, ahora, ahora)
+                )
+                nueva = cursor.rowcount == 1
+                if not nueva:
+                    # Una solicitud fallida o rechazada se puede volver a pedir: se reutiliza su fila
+                    cursor = conn.execute(
+                        "UPDATE email_outbox SET status = ?, attempts = 0, last_error = NULL, next_attempt_at = ?, "
+                        "updated_at = ? WHERE idempotency_key = ? AND status IN (?, ?)",
+                        (estado, ahora, ahora, clave, ESTADO_FALLIDO, ESTADO_RECHAZADO)
+                    )
+                    nueva = cursor.rowcount == 1
+                if not nueva:
+                    # Un correo enviado fuera de la ventana es un envío nuevo (p. ej. la misma
+                    # plantilla semanas después): id nuevo, así también cambia su Message-ID
+                    cursor = conn.execute(
+                        "UPDATE email_outbox SET id = ?, status = ?, attempts = 0, last_error = NULL, sent_at = NULL, "
+                        "claimed_at = NULL, claimed_by = NULL, next_attempt_at = ?, created_at = ?, updated_at = ? "
+                        "WHERE idempotency_key = ? AND status = ? AND sent_at < ?",
+                        (str(uuid.uuid4()), estado, ahora, ahora, ahora, clave, ESTADO_ENVIADO, ahora - self.ventana)
+                    )
+                    nueva = cursor.rowcount == 1
+            fila = conn.execute("SELECT * FROM email_outbox WHERE idempotency_key = ?", (clave,)).fetchone()
+        finally:
+            conn.close()
+        if nueva and estado == ESTADO_PENDIENTE:
+            self._despertar()
+        return dict(fila), nueva
+
+    def aprobar(self, request_id):
+        if self._actualizar(request_id, ESTADO_APROBACION, status=ESTADO_PENDIENTE, next_attempt_at=time.time()):
+            self._despertar()
+            return True
+        return False
+
+    def rechazar(self, request_id, motivo=""):
+        return self._actualizar(request_id, ESTADO_APROBACION, status=ESTADO_RECHAZADO, last_error=motivo)
+
+    def _actualizar(self, request_id, estado_actual, reclamado_por=None, **campos):
+        """
+        Actualiza la solicitud si está en 'estado_actual' (un estado o una tupla)
+        y, con 'reclamado_por', solo si sigue reclamada por ese worker.
+        """
+        estados = (estado_actual,) if isinstance(estado_actual, str) else tuple(estado_actual)
+        campos["updated_at"] = time.time()
+        asignaciones = ", ".join(f"{c} = ?" for c in campos)
+        condicion = f"id = ? AND status IN ({', '.join('?' * len(estados))})"
+        parametros = [*campos.values(), request_id, *estados]
+        if reclamado_por is not None:
+            condicion += " AND claimed_by = ?"
+            parametros.append(reclamado_por)
+        conn = self._connect()
+        try:
+            with conn:
+                cursor = conn.execute(f"UPDATE email_outbox SET {asignaciones} WHERE {condicion}", parametros)
+            return cursor.rowcount == 1
+        finally:
+            conn.close()
+
+    def solicitud(self, request_id):
+        conn = self._connect()
+        try:
+            fila = conn.execute("SELECT * FROM email_outbox WHERE id = ?", (request_id,)).fetchone()
+            return dict(fila) if fila else None
+        finally:
+            conn.close()
+
+    def recientes(self, pagina=1, por_pagina=OUTBOX_PAGE_SIZE, estado=None):
+        """Una página de solicitudes, de la más reciente a la más antigua, y el total."""
+        pagina = max(1, int(pagina or 1))
+        filtro, parametros = ("WHERE status = ?", (estado,)) if estado else ("", ())
+        conn = self._connect()
+        try:
+            total = conn.execute(f"SELECT COUNT(*) FROM email_outbox {filtro}", parametros).fetchone()[0]
+            filas = conn.execute(
+                f"SELECT id, recipient_email, subject, status, attempts, last_error, created_at, sent_at "
+                f"FROM email_outbox {filtro} ORDER BY created_at DESC LIMIT ? OFFSET ?",
+                (*parametros, por_pagina, (pagina - 1) * por_pagina)
+            ).fetchall()
+            return [dict(f) for f in filas], total
+        finally:
+            conn.close()
+
+    def en_estado(self, estado):
+        conn = self._connect()
+        try:
+            filas = conn.execute(
+                "SELECT * FROM email_outbox WHERE status = ? ORDER BY created_at", (estado,)
+            ).fetchall()
+            return [dict(f) for f in filas]
+        finally:
+            conn.close()
+
+    # -------------------------------------------------------------------------
+    # Entrega
+    # -------------------------------------------------------------------------
+    def _reclamar(self):
+        """Marca como 'sending' a nombre de este worker hasta 'lote' correos vencidos y los devuelve."""
+        ahora = time.time()
+        conn = self._connect()
+        try:
+            # BEGIN IMMEDIATE: dos procesos con worker no reclaman el mismo correo
+            conn.execute("BEGIN IMMEDIATE")
+            filas = conn.execute(
+                "SELECT * FROM email_outbox WHERE status = ? AND next_attempt_at <= ? "
+                "ORDER BY next_attempt_at LIMIT ?", (ESTADO_PENDIENTE, ahora, self.lote)
+            ).fetchall()
+            conn.executemany(
+                "UPDATE email_outbox SET status = ?, updated_at = ?, claimed_at = ?, claimed_by = ? WHERE id = ?",
+                [(ESTADO_ENVIANDO, ahora, ahora, self.worker_id, f["id"]) for f in filas]
+            )
+            conn.commit()
+            return [dict(f) for f in filas]
+        finally:
+            conn.close()
+
+    def _renovar(self, ids):
+        """Renueva claimed_at de los correos del lote que este worker sigue enviando."""
+        if not ids:
+            return
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    f"UPDATE email_outbox SET claimed_at = ? WHERE status = ? AND claimed_by = ? "
+                    f"AND id IN ({', '.join('?' * len(ids))})",
+                    (time.time(), ESTADO_ENVIANDO, self.worker_id, *ids)
+                )
+        finally:
+            conn.close()
+
+    async def _renovar_mientras(self, ids):
+        # Un lote lento (limitador de SMTP, reintentos) no deja vencer su plazo
+        while True:
+            await asyncio.sleep(self.plazo / 3)
+            self._renovar(ids)
+
+    def _recuperar(self):
+        """
+        Los correos reclamados hace más de 'plazo' segundos son de un worker que
+        se cayó a medio enviar: vuelven a la cola (entrega al menos una vez). La
+        recuperación cuenta como intento, así que un correo que tumba al worker
+        acaba en 'failed'. Los que otro proceso vivo está enviando no se tocan.
+        claimed_by se conserva: si el worker original termina el envío, aún
+        puede marcarlo como enviado mientras nadie lo haya vuelto a reclamar.
+        """
+        ahora = time.time()
+        conn = self._connect()
+        try:
+            with conn:
+                cursor = conn.execute(
+                    "UPDATE email_outbox SET attempts = attempts + 1, "
+                    "status = CASE WHEN attempts + 1 >= ? THEN ? ELSE ? END, "
+                    "last_error = 'Reclamo vencido: el worker no terminó el envío', "
+                    "updated_at = ?, claimed_at = NULL "
+                    "WHERE status = ? AND (claimed_at IS NULL OR claimed_at < ?)",
+                    (self.max_intentos, ESTADO_FALLIDO, ESTADO_PENDIENTE, ahora,
+                     ESTADO_ENVIANDO, ahora - self.plazo)
+                )
+            if cursor.rowcount:
+                logging.warning("📮 %d correos a medio enviar vuelven a la cola", cursor.rowcount)
+        finally:
+            conn.close()
+
+    def _proximo_vencimiento(self):
+        conn = self._connect()
+        try:
+            return conn.execute(
+                "SELECT MIN(next_attempt_at) FROM email_outbox WHERE status = ?", (ESTADO_PENDIENTE,)
+            ).fetchone()[0]
+        finally:
+            conn.close()
+
+    def espera(self, intentos):
+        """Espera exponencial con un ±20 % aleatorio para no reintentar todos a la vez."""
+        segundos = min(self.espera_max, self.espera_base * 2 ** (intentos - 1))
+        return segundos * random.uniform(0.8, 1.2)
+
+    async def _entregar(self, pool, fila):
+        remitente = os.getenv("SMTP_FROM_EMAIL")
+        try:
+            if not remitente:
+                raise ValueError("La variable SMTP_FROM_EMAIL no está definida.")
+            mensaje = construir_mensaje(remitente, fila["recipient_email"], fila["subject"], fila["body"])
+            # Message-ID fijo por solicitud: si un reintento duplica el envío, el destino puede descartarlo
+            mensaje["Message-ID"] = f"<{fila['id']}@{remitente.rsplit('@', 1)[-1]}>"
+            await pool.enviar(mensaje)
+        except Exception as e:
+            self._registrar_fallo(fila, e)
+            return False
+        # Si el plazo venció durante el envío, la fila pudo volver a 'pending' (o
+        # a 'failed'): mientras nadie la haya reclamado de nuevo, sigue siendo de
+        # este worker y se marca como enviada para no repetir el correo
+        if not self._actualizar(fila["id"], (ESTADO_ENVIANDO, ESTADO_PENDIENTE, ESTADO_FALLIDO),
+                                reclamado_por=self.worker_id, status=ESTADO_ENVIADO,
+                                attempts=fila["attempts"] + 1, sent_at=time.time(), last_error=None):
+            logging.warning("⚠️ Correo %s entregado después de que otro worker lo reclamara", fila["id"])
+        logging.info("✅ Correo %s entregado a %s", fila["id"], fila["recipient_email"])
+        return True
+
+    def _registrar_fallo(self, fila, error):
+        intentos = fila["attempts"] + 1
+        texto = f"{type(error).__name__}: {error}"
+        if intentos >= self.max_intentos or error_permanente(error):
+            self._actualizar(fila["id"], ESTADO_ENVIANDO, reclamado_por=self.worker_id,
+                             status=ESTADO_FALLIDO, attempts=intentos, last_error=texto)
+            logging.error("❌ Correo %s a %s descartado tras %d intentos: %s",
+                          fila["id"], fila["recipient_email"], intentos, texto)
+            return
+        espera = self.espera(intentos)
+        self._actualizar(fila["id"], ESTADO_ENVIANDO, reclamado_por=self.worker_id, status=ESTADO_PENDIENTE,
+                         attempts=intentos, last_error=texto, next_attempt_at=time.time() + espera)
+        logging.warning("⚠️ Correo %s a %s falló (%s); reintento en %.0fs",
+                        fila["id"], fila["recipient_email"], texto, espera)
+
+    def _crear_pool(self):
+        config = dict(self.smtp) if self.smtp is not None else smtp_config()
+        return SMTPPool(**config)
+
+    async def procesar_pendientes(self, pool=None):
+        """Una pasada: entrega los correos vencidos, lote a lote. Devuelve cuántos se enviaron."""
+        propio = pool is None
+        enviados = 0
+        try:
+            while True:
+                filas = self._reclamar()
+                if not filas:
+                    return enviados
+                if pool is None:
+                    pool = self._crear_pool()
+                renovacion = asyncio.create_task(self._renovar_mientras([f["id"] for f in filas]))
+                try:
+                    resultados = await asyncio.gather(*(self._entregar(pool, f) for f in filas))
+                finally:
+                    renovacion.cancel()
+                enviados += sum(resultados)
+        finally:
+            if propio and pool is not None:
+                # Sin correos pendientes no se mantienen conexiones SMTP abiertas
+                await pool.cerrar()
+
+    # -------------------------------------------------------------------------
+    # Worker en segundo plano
+    # -------------------------------------------------------------------------
+    def iniciar(self):
+        """Arranca el worker (una vez por proceso)."""
+        with self._worker_lock:
+            if self._worker is not None and self._worker.is_alive():
+                return
+            self._parar.clear()
+            self._worker = threading.Thread(target=lambda: asyncio.run(self._bucle()),
+                                            name="outbox-worker", daemon=True)
+            self._worker.start()
+
+    def detener(self, timeout=10):
+        self._parar.set()
+        self._aviso.set()
+        if self._worker is not None:
+            self._worker.join(timeout)
+            self._worker = None
+
+    def _despertar(self):
+        self._aviso.set()
+
+    async def _bucle(self):
+        while not self._parar.is_set():
+            self._aviso.clear()
+            try:
+                # En cada pasada: así también se recuperan los correos de otro proceso que se cayó
+                self._recuperar()
+                await self.procesar_pendientes()
+            except Exception as e:
+                logging.error("Error en el worker de la cola de correos: %s", e)
+            # Duerme hasta el próximo reintento vencido, un aviso de encolar() o el intervalo
+            proximo = self._proximo_vencimiento()
+            espera = self.intervalo if proximo is None else min(self.intervalo, max(0.0, proximo - time.time()))
+            await asyncio.to_thread(self._aviso.wait, espera)
@@ -0,0 +1,61 @@
+import re
+import time
+import threading
+import unicodedata
+from collections import OrderedDict
+from config import QUERY_CACHE_SIZE, QUERY_CACHE_TTL
+
+# =============================================================================
+# Caché LRU acotado con caducidad (TTL), seguro entre hilos.
+# =============================================================================
+class LRUCacheTTL:
+    def __init__(self, maxsize=256, ttl=600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, clave):
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                self.misses += 1
+                return None
+            valor, expira = entrada
+            if expira < time.monotonic():
+                del self._datos[clave]
+                self.misses += 1
+                return None
+            self._datos.move_to_end(clave)
+            self.hits += 1
+            return valor
+
+    def set(self, clave, valor):
+        with self._lock:
+            self._datos[clave] = (valor, time.monotonic() + self.ttl)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.maxsize:
+                self._datos.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._datos.clear()
+
+    def __len__(self):
+        return len(self._datos)
+
+def normalizar_consulta(texto):
+    """
+    Normaliza el texto de la consulta para que variaciones triviales compartan
+    entrada. Solo se unifican la forma Unicode y los espacios: el modelo de
+    embeddings distingue mayúsculas ("Java" y "java" dan vectores distintos).
+    """
+    texto = unicodedata.normalize("NFC", texto or "")
+    return re.sub(r"\s+", " ", texto).strip()
+
+# Vectores de consulta: clave (modelo, texto normalizado)
+QUERY_VECTOR_CACHE = LRUCacheTTL(maxsize=QUERY_CACHE_SIZE, ttl=QUERY_CACHE_TTL)
+# Resultados top-k [(id del docstore, distancia)]: clave (texto normalizado, versión del índice, k)
+SEARCH_RESULTS_CACHE = LRUCacheTTL(maxsize=QUERY_CACHE_SIZE, ttl=QUERY_CACHE_TTL)
@@ -13,8 +13,12 @@ from utils import (
     buscar_cvs,
     mostrar_resultados_texto
 )
+from vector_index import VectorIndexManager
+from config import (
+    MODO_SOLO_RAG, MODO_RAG_LLM, MODO_RAG_LLM_PARALELO, MODO_CROSS_ENCODER, MODOS_BUSQUEDA,
+    GRADIO_CONCURRENCY_LIMIT, GRADIO_MAX_QUEUE
+)
 import gradio as gr
-import asyncio
 
 #Función para mostrar resultados formateados como JSON
 async def buscar_cvs_con_distancia(job_description, option_toggle):
@@ -29,7 +33,7 @@ async def buscar_cvs_con_distancia(job_description, option_toggle):
 
     #Si es una lista, la formateamos
     if isinstance(resultados, list):
-        if option_toggle == "🔍 Solo RAG":
+        if option_toggle == MODO_SOLO_RAG:
             resultados_legibles = []
             for match in resultados:
                 #Asumimos que ya vienen formateados los datos principales
@@ -41,29 +45,28 @@ async def buscar_cvs_con_distancia(job_description, option_toggle):
                 }
                 resultados_legibles.append(resultado)
             return mostrar_resultados_texto(resultados_legibles)
-        elif option_toggle == "🤖 RAG + LLM (IA Avanzada)":
+        elif option_toggle == MODO_CROSS_ENCODER:
+            resultados_legibles = [
+                {
+                    "Posición": match.get('Posición', 'N/A'),
+                    "Nombre": match.get('Nombre', 'Sin Nombre'),
+                    "ID": match.get('ID', 'Desconocido'),
+                    "Puntuación": match.get('Puntuación', 0.0),
+                    "Descripción": match.get('Descripción', 'Sin Contenido')
+                }
+                for match in resultados
+            ]
+            return mostrar_resultados_texto(resultados_legibles)
+        elif option_toggle in (MODO_RAG_LLM, MODO_RAG_LLM_PARALELO):
             return mostrar_resultados_texto(resultados)
     else:
         return "❌ Error interno: el formato de resultados no es válido."
 
-#Función de envoltura sincrónica para Gradio
-def sync_buscar_cvs(job_description, option_toggle):
-    try:
-        loop = asyncio.get_event_loop()
-        if loop.is_running():
-            print("⚠️ Advertencia: Ya hay un bucle de eventos en ejecución.")
-            # Esperar el resultado en vez de devolver una tarea
-            return asyncio.run_coroutine_threadsafe(buscar_cvs_con_distancia(job_description, option_toggle), loop).result()
-        else:
-            return loop.run_until_complete(buscar_cvs_con_distancia(job_description, option_toggle))
-    except RuntimeError as e:
-        print(f"🔄 Creando un nuevo bucle de eventos: {str(e)}")
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        return loop.run_until_complete(buscar_cvs_con_distancia(job_description, option_toggle))
-
 #Interfaz con Gradio
 def search_interface():
+    # Precarga compartida del modelo y del índice (no hace nada si ya se lanzó)
+    VectorIndexManager.get_instance().warm_up()
+
     with gr.Blocks(elem_id="search-container") as search_page:
         gr.Markdown("🔎 **Búsqueda de CVs con IA**", elem_id="search-title")
 
@@ -73,7 +76,7 @@ def search_interface():
             placeholder="Ej. Desarrollador Python con experiencia en Machine Learning"
         )
         option_toggle = gr.Radio(
-            ["🔍 Solo RAG", "🤖 RAG + LLM (IA Avanzada)"], 
+            MODOS_BUSQUEDA, 
             label="Método de búsqueda", 
             elem_id="search-toggle"
         )
@@ -85,12 +88,13 @@ def search_interface():
             placeholder="Aquí aparecerán los resultados..."
         )  
 
-        #Llamada a la función sincronizada
-        search_button.click(fn=sync_buscar_cvs, inputs=[job_input, option_toggle], outputs=result_output)
+        #Handler async: Gradio lo ejecuta en su propio bucle de eventos
+        search_button.click(fn=buscar_cvs_con_distancia, inputs=[job_input, option_toggle], outputs=result_output)
 
     return search_page
 
 
 if __name__ == "__main__":
     interfaz = search_interface()
+    interfaz.queue(default_concurrency_limit=GRADIO_CONCURRENCY_LIMIT, max_size=GRADIO_MAX_QUEUE)
     interfaz.launch(server_name="0.0.0.0", server_port=7860)
@@ -1,14 +1,21 @@
 import os
+import re
 import asyncio
-import aiosmtplib
-from email.message import EmailMessage
 import logging
 import json
 import time
-import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any
 from dotenv import load_dotenv
 from utils import generar_respuesta
+from config import (
+    APPROVAL_WORKERS, GRADIO_CONCURRENCY_LIMIT, GRADIO_MAX_QUEUE, OUTBOX_PAGE_SIZE,
+    EMAIL_DRAFT_CONCURRENCY, EMAIL_DRAFT_TIMEOUT
+)
+from outbox import EmailOutbox, ESTADOS, ESTADO_APROBACION
+from email_templates import valores_consulta, elegir_plantilla, renderizar_correo, PLANTILLA_GENERAL
+from shortlist_store import ShortlistStore, clave_sesion
 
 
 # Importar gradio para la interfaz gráfica
@@ -19,110 +26,18 @@ load_dotenv("key.env", override=True)
 # Configuración básica de logging
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
 
-# Variables globales
-CANDIDATES_FILE = "candidatos.json"
-# Diccionario global para almacenar candidatos; clave: ID del candidato (como string)
-CANDIDATES_DICT: Dict[str, Dict[str, Any]] = {}
-
-# Carga automática de los candidatos desde candidatos.json
-if os.path.exists(CANDIDATES_FILE):
-    try:
-        with open(CANDIDATES_FILE, "r", encoding="utf-8") as f:
-            candidatos_lista = json.load(f)
-        for candidate in candidatos_lista:
-            # Asegurarse de convertir el ID a string y limpiarlo
-            candidate_id = str(candidate.get("ID", "")).strip()
-            if candidate_id:
-                CANDIDATES_DICT[candidate_id] = candidate
-        logging.info("Candidatos cargados de %s: %s", CANDIDATES_FILE, list(CANDIDATES_DICT.keys()))
-    except Exception as e:
-        logging.error("Error al cargar candidatos desde %s: %s", CANDIDATES_FILE, e)
-else:
-    logging.info("No se encontró %s. Asegúrate de que se guarden los candidatos tras una búsqueda.", CANDIDATES_FILE)
-
-
-
-#############################################
-# Funciones de envío de correo
-#############################################
-async def send_email(recipient_email: str, subject: str, body: str) -> bool:
-    logging.debug("send_email() iniciado para %s con asunto: %s", recipient_email, subject)
-    message = EmailMessage()
-    message["From"] = os.getenv("SMTP_FROM_EMAIL")
-    if not message["From"]:
-        logging.error("La variable SMTP_FROM_EMAIL no está definida.")
-        return False
-    message["To"] = recipient_email
-    message["Subject"] = subject
-    message.set_content(body)
-    
-    smtp_host = os.getenv("SMTP_HOST")
-    smtp_port_str = os.getenv("SMTP_PORT", "587")
-    try:
-        smtp_port = int(smtp_port_str)
-    except ValueError:
-        logging.error("El valor de SMTP_PORT (%s) no es válido. Usando 587 por defecto.", smtp_port_str)
-        smtp_port = 587
-    smtp_username = os.getenv("SMTP_USERNAME")
-    smtp_password = os.getenv("SMTP_PASSWORD")
-    if not smtp_host or not smtp_username or not smtp_password:
-        logging.error("Faltan variables de entorno para SMTP.")
-        return False
-    try:
-        logging.debug("Llamando a aiosmtplib.send para %s", recipient_email)
-        await aiosmtplib.send(
-            message,
-            hostname=smtp_host,
-            port=smtp_port,
-            username=smtp_username,
-            password=smtp_password,
-            start_tls=True
-        )
-        logging.info("✅ Correo enviado exitosamente a %s", recipient_email)
-        return True
-    except Exception as e:
-        logging.error("❌ Error al enviar correo a %s: %s", recipient_email, e)
-        return False
+# Los candidatos se leen del ShortlistStore con la sesión de Gradio de cada
+# petición: siempre los de la última búsqueda de ese reclutador.
+shortlist_store = ShortlistStore.get_instance()
 
-def send_email_sync(recipient_email: str, subject: str, body: str) -> bool:
-    logging.debug("send_email_sync() iniciado para %s", recipient_email)
-    try:
-        loop = asyncio.get_running_loop()
-    except RuntimeError:
-        loop = None
-    if loop and loop.is_running():
-        import nest_asyncio
-        nest_asyncio.apply()
-        result = loop.run_until_complete(send_email(recipient_email, subject, body))
-        return result
-    else:
-        return asyncio.run(send_email(recipient_email, subject, body))
 
 #############################################
-# Clase para almacenar solicitudes de correo
+# Cola persistente de correos
 #############################################
-class EmailRequestStore:
-    _instance = None
-    
-    @classmethod
-    def get_instance(cls):
-        if cls._instance is None:
-            cls._instance = EmailRequestStore()
-        return cls._instance
-    
-    def __init__(self):
-        self.requests = {}
-    
-    def add_request(self, request_id, email_data):
-        logging.debug("Añadiendo solicitud %s con datos: %s", request_id, email_data)
-        self.requests[request_id] = email_data
-        
-    def update_status(self, request_id, status):
-        logging.debug("Actualizando estado de %s a %s", request_id, status)
-        if request_id in self.requests:
-            self.requests[request_id]["status"] = status
-
-email_store = EmailRequestStore.get_instance()
+# Las solicitudes se guardan en la outbox de SQLite y un worker en segundo
+# plano las entrega con reintentos: sobreviven a un reinicio de la app. El
+# worker no arranca al importar: lo hace iniciar_outbox() desde cada app.
+outbox = EmailOutbox.get_instance()
 
 #############################################
 # Integración con HumanLayer para aprobación
@@ -136,128 +51,304 @@ hl = HumanLayer.cloud(api_key=HUMANLAYER_API_KEY, verbose=True)
 logging.debug("HumanLayer inicializado con API key.")
 
 @hl.require_approval()
-def send_email_with_approval(recipient_email: str, subject: str, body: str) -> Dict[str, Any]:
+def send_email_with_approval(recipient_email: str, subject: str, body: str, request_id: str) -> Dict[str, Any]:
+    """Solo se ejecuta si HumanLayer lo aprueba: pasa la solicitud a la cola de entrega."""
     logging.debug("send_email_with_approval() llamado para %s", recipient_email)
-    request_id = str(uuid.uuid4())
-    email_data = {
-        "recipient_email": recipient_email,
-        "subject": subject,
-        "body": body,
-        "status": "pending",
-        "timestamp": time.time()
-    }
-    email_store.add_request(request_id, email_data)
-    success = send_email_sync(recipient_email, subject, body)
-    if success:
-        email_store.update_status(request_id, "sent")
-        logging.info("✅ Correo enviado a %s tras aprobación. ID: %s", recipient_email, request_id)
-        return {"success": True, "message": f"Correo enviado a {recipient_email}", "request_id": request_id}
+    outbox.aprobar(request_id)
+    logging.info("✅ Correo a %s aprobado y en cola. ID: %s", recipient_email, request_id)
+    return {"success": True, "message": f"Correo a {recipient_email} aprobado y en cola", "request_id": request_id}
+
+def solicitar_aprobacion(request_id: str, recipient_email: str, subject: str, body: str) -> None:
+    try:
+        result = send_email_with_approval(recipient_email, subject, body, request_id)
+    except Exception as e:
+        logging.error("❌ Error en la aprobación de %s: %s", request_id, e)
+        outbox.rechazar(request_id, f"Error en la aprobación: {e}")
+        return
+    # Si se rechaza, HumanLayer devuelve el motivo en lugar de llamar a la función
+    if not isinstance(result, dict):
+        logging.info("Correo %s rechazado: %s", request_id, result)
+        outbox.rechazar(request_id, str(result))
+
+# La aprobación de HumanLayer bloquea su hilo hasta que alguien responde: se
+# ejecuta en un pool propio, fuera del handler de Gradio.
+_approval_executor = ThreadPoolExecutor(max_workers=APPROVAL_WORKERS, thread_name_prefix="aprobacion")
+
+def encolar_con_aprobacion(recipient_email: str, subject: str, body: str) -> Dict[str, Any]:
+    """
+    Guarda la solicitud en la cola (un INSERT) y lanza la aprobación en segundo
+    plano. Repetir la misma solicitud devuelve la existente sin duplicarla; como
+    no se encola nada, el resultado lleva success=False y duplicada=True.
+    """
+    fila, nueva = outbox.encolar(recipient_email, subject, body, aprobado=False)
+    if nueva:
+        _approval_executor.submit(solicitar_aprobacion, fila["id"], recipient_email, subject, body)
+        mensaje = f"Correo a {recipient_email} en cola, pendiente de aprobación"
     else:
-        email_store.update_status(request_id, "failed")
-        logging.error("❌ Error al enviar correo a %s tras aprobación. ID: %s", recipient_email, request_id)
-        return {"success": False, "message": f"Error al enviar correo a {recipient_email}", "request_id": request_id}
+        mensaje = f"No se ha encolado: ya existe una solicitud igual para {recipient_email} (estado: {fila['status']})"
+    return {"success": nueva, "duplicada": not nueva, "message": mensaje,
+            "request_id": fila["id"], "status": fila["status"]}
+
+def encolar_lote_con_aprobacion(candidates: list, subject: str, body_template: str) -> list:
+    """
+    Envío masivo desde el chat: una solicitud por candidato en la cola, cada
+    una con su aprobación en HumanLayer. '{name}' en body_template se
+    sustituye por el nombre. Devuelve un resultado por candidato con el mismo
+    formato que send_bulk_emails (más 'request_id'), para resumen_envio.
+    """
+    resultados = []
+    for c in candidates:
+        resultado = {"ID": str(c.get("ID", "")).strip(), "Nombre": c.get("Nombre", ""),
+                     "Correo": c.get("Correo", ""), "success": False, "message": ""}
+        resultados.append(resultado)
+        if not resultado["Correo"] or resultado["Correo"] == "No disponible":
+            resultado["message"] = "El candidato no tiene un correo registrado"
+            continue
+        body = body_template.replace("{name}", resultado["Nombre"] or "candidato/a")
+        try:
+            solicitud = encolar_con_aprobacion(resultado["Correo"], subject, body)
+        except Exception as e:
+            logging.error("❌ Error al encolar el correo a %s: %s", resultado["Correo"], e)
+            resultado["message"] = f"{type(e).__name__}: {e}"
+            continue
+        resultado.update(success=solicitud["success"], message=solicitud["message"], request_id=solicitud["request_id"])
+    return resultados
+
+def reanudar_aprobaciones() -> None:
+    """Las solicitudes que esperaban aprobación cuando se cerró la app se vuelven a presentar."""
+    for fila in outbox.en_estado(ESTADO_APROBACION):
+        _approval_executor.submit(solicitar_aprobacion, fila["id"], fila["recipient_email"],
+                                  fila["subject"], fila["body"])
+
+_outbox_iniciada = False
+_outbox_lock = threading.Lock()
+
+def iniciar_outbox() -> None:
+    """
+    Arranca el worker de entrega y vuelve a presentar las aprobaciones
+    pendientes. Lo llama cada app en su __main__ (una vez por proceso);
+    importar el módulo, por ejemplo en tests o scripts, no envía nada.
+    """
+    global _outbox_iniciada
+    with _outbox_lock:
+        if _outbox_iniciada:
+            return
+        _outbox_iniciada = True
+    outbox.iniciar()
+    reanudar_aprobaciones()
 
 #############################################
 # Funciones para la interfaz Gradio (Vista previa, envío de correo, estado)
 #############################################
 def parse_email_intent(query: str):
+    """
+    (asunto, cuerpo) de la plantilla que corresponde a la consulta, o de la
+    genérica si ninguna encaja. El cuerpo conserva '{name}' para el nombre.
+    """
     logging.debug("parse_email_intent() llamado con query: %s", query)
-    if "entrevista" in query.lower():
-        subject = "Invitación a entrevista"
-        body_template = (
-            "Hola {name},\n\n"
-            "Te invitamos a una entrevista el próximo miércoles a las 10am.\n"
-            "Por favor, confirma tu disponibilidad.\n\n"
-            "Saludos,\nEquipo de Reclutamiento"
-        )
-    elif "descartar" in query.lower() or "no vamos a seguir" in query.lower():
-        subject = "Notificación de Proceso de Selección"
-        body_template = (
-            "Hola {name},\n\n"
-            "Te agradecemos el tiempo y la dedicación, pero en esta ocasión no continuaremos con el proceso de selección.\n\n"
-            "Saludos,\nEquipo de Reclutamiento"
-        )
-    else:
-        subject = "Proceso de Selección - Información Actualizada"
-        body_template = (
-            "Hola {name},\n\n"
-            "Queríamos compartirte información sobre el proceso de selección.\n\n"
-            "Saludos,\nEquipo de Reclutamiento"
-        )
-    return subject, body_template
+    valores = valores_consulta(query)
+    plantilla = elegir_plantilla(query, valores) or PLANTILLA_GENERAL
+    return plantilla.renderizar({**valores, "nombre": "{name}"})
 
 
-async def generate_candidate_email(candidate: dict, query: str) -> str:
+def prefijo_prompt_correo(query: str) -> str:
     """
-    Usa inteligencia artificial para generar la redacción de un correo para un candidato,
-    basándose en la consulta (query) de reclutamiento y los datos del candidato.
+    Parte del prompt común a todos los candidatos (instrucciones y propósito).
+    Va al principio para que los borradores de una misma lista compartan
+    prefijo y el proveedor pueda reutilizar su caché de prompts.
     """
-    prompt = f"""
+    return f"""
 Eres un experto en redacción profesional de correos de reclutamiento.
-Redacta un correo dirigido a {candidate["Nombre"]} ({candidate["Correo"]}) para el siguiente propósito: "{query}".
+Redacta un correo para el siguiente propósito: "{query}".
+Asegúrate de que el email sea profesional, claro y adaptado a la solicitud. 
+Si el query menciona una fecha específica o solicita feedback, incorpóralo de forma natural.
+Dirige el correo al candidato cuyos datos aparecen a continuación.
+"""
+
+def prompt_correo(prefijo: str, candidate: dict) -> str:
+    return prefijo + f"""
 Datos relevantes del candidato:
 - Nombre: {candidate["Nombre"]}
 - Correo: {candidate["Correo"]}
 - Teléfono: {candidate.get("Teléfono", "No disponible")}
 - Descripción: {candidate.get("Descripción", "No disponible")}
-Asegúrate de que el email sea profesional, claro y adaptado a la solicitud. 
-Si el query menciona una fecha específica o solicita feedback, incorpóralo de forma natural.
     """
-    email_text = await generar_respuesta(prompt)
+
+async def generate_candidate_email(candidate: dict, query: str, prefijo: str = None, timeout: float = None) -> str:
+    """
+    Usa inteligencia artificial para generar la redacción de un correo para un candidato,
+    basándose en la consulta (query) de reclutamiento y los datos del candidato.
+    """
+    prompt = prompt_correo(prefijo or prefijo_prompt_correo(query), candidate)
+    email_text = await generar_respuesta(prompt, timeout=timeout, cache="email")
     return email_text.strip()
 
+def formatear_borrador(subject: str, body: str) -> str:
+    return f"Asunto: {subject}\n\n{body}"
+
+def respuesta_valida(texto: str) -> bool:
+    """False si el LLM no devolvió nada o generar_respuesta devolvió su mensaje de error."""
+    return bool(texto) and not texto.startswith("Error en la API")
 
-def preview_email(candidate_id: str, query: str) -> str:
+def borrador_plantilla(candidate: dict, query: str, descripcion: str = None) -> str:
+    """Borrador sin LLM: la plantilla de la consulta o, si ninguna encaja, la genérica."""
+    return formatear_borrador(*renderizar_correo(candidate, query, descripcion, general=True))
+
+#############################################
+# Borradores en lote para una lista de candidatos
+#############################################
+async def redactar_borradores(candidates: list, query: str, concurrencia: int = EMAIL_DRAFT_CONCURRENCY,
+                              plazo: float = EMAIL_DRAFT_TIMEOUT, descripcion: str = None):
+    """
+    Produce (posición, borrador, origen) por candidato según van terminando.
+    Si la consulta encaja en una plantilla, todos se renderizan sin LLM
+    (origen "plantilla"). Si no, se redactan con 'concurrencia' peticiones al
+    LLM a la vez; la que supera 'plazo' segundos o falla usa la plantilla
+    genérica (origen "plantilla de respaldo").
+    """
+    valores = valores_consulta(query, descripcion)
+    plantilla = elegir_plantilla(query, valores)
+    if plantilla:
+        for posicion, candidate in enumerate(candidates):
+            borrador = formatear_borrador(*renderizar_correo(candidate, query, plantilla=plantilla, valores=valores))
+            yield posicion, borrador, "plantilla"
+        return
+
+    prefijo = prefijo_prompt_correo(query)
+    semaforo = asyncio.Semaphore(concurrencia)
+
+    async def redactar(posicion, candidate):
+        async with semaforo:
+            try:
+                texto = await asyncio.wait_for(
+                    generate_candidate_email(candidate, query, prefijo=prefijo, timeout=plazo), plazo
+                )
+                if respuesta_valida(texto):
+                    return posicion, texto, "IA"
+                logging.warning("Borrador de %s sin respuesta válida del LLM; se usa la plantilla.", candidate.get("ID"))
+            except asyncio.TimeoutError:
+                logging.warning("Borrador de %s fuera de plazo (%.0fs); se usa la plantilla.", candidate.get("ID"), plazo)
+            except Exception as e:
+                logging.error("Error al redactar el borrador de %s: %s", candidate.get("ID"), e)
+        return posicion, borrador_plantilla(candidate, query, descripcion), "plantilla de respaldo"
+
+    tareas = [asyncio.create_task(redactar(i, c)) for i, c in enumerate(candidates)]
+    try:
+        for tarea in asyncio.as_completed(tareas):
+            yield await tarea
+    finally:
+        # Si la interfaz deja de consumir el generador, no quedan peticiones sueltas
+        for tarea in tareas:
+            tarea.cancel()
+
+def separar_ids(texto: str) -> list:
+    return [i for i in re.split(r"[\s,;]+", texto or "") if i]
+
+async def preview_emails_batch(candidate_ids: str, query: str, request: gr.Request = None):
+    """
+    Borradores para varios candidatos (IDs separados por comas; vacío = toda la
+    lista de la última búsqueda). La salida se actualiza con cada borrador.
+    """
+    sesion = clave_sesion(request)
+    ids = separar_ids(candidate_ids) or shortlist_store.ids(sesion)
+    if not ids:
+        yield "⚠️ No hay candidatos: haz primero una búsqueda o indica sus IDs."
+        return
+    # Una sección por ID, en el orden pedido; 'posiciones' enlaza cada candidato con su sección
+    candidates, posiciones, secciones = [], [], []
+    for cv_id in ids:
+        candidate = shortlist_store.candidato(sesion, cv_id)
+        if candidate:
+            candidates.append(candidate)
+            posiciones.append(len(secciones))
+            secciones.append(f"### {candidate['Nombre']} (ID {cv_id}) — ⏳ redactando...")
+        else:
+            secciones.append(f"### ID {cv_id}\n⚠️ No se encontró un candidato con ese ID.")
+    yield "\n\n".join(secciones)
+
+    inicio = time.perf_counter()
+    async for posicion, borrador, origen in redactar_borradores(candidates, query,
+                                                               descripcion=shortlist_store.descripcion(sesion)):
+        candidate = candidates[posicion]
+        secciones[posiciones[posicion]] = (
+            f"### {candidate['Nombre']} (ID {candidate['ID']}) — {'🤖' if origen == 'IA' else '📄'} {origen}\n\n{borrador}"
+        )
+        yield "\n\n".join(secciones)
+    logging.info("📝 %d borradores en %.1fs", len(candidates), time.perf_counter() - inicio)
+
+
+async def preview_email(candidate_id: str, query: str, request: gr.Request = None) -> str:
     """
     Devuelve una vista previa del correo generado automáticamente basado en el ID
     del candidato y la consulta.
     """
-    candidate = CANDIDATES_DICT.get(candidate_id)
+    sesion = clave_sesion(request)
+    candidate = shortlist_store.candidato(sesion, candidate_id)
     if not candidate:
         logging.error("Candidato no encontrado: %s", candidate_id)
         return "⚠️ No se encontró un candidato con ese ID."
 
+    # Las intenciones habituales se resuelven con plantilla, sin llamar al LLM
+    correo = renderizar_correo(candidate, query, shortlist_store.descripcion(sesion))
+    if correo:
+        return formatear_borrador(*correo)
     try:
-        generated_email = asyncio.run(generate_candidate_email(candidate, query))
+        generated_email = await generate_candidate_email(candidate, query)
+        if not respuesta_valida(generated_email):
+            # Misma plantilla genérica que se enviaría con "Enviar correo ahora"
+            logging.warning("Vista previa de %s sin respuesta válida del LLM; se usa la plantilla.", candidate_id)
+            return borrador_plantilla(candidate, query, shortlist_store.descripcion(sesion))
         return generated_email
     except Exception as e:
         logging.error("Error al generar vista previa: %s", e)
         return f"Error: {e}"
 
 
-def send_email_now(candidate_id: str, query: str) -> str:
+async def send_email_now(candidate_id: str, query: str, request: gr.Request = None) -> str:
     """
-    Envía el correo al candidato identificado por su ID utilizando
-    inteligencia artificial para generar la redacción del correo.
+    Envía el correo al candidato identificado por su ID. La redacción sale de
+    una plantilla si la consulta encaja en alguna y, si no, del LLM.
     """
-    candidate = CANDIDATES_DICT.get(candidate_id)
+    sesion = clave_sesion(request)
+    candidate = shortlist_store.candidato(sesion, candidate_id)
     if not candidate:
         logging.error("Candidato no encontrado: %s", candidate_id)
         return "⚠️ No se encontró un candidato con ese ID."
 
-    try:
-        generated_email = asyncio.run(generate_candidate_email(candidate, query))
-    except Exception as e:
-        logging.error("Error al generar redacción del correo: %s", e)
-        return f"Error: {e}"
-
-    subject = "Proceso de Selección - Información Actualizada"
-    body = generated_email
-    result = send_email_with_approval(candidate["Correo"], subject, body)
-    return json.dumps(result, indent=2)
+    correo = renderizar_correo(candidate, query, shortlist_store.descripcion(sesion))
+    if correo:
+        subject, body = correo
+    else:
+        try:
+            body = await generate_candidate_email(candidate, query)
+        except Exception as e:
+            logging.error("Error al generar redacción del correo: %s", e)
+            return f"Error: {e}"
+        subject = "Proceso de Selección - Información Actualizada"
+        if not respuesta_valida(body):
+            # Un error del LLM no puede acabar como cuerpo del correo al candidato
+            logging.warning("Correo de %s sin respuesta válida del LLM; se usa la plantilla.", candidate_id)
+            subject, body = renderizar_correo(candidate, query, shortlist_store.descripcion(sesion), general=True)
+    result = encolar_con_aprobacion(candidate["Correo"], subject, body)
+    return json.dumps(result, indent=2, ensure_ascii=False)
 
 
 
-def check_recent_requests() -> str:
-    if not email_store.requests:
+def check_recent_requests(pagina: int = 1, estado: str = "Todos") -> str:
+    filas, total = outbox.recientes(pagina, estado=None if estado in (None, "", "Todos") else estado)
+    if not total:
         return "No hay solicitudes de correo registradas."
-    result = "Solicitudes de correo recientes:\n\n"
-    for req_id, data in email_store.requests.items():
-        timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(data["timestamp"]))
+    paginas = -(-total // OUTBOX_PAGE_SIZE)
+    result = f"Solicitudes de correo recientes (página {int(pagina or 1)} de {paginas}, {total} en total):\n\n"
+    for data in filas:
+        timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(data["created_at"]))
         result += (
-            f"ID: {req_id}\nDestinatario: {data['recipient_email']}\nAsunto: {data['subject']}\n"
-            f"Estado: {data['status']}\nFecha: {timestamp}\n{'-'*50}\n"
+            f"ID: {data['id']}\nDestinatario: {data['recipient_email']}\nAsunto: {data['subject']}\n"
+            f"Estado: {data['status']} (intentos: {data['attempts']})\nFecha: {timestamp}\n"
         )
+        if data["last_error"]:
+            result += f"Último error: {data['last_error']}\n"
+        result += f"{'-'*50}\n"
     return result
 
 #############################################
@@ -266,11 +357,8 @@ def check_recent_requests() -> str:
 iface_preview = gr.Interface(
     fn=preview_email,
     inputs=[
-        gr.Dropdown(
-            label="Selecciona el candidato",
-            choices=list(CANDIDATES_DICT.keys()),
-            value=list(CANDIDATES_DICT.keys())[0] if CANDIDATES_DICT else None
-        ),
+        # La lista de candidatos depende de la sesión: el ID se introduce a mano
+        gr.Textbox(label="ID del candidato", placeholder="Ejemplo: 123"),
         gr.Textbox(label="Query (ej. 'envia un correo para entrevista')", 
                    value="envia un correo para entrevista", lines=1)
     ],
@@ -281,11 +369,8 @@ iface_preview = gr.Interface(
 iface_send = gr.Interface(
     fn=send_email_now,
     inputs=[
-        gr.Dropdown(
-            label="Selecciona el candidato",
-            choices=list(CANDIDATES_DICT.keys()),
-            value=list(CANDIDATES_DICT.keys())[0] if CANDIDATES_DICT else None
-        ),
+        # La lista de candidatos depende de la sesión: el ID se introduce a mano
+        gr.Textbox(label="ID del candidato", placeholder="Ejemplo: 123"),
         gr.Textbox(label="Query (ej. 'envia un correo para entrevista')", 
                    value="envia un correo para entrevista", lines=1)
     ],
@@ -295,18 +380,34 @@ iface_send = gr.Interface(
 
 iface_status = gr.Interface(
     fn=check_recent_requests,
-    inputs=[],
+    inputs=[
+        gr.Number(label="Página", value=1, precision=0, minimum=1),
+        gr.Dropdown(["Todos"] + ESTADOS, label="Estado", value="Todos")
+    ],
     outputs="text",
     title="Ver solicitudes recientes"
 )
 
+iface_batch = gr.Interface(
+    fn=preview_emails_batch,
+    inputs=[
+        gr.Textbox(label="IDs de los candidatos (separados por comas; vacío = toda la lista)", placeholder="123, 456"),
+        gr.Textbox(label="Query (ej. 'envia un correo para entrevista')",
+                   value="envia un correo para entrevista", lines=1)
+    ],
+    outputs=gr.Markdown(),
+    title="Borradores para varios candidatos"
+)
+
 demo = gr.TabbedInterface(
-    [iface_preview, iface_send, iface_status],
-    ["Vista previa", "Enviar correo", "Solicitudes recientes"]
+    [iface_preview, iface_batch, iface_send, iface_status],
+    ["Vista previa", "Borradores en lote", "Enviar correo", "Solicitudes recientes"]
 )
 
 #############################################
 # Lanzamiento de la App Gradio
 #############################################
 if __name__ == "__main__":
+    iniciar_outbox()
+    demo.queue(default_concurrency_limit=GRADIO_CONCURRENCY_LIMIT, max_size=GRADIO_MAX_QUEUE)
     demo.launch(server_name="0.0.0.0", server_port=7861)
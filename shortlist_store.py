@@ -0,0 +1,181 @@
+import os
+import json
+import time
+import atexit
+import logging
+import threading
+from collections import OrderedDict
+from config import SHORTLIST_FILE, SHORTLIST_FLUSH_SECONDS, SHORTLIST_MAX_SESSIONS
+
+# Clave usada fuera de Gradio (scripts, pruebas) o si la petición no trae sesión.
+# También guarda la última búsqueda de cualquier sesión: es la lista que ven
+# las sesiones que no han buscado nada, como las de las apps independientes.
+SESION_LOCAL = "local"
+
+def clave_sesion(request=None):
+    """Identificador de la sesión de Gradio (session_hash) de la petición."""
+    return getattr(request, "session_hash", None) or SESION_LOCAL
+
+# =============================================================================
+# Candidatos seleccionados por sesión de Gradio. La búsqueda los guarda y el
+# chat y el correo los leen de memoria, sin pasar por un archivo compartido.
+# Con SHORTLIST_FILE, un hilo en segundo plano escribe una instantánea
+# (write-behind) agrupando los cambios cada SHORTLIST_FLUSH_SECONDS. Una
+# sesión sin lista vuelve a leer el archivo si otro proceso lo ha cambiado
+# (interface_chat.py o send_email.py ejecutados aparte de main.py).
+# =============================================================================
+class ShortlistStore:
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = ShortlistStore()
+        return cls._instance
+
+    def __init__(self, archivo=SHORTLIST_FILE, intervalo=SHORTLIST_FLUSH_SECONDS, max_sesiones=SHORTLIST_MAX_SESSIONS):
+        self.archivo = archivo
+        self.intervalo = intervalo
+        self.max_sesiones = max_sesiones
+        self._sesiones = OrderedDict()
+        self._lock = threading.Lock()
+        self._escritura_lock = threading.Lock()
+        self._pendiente = threading.Event()
+        self._escritor = None
+        # (mtime, tamaño) del archivo la última vez que se leyó o escribió
+        self._firma = None
+        if self.archivo:
+            self._cargar()
+            atexit.register(self.flush)
+
+    def guardar(self, sesion, candidatos, descripcion=""):
+        """Sustituye la lista de la sesión (candidatos con 'ID' como clave)."""
+        entrada = self._entrada(list(candidatos), descripcion, time.time())
+        with self._lock:
+            for clave in dict.fromkeys((sesion, SESION_LOCAL)):
+                self._sesiones[clave] = entrada
+                self._sesiones.move_to_end(clave)
+            self._recortar()
+        self._marcar_pendiente()
+
+    def candidatos(self, sesion):
+        entrada = self._buscar(sesion)
+        return list(entrada["candidatos"]) if entrada else []
+
+    def candidato(self, sesion, cv_id):
+        entrada = self._buscar(sesion)
+        return entrada["por_id"].get(str(cv_id).strip()) if entrada else None
+
+    def descripcion(self, sesion):
+        entrada = self._buscar(sesion)
+        return entrada["descripcion"] if entrada else ""
+
+    def ids(self, sesion):
+        entrada = self._buscar(sesion)
+        return list(entrada["por_id"]) if entrada else []
+
+    def _buscar(self, sesion):
+        """Entrada de la sesión o, si no tiene, la última búsqueda (de este u otro proceso)."""
+        with self._lock:
+            entrada = self._sesiones.get(sesion)
+        if entrada is not None:
+            return entrada
+        self._recargar()
+        with self._lock:
+            return self._sesiones.get(sesion) or self._sesiones.get(SESION_LOCAL)
+
+    def _recortar(self):
+        """Descarta las sesiones menos recientes; la última búsqueda (SESION_LOCAL) no cuenta."""
+        while len(self._sesiones) > self.max_sesiones + (SESION_LOCAL in self._sesiones):
+            del self._sesiones[next(s for s in self._sesiones if s != SESION_LOCAL)]
+
+    @staticmethod
+    def _entrada(candidatos, descripcion, actualizado):
+        return {
+            "candidatos": candidatos,
+            "por_id": {str(c.get("ID", "")).strip(): c for c in candidatos if str(c.get("ID", "")).strip()},
+            "descripcion": descripcion,
+            "actualizado": actualizado,
+        }
+
+    # -------------------------------------------------------------------------
+    # Persistencia write-behind
+    # -------------------------------------------------------------------------
+    def _marcar_pendiente(self):
+        if not self.archivo:
+            return
+        self._pendiente.set()
+        with self._lock:
+            if self._escritor is None:
+                self._escritor = threading.Thread(target=self._escribir_en_segundo_plano,
+                                                  name="shortlist-writer", daemon=True)
+                self._escritor.start()
+
+    def _escribir_en_segundo_plano(self):
+        while True:
+            self._pendiente.wait()
+            # Las búsquedas seguidas se agrupan en una sola escritura
+            time.sleep(self.intervalo)
+            self._pendiente.clear()
+            try:
+                self.flush()
+            except OSError as e:
+                logging.error("No se pudo guardar %s: %s", self.archivo, e)
+
+    def flush(self):
+        """Escribe ya la instantánea de todas las sesiones (escritura atómica)."""
+        if not self.archivo:
+            return
+        with self._lock:
+            instantanea = {
+                sesion: {k: e[k] for k in ("candidatos", "descripcion", "actualizado")}
+                for sesion, e in self._sesiones.items()
+            }
+        with self._escritura_lock:
+            tmp = self.archivo + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(instantanea, f, ensure_ascii=False)
+            os.replace(tmp, self.archivo)
+            self._firma = self._firma_archivo()
+
+    def _firma_archivo(self):
+        try:
+            stat = os.stat(self.archivo)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _cargar(self):
+        if self._recargar():
+            logging.info("Listas de candidatos restauradas de %s: %d sesiones", self.archivo, len(self._sesiones))
+
+    def _recargar(self):
+        """
+        Incorpora las sesiones del archivo si ha cambiado desde la última lectura
+        o escritura; una sesión solo se sustituye por una versión más reciente.
+        """
+        if not self.archivo:
+            return False
+        firma = self._firma_archivo()
+        if firma is None or firma == self._firma:
+            return False
+        try:
+            with open(self.archivo, "r", encoding="utf-8") as f:
+                datos = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logging.error("No se pudo leer %s: %s", self.archivo, e)
+            return False
+        self._firma = firma
+        orden = sorted(datos.items(), key=lambda item: item[1].get("actualizado", 0))
+        with self._lock:
+            for sesion, e in orden[-self.max_sesiones:]:
+                actual = self._sesiones.get(sesion)
+                if actual is not None and actual["actualizado"] >= e.get("actualizado", 0):
+                    continue
+                self._sesiones[sesion] = self._entrada(e.get("candidatos", []), e.get("descripcion", ""),
+                                                       e.get("actualizado", 0))
+                self._sesiones.move_to_end(sesion)
+            self._recortar()
+        return True
@@ -0,0 +1,128 @@
+"""
+Servidor SMTP mínimo en el mismo proceso (asyncio, sin TLS ni AUTH) para
+pruebas y benchmarks del envío de correos. Guarda los mensajes recibidos en
+memoria. Puede simular la latencia de red por respuesta y el coste de abrir
+una conexión (TLS + login en un servidor real).
+
+Como servidor independiente, para apuntar la app a él:
+    python smtp_stub.py --port 1025
+    SMTP_HOST=127.0.0.1 SMTP_PORT=1025 SMTP_STARTTLS=0 python main.py
+"""
+import argparse
+import asyncio
+from email import message_from_bytes
+
+class SMTPStub:
+    def __init__(self, host="127.0.0.1", port=0, latencia=0.0, latencia_conexion=0.0, verbose=False):
+        self.host = host
+        self.port = port
+        self.latencia = latencia
+        self.latencia_conexion = latencia_conexion
+        self.verbose = verbose
+        self.mensajes = []
+        self.conexiones = 0
+        self._server = None
+
+    async def iniciar(self):
+        self._server = await asyncio.start_server(self._atender, self.host, self.port)
+        # Con port=0 el sistema asigna un puerto libre
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def detener(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self):
+        return await self.iniciar()
+
+    async def __aexit__(self, *exc):
+        await self.detener()
+
+    async def _responder(self, writer, *lineas):
+        if self.latencia:
+            await asyncio.sleep(self.latencia)
+        # Respuesta multilínea: "250-..." salvo la última, "250 ..."
+        texto = "".join(
+            f"{linea[:3]}{'-' if i < len(lineas) - 1 else ' '}{linea[4:]}\r\n" for i, linea in enumerate(lineas)
+        )
+        writer.write(texto.encode("utf-8"))
+        await writer.drain()
+
+    async def _atender(self, reader, writer):
+        self.conexiones += 1
+        if self.latencia_conexion:
+            await asyncio.sleep(self.latencia_conexion)
+        remitente, destinatarios = None, []
+        try:
+            await self._responder(writer, "220 smtp-stub ESMTP")
+            while True:
+                linea = await reader.readline()
+                if not linea:
+                    break
+                comando = linea.decode("utf-8", errors="replace").strip()
+                verbo = comando[:4].upper()
+                if verbo == "EHLO":
+                    await self._responder(writer, "250 smtp-stub", "250 8BITMIME", "250 SMTPUTF8", "250 SIZE 10485760")
+                elif verbo == "HELO":
+                    await self._responder(writer, "250 smtp-stub")
+                elif verbo == "MAIL":
+                    remitente, destinatarios = comando[10:].strip(), []
+                    await self._responder(writer, "250 OK")
+                elif verbo == "RCPT":
+                    destinatarios.append(comando[8:].strip())
+                    await self._responder(writer, "250 OK")
+                elif verbo == "DATA":
+                    await self._responder(writer, "354 End data with <CR><LF>.<CR><LF>")
+                    datos = await self._leer_datos(reader)
+                    self.mensajes.append({"from": remitente, "to": destinatarios, "data": datos})
+                    if self.verbose:
+                        mensaje = message_from_bytes(datos)
+                        print(f"📨 {remitente} → {', '.join(destinatarios)}: {mensaje['Subject']}")
+                    remitente, destinatarios = None, []
+                    await self._responder(writer, "250 OK: queued")
+                elif verbo == "RSET":
+                    remitente, destinatarios = None, []
+                    await self._responder(writer, "250 OK")
+                elif verbo == "NOOP":
+                    await self._responder(writer, "250 OK")
+                elif verbo == "QUIT":
+                    await self._responder(writer, "221 Bye")
+                    break
+                else:
+                    await self._responder(writer, "502 Command not implemented")
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _leer_datos(reader):
+        lineas = []
+        while True:
+            linea = await reader.readline()
+            if not linea or linea in (b".\r\n", b".\n"):
+                break
+            # Transparencia SMTP: una línea que empieza por "." llega con un punto extra
+            if linea.startswith(b".."):
+                linea = linea[1:]
+            lineas.append(linea)
+        return b"".join(lineas)
+
+async def main():
+    parser = argparse.ArgumentParser(description="Servidor SMTP local de pruebas (sin TLS ni AUTH).")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1025)
+    parser.add_argument("--latencia", type=float, default=0.0, help="Segundos de espera por respuesta")
+    args = parser.parse_args()
+    async with SMTPStub(args.host, args.port, latencia=args.latencia, verbose=True) as stub:
+        print(f"✅ Servidor SMTP de pruebas en {stub.host}:{stub.port}")
+        await asyncio.Event().wait()
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
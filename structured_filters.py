@@ -0,0 +1,267 @@
+import re
+import json
+import sqlite3
+import datetime
+import threading
+import unicodedata
+
+# =============================================================================
+# Filtros estructurados (ubicación, idioma + nivel, años de experiencia y
+# nivel educativo). Los valores se derivan del texto del CV al cargarlo y se
+# guardan en columnas indexadas de 'cv' y en la tabla 'cv_idioma', de modo que
+# un filtro se resuelve con una consulta SQL que devuelve los ids permitidos.
+# =============================================================================
+DERIVED_FIELDS = ("anios_experiencia", "ciudad", "pais", "nivel_educativo", "idiomas_nivel")
+DERIVED_TYPES = {
+    "anios_experiencia": "INTEGER",
+    "ciudad": "TEXT",
+    "pais": "TEXT",
+    "nivel_educativo": "INTEGER",
+    "idiomas_nivel": "TEXT",  # JSON [[idioma, nivel], ...]; alimenta cv_idioma mediante triggers
+}
+
+NIVELES_IDIOMA = {
+    "basico": 1, "elemental": 1, "a1": 1, "a2": 1,
+    "intermedio": 2, "b1": 2,
+    "intermedio alto": 3, "avanzado": 3, "b2": 3,
+    "fluido": 4, "profesional": 4, "c1": 4,
+    "nativo": 5, "bilingue": 5, "lengua materna": 5, "c2": 5,
+}
+# Etiquetas que se muestran en la interfaz (de menor a mayor)
+NIVELES_IDIOMA_UI = {"Básico": 1, "Intermedio": 2, "Avanzado": 3, "Fluido": 4, "Nativo": 5}
+
+# Nivel educativo máximo detectado (se busca de mayor a menor)
+NIVELES_EDUCATIVOS = (
+    (4, "Doctorado", re.compile(r"\b(doctorado|doctor|phd|ph\.d)\b")),
+    (3, "Máster", re.compile(r"\b(master|mba|msc|postgrado|posgrado)\b")),
+    (2, "Universitario", re.compile(r"\b(grado|licenciatura|licenciado|ingenieria|ingeniero|bachelor|"
+                                    r"universidad|university|universite|universita|universidade|"
+                                    r"college|school|escuela|institut\w*|politecnic\w*|fundacao)\b")),
+    (1, "Formación profesional", re.compile(r"\b(tecnico|fp|formacion profesional|ciclo formativo|bachillerato)\b")),
+)
+NIVELES_EDUCATIVOS_UI = {etiqueta: nivel for nivel, etiqueta, _ in reversed(NIVELES_EDUCATIVOS)}
+
+PERIODO = re.compile(
+    r"\b((?:19|20)\d{2})\s*[-–]\s*((?:19|20)\d{2}|actualidad|actual|presente|hoy|present|now)\b"
+)
+
+def normalizar(texto):
+    """Minúsculas y sin acentos, para comparar ubicaciones e idiomas."""
+    texto = unicodedata.normalize("NFKD", (texto or "").lower())
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return re.sub(r"\s+", " ", texto).strip()
+
+def anios_experiencia(texto, anio_actual=None):
+    """Años cubiertos por los periodos 'AAAA-AAAA' del texto (los solapes se cuentan una vez)."""
+    anio_actual = anio_actual or datetime.date.today().year
+    periodos = []
+    for inicio, fin in PERIODO.findall(texto or ""):
+        fin = int(fin) if fin.isdigit() else anio_actual
+        if int(inicio) <= fin:
+            periodos.append((int(inicio), fin))
+    total, actual = 0, None
+    for inicio, fin in sorted(periodos):
+        if actual and inicio <= actual[1]:
+            actual = (actual[0], max(actual[1], fin))
+            continue
+        if actual:
+            total += actual[1] - actual[0]
+        actual = (inicio, fin)
+    if actual:
+        total += actual[1] - actual[0]
+    return total
+
+def dividir_ubicacion(texto):
+    """'Madrid, España ----' -> ('madrid', 'espana')."""
+    texto = normalizar(re.sub(r"-{2,}", " ", texto or "")).strip(" ,.")
+    if "," not in texto:
+        return texto, ""
+    ciudad, pais = texto.rsplit(",", 1)
+    return ciudad.strip(), pais.strip()
+
+def nivel_educativo(texto):
+    texto = normalizar(texto)
+    for nivel, _, patron in NIVELES_EDUCATIVOS:
+        if patron.search(texto):
+            return nivel
+    return 0
+
+def niveles_idioma(texto):
+    """'Español (nativo), Inglés (fluido)' -> [['espanol', 5], ['ingles', 4]] (nivel 0 si no se indica)."""
+    niveles = {}
+    for parte in re.split(r"[,;/]|\by\b", normalizar(texto)):
+        m = re.match(r"\s*([^()]+?)\s*(?:\(([^)]*)\))?\s*$", parte)
+        if not m or not m.group(1):
+            continue
+        idioma = m.group(1).strip()
+        nivel = NIVELES_IDIOMA.get((m.group(2) or "").strip(), 0)
+        niveles[idioma] = max(nivel, niveles.get(idioma, 0))
+    return [[idioma, nivel] for idioma, nivel in niveles.items()]
+
+def atributos_derivados(data):
+    """Valores de DERIVED_FIELDS a partir de los campos extraídos de un CV."""
+    ciudad, pais = dividir_ubicacion(data.get("ubicacion"))
+    return (
+        anios_experiencia(data.get("experiencia")),
+        ciudad,
+        pais,
+        nivel_educativo(data.get("educacion")),
+        json.dumps(niveles_idioma(data.get("idiomas")), ensure_ascii=False),
+    )
+
+# -----------------------------------------------------------------------------
+# Esquema: columnas derivadas con índices y tabla cv_idioma con sus triggers.
+# -----------------------------------------------------------------------------
+IDIOMA_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS cv_idioma (
+        idioma TEXT NOT NULL,
+        cv_id INTEGER NOT NULL,
+        nivel INTEGER NOT NULL,
+        PRIMARY KEY (idioma, cv_id)
+    ) WITHOUT ROWID
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_cv_idioma_cv ON cv_idioma(cv_id)",
+    """
+    CREATE TRIGGER IF NOT EXISTS cv_idioma_ai AFTER INSERT ON cv BEGIN
+        INSERT OR REPLACE INTO cv_idioma (idioma, cv_id, nivel)
+        SELECT json_extract(value, '$[0]'), new.id, json_extract(value, '$[1]')
+        FROM json_each(COALESCE(new.idiomas_nivel, '[]'));
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS cv_idioma_ad AFTER DELETE ON cv BEGIN
+        DELETE FROM cv_idioma WHERE cv_id = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS cv_idioma_au AFTER UPDATE OF idiomas_nivel ON cv BEGIN
+        DELETE FROM cv_idioma WHERE cv_id = old.id;
+        INSERT OR REPLACE INTO cv_idioma (idioma, cv_id, nivel)
+        SELECT json_extract(value, '$[0]'), new.id, json_extract(value, '$[1]')
+        FROM json_each(COALESCE(new.idiomas_nivel, '[]'));
+    END
+    """,
+)
+
+DERIVED_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_cv_anios ON cv(anios_experiencia)",
+    "CREATE INDEX IF NOT EXISTS idx_cv_pais ON cv(pais)",
+    "CREATE INDEX IF NOT EXISTS idx_cv_ciudad ON cv(ciudad)",
+    "CREATE INDEX IF NOT EXISTS idx_cv_nivel_educativo ON cv(nivel_educativo)",
+)
+
+def asegurar_filtros(conn):
+    """
+    Añade las columnas derivadas a 'cv' (calculándolas para las filas que no
+    las tengan), sus índices y la tabla cv_idioma. Es idempotente.
+    """
+    columnas = {fila[1] for fila in conn.execute("PRAGMA table_info(cv)")}
+    for campo in DERIVED_FIELDS:
+        if campo not in columnas:
+            conn.execute(f"ALTER TABLE cv ADD COLUMN {campo} {DERIVED_TYPES[campo]}")
+
+    pendientes = conn.execute(
+        "SELECT id, experiencia, ubicacion, educacion, idiomas FROM cv WHERE idiomas_nivel IS NULL"
+    ).fetchall()
+    if pendientes:
+        print(f"ℹ️ Calculando filtros estructurados de {len(pendientes)} CVs...")
+        # En modo autocommit (isolation_level=None) se agrupa todo en una transacción
+        explicita = conn.isolation_level is None
+        if explicita:
+            conn.execute("BEGIN")
+        conn.executemany(
+            f"UPDATE cv SET {', '.join(f'{c} = ?' for c in DERIVED_FIELDS)} WHERE id = ?",
+            [
+                atributos_derivados({"experiencia": exp, "ubicacion": ubi, "educacion": edu, "idiomas": idi}) + (cv_id,)
+                for cv_id, exp, ubi, edu, idi in pendientes
+            ]
+        )
+        if explicita:
+            conn.execute("COMMIT")
+
+    for sentencia in DERIVED_INDEXES:
+        conn.execute(sentencia)
+    existia = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'cv_idioma'"
+    ).fetchone() is not None
+    conn.execute(IDIOMA_SCHEMA[0])
+    if not existia:
+        conn.execute("""
+            INSERT OR REPLACE INTO cv_idioma (idioma, cv_id, nivel)
+            SELECT json_extract(j.value, '$[0]'), cv.id, json_extract(j.value, '$[1]')
+            FROM cv, json_each(COALESCE(cv.idiomas_nivel, '[]')) AS j
+        """)
+    for sentencia in IDIOMA_SCHEMA[1:]:
+        conn.execute(sentencia)
+    if conn.in_transaction:
+        conn.commit()
+
+_filtros_listos = set()
+_filtros_lock = threading.Lock()
+
+def asegurar_filtros_una_vez(db_name):
+    with _filtros_lock:
+        if db_name in _filtros_listos:
+            return
+        conn = sqlite3.connect(db_name, timeout=30)
+        try:
+            asegurar_filtros(conn)
+        finally:
+            conn.close()
+        _filtros_listos.add(db_name)
+
+# -----------------------------------------------------------------------------
+# Evaluación de filtros.
+# filtros = {"ubicacion": "madrid", "idioma": "inglés", "nivel_idioma": 4,
+#            "anios_min": 5, "nivel_educativo_min": 2}; las claves vacías se ignoran.
+# -----------------------------------------------------------------------------
+def construir_filtros(ubicacion=None, idioma=None, nivel_idioma=None, anios_min=None, nivel_educativo_min=None):
+    """Filtros a partir de los valores de la interfaz (acepta etiquetas como 'Fluido' o 'Máster')."""
+    filtros = {}
+    if ubicacion and ubicacion.strip():
+        filtros["ubicacion"] = normalizar(ubicacion)
+    if idioma and idioma.strip():
+        filtros["idioma"] = normalizar(idioma)
+        nivel = NIVELES_IDIOMA_UI.get(nivel_idioma, nivel_idioma)
+        if nivel:
+            filtros["nivel_idioma"] = int(nivel)
+    if anios_min:
+        filtros["anios_min"] = int(anios_min)
+    nivel = NIVELES_EDUCATIVOS_UI.get(nivel_educativo_min, nivel_educativo_min)
+    if nivel:
+        filtros["nivel_educativo_min"] = int(nivel)
+    return filtros
+
+def condicion_sql(filtros):
+    """Condición WHERE sobre 'cv' (y sus parámetros) equivalente a los filtros."""
+    condiciones, parametros = [], []
+    if filtros.get("ubicacion"):
+        condiciones.append("(ciudad = ? OR pais = ?)")
+        parametros += [filtros["ubicacion"], filtros["ubicacion"]]
+    if filtros.get("idioma"):
+        condiciones.append("id IN (SELECT cv_id FROM cv_idioma WHERE idioma = ? AND nivel >= ?)")
+        parametros += [filtros["idioma"], filtros.get("nivel_idioma", 0)]
+    if filtros.get("anios_min"):
+        condiciones.append("anios_experiencia >= ?")
+        parametros.append(filtros["anios_min"])
+    if filtros.get("nivel_educativo_min"):
+        condiciones.append("nivel_educativo >= ?")
+        parametros.append(filtros["nivel_educativo_min"])
+    return " AND ".join(condiciones) or "1", parametros
+
+def ids_permitidos(filtros, db_name="cv_database.db"):
+    """Conjunto de ids de 'cv' (como str) que cumplen los filtros, o None si no hay filtros."""
+    if not filtros:
+        return None
+    asegurar_filtros_una_vez(db_name)
+    condicion, parametros = condicion_sql(filtros)
+    conn = sqlite3.connect(db_name, timeout=30)
+    try:
+        return {str(cv_id) for (cv_id,) in conn.execute(f"SELECT id FROM cv WHERE {condicion}", parametros)}
+    finally:
+        conn.close()
+
+def clave_filtros(filtros):
+    """Representación estable de los filtros para usarla en claves de caché."""
+    return tuple(sorted((filtros or {}).items()))
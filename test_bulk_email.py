@@ -0,0 +1,26 @@
+import asyncio
+from smtp_stub import SMTPStub
+from bulk_email import SMTPPool, send_bulk_emails, resumen_envio
+
+CANDIDATOS = [
+    {"ID": "1", "Nombre": "Ana", "Correo": "ana@example.com"},
+    {"ID": "2", "Nombre": "Luis", "Correo": "No disponible"},
+] + [{"ID": str(i), "Nombre": f"Candidato {i}", "Correo": f"c{i}@example.com"} for i in range(3, 23)]
+
+def test_envio_con_pool():
+    async def enviar():
+        async with SMTPStub() as stub:
+            async with SMTPPool(stub.host, stub.port, start_tls=False, size=3, max_mensajes=5) as pool:
+                resultados = await send_bulk_emails(CANDIDATOS, "Entrevista", "Hola {name}", pool=pool,
+                                                    por_segundo=0, remitente="rrhh@example.com")
+            return resultados, stub
+
+    resultados, stub = asyncio.run(enviar())
+    assert [r["ID"] for r in resultados] == [c["ID"] for c in CANDIDATOS]
+    assert sum(r["success"] for r in resultados) == 21
+    assert not resultados[1]["success"]
+    assert len(stub.mensajes) == 21
+    assert any(b"Hola Ana" in m["data"] for m in stub.mensajes)
+    # Las conexiones se reutilizan y se renuevan cada 5 mensajes
+    assert stub.conexiones < 10
+    assert "21 de 22" in resumen_envio(resultados)
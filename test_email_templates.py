@@ -0,0 +1,38 @@
+from email_templates import (
+    extraer_fecha, extraer_hora, extraer_puesto, elegir_plantilla, renderizar_correo, PLANTILLA_GENERAL
+)
+
+def test_extraccion_de_huecos():
+    assert extraer_fecha("entrevista el próximo viernes a las 10h") == "el próximo viernes"
+    assert extraer_fecha("entrevista el 15 de Marzo") == "el 15 de marzo"
+    assert extraer_fecha("entrevista el 12/05 por la mañana") == "el 12/05"
+    assert extraer_fecha("entrevista por la mañana") is None
+    assert extraer_hora("a las 3pm") == "15:00"
+    assert extraer_hora("entrevista a las 9:30") == "09:30"
+    assert extraer_hora("entrevista el lunes") is None
+    assert extraer_puesto("entrevista para el puesto de Data Engineer, el lunes") == "Data Engineer"
+    assert extraer_puesto("entrevista", "Desarrollador Python") == "Desarrollador Python"
+    assert extraer_puesto("entrevista", "x" * 200) is None
+
+def test_eleccion_y_renderizado():
+    assert elegir_plantilla("envia un correo para entrevista").clave == "entrevista"
+    assert elegir_plantilla("entrevista el viernes a las 3pm").clave == "entrevista_fecha"
+    assert elegir_plantilla("no vamos a seguir tras la entrevista").clave == "descarte"
+    # Peticiones a medida o sin intención reconocida se escalan al LLM
+    assert elegir_plantilla("entrevista y pregúntale por su experiencia con Kubernetes") is None
+    assert renderizar_correo({"Nombre": "Ana"}, "felicítale por su cumpleaños") is None
+    # Una hora sin fecha no se pierde: variante solo con hora
+    assert elegir_plantilla("cítalo a una entrevista a las 10h").clave == "entrevista_hora"
+    _, cuerpo = renderizar_correo({"Nombre": "Luis"}, "cítalo a una entrevista a las 10h")
+    assert "una entrevista a las 10:00." in cuerpo
+    # Una plantilla sin hueco para la fecha o la hora de la consulta se escala al LLM
+    assert elegir_plantilla("avanza a la siguiente fase, llamada el lunes a las 10h") is None
+
+    asunto, cuerpo = renderizar_correo({"Nombre": "Ana"}, "entrevista el viernes a las 3pm", "Contable")
+    assert asunto == "Invitación a entrevista"
+    assert cuerpo.startswith("Hola Ana,")
+    assert "para el puesto de Contable" in cuerpo
+    assert "una entrevista el viernes a las 15:00." in cuerpo
+
+    asunto, _ = renderizar_correo({"Nombre": ""}, "felicítale", general=True)
+    assert asunto == PLANTILLA_GENERAL.asunto
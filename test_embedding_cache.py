@@ -0,0 +1,44 @@
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from embedding_cache import EmbeddingCache, CachedEmbeddings, hash_texto
+
+class EmbeddingsContados(Embeddings):
+    def __init__(self):
+        self.textos = []
+
+    def embed_documents(self, texts):
+        self.textos.extend(texts)
+        return [[float(len(t)), 1.0, 2.0] for t in texts]
+
+    def embed_query(self, text):
+        return [float(len(text)), 1.0, 2.0]
+
+def test_ida_y_vuelta_y_desalojo_por_modelo(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cv.db"))
+    vector = np.arange(4, dtype=np.float32)
+    cache.put_many("modelo-a", {hash_texto("hola"): vector})
+    cache.put_many("modelo-b", {hash_texto("hola"): vector + 1})
+
+    encontrados = cache.get_many("modelo-a", [hash_texto("hola"), hash_texto("adiós")])
+    assert list(encontrados) == [hash_texto("hola")]
+    np.testing.assert_array_equal(encontrados[hash_texto("hola")], vector)
+
+    assert cache.evict_other_models(["modelo-a"]) == 1
+    assert cache.count("modelo-b") == 0 and cache.count("modelo-a") == 1
+
+def test_solo_se_calculan_los_que_faltan(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cv.db"))
+    base = EmbeddingsContados()
+    embeddings = CachedEmbeddings(base, cache, "modelo")
+
+    primera = embeddings.embed_documents_array(["uno", "dos", "uno"])
+    assert base.textos == ["uno", "dos"]
+    assert primera.dtype == np.float32 and primera.shape == (3, 3)
+
+    base.textos.clear()
+    segunda = embeddings.embed_documents_array(["dos", "tres", "uno"])
+    assert base.textos == ["tres"]
+    np.testing.assert_array_equal(segunda[[0, 2]], primera[[1, 0]])
+    # Otro modelo no comparte vectores
+    CachedEmbeddings(base, cache, "otro").embed_documents(["uno"])
+    assert base.textos == ["tres", "uno"]
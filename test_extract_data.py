@@ -0,0 +1,58 @@
+import os
+import random
+from load_txt_to_db import (
+    read_txt_file,
+    split_profiles,
+    preprocess_text,
+    extract_data,
+    extract_data_regex,
+    FIELD_LABELS,
+)
+
+TXT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Base_datos_final.txt")
+
+def test_golden_base_datos():
+    """El extractor de una pasada debe dar exactamente lo mismo que la versión regex."""
+    perfiles = split_profiles(read_txt_file(TXT_PATH))
+    comprobados = 0
+    for perfil in perfiles:
+        procesado = preprocess_text(perfil)
+        assert extract_data(procesado) == extract_data_regex(procesado)
+        # También sobre el texto sin preprocesar (saltos de línea y espacios originales)
+        assert extract_data(perfil) == extract_data_regex(perfil)
+        comprobados += 1
+    assert comprobados > 100
+
+def test_casos_atipicos():
+    base = preprocess_text(split_profiles(read_txt_file(TXT_PATH))[1])
+    casos = [
+        "",
+        "texto sin etiquetas",
+        base.replace("Ubicación:", "Ubicacion:"),        # falta la última etiqueta
+        base.replace("Email: ", "Email:"),                # sin espacio tras la etiqueta
+        base.replace(" Teléfono:", "Teléfono:"),          # sin espacio antes de la etiqueta
+        base.replace("Resumen: ", "Resumen: Nombre: "),   # etiqueta repetida dentro de un valor
+        base + " Email: otro@email.com",                  # etiqueta repetida al final
+        base.replace("Habilidades:", "Habilidades:\n"),
+        base.replace(" Idiomas:", "\nx\nIdiomas:"),       # salto de línea en un campo de una línea
+        "Nombre: Email: Teléfono: Educación: Experiencia: Habilidades: Idiomas: Resumen: Ubicación:",
+        "Nombre: a Email: b Teléfono: c Educación: d Experiencia: e Habilidades: f Idiomas: g Resumen: Ubicación: h",
+    ]
+    for caso in casos:
+        assert extract_data(caso) == extract_data_regex(caso), caso
+
+def test_perfiles_aleatorios():
+    rng = random.Random(1234)
+    etiquetas = [label for _, label in FIELD_LABELS]
+    piezas = [" ", "\n", "  ", "\t", "valor", "Ñandú", "a:b", "-", ""]
+    for _ in range(5000):
+        if rng.random() < 0.3:
+            # Etiquetas en cualquier orden
+            texto = "".join(rng.choice(etiquetas + piezas) for _ in range(rng.randint(0, 30)))
+        else:
+            # Etiquetas en el orden habitual con separadores y valores variados
+            texto = "".join(
+                label + "".join(rng.choice(piezas) for _ in range(rng.randint(0, 4)))
+                for label in etiquetas
+            )
+        assert extract_data(texto) == extract_data_regex(texto), repr(texto)
@@ -0,0 +1,44 @@
+import os
+import sqlite3
+import pytest
+import load_txt_to_db
+from load_txt_to_db import ingest_paths, read_txt_file, split_profiles
+
+TXT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Base_datos_final.txt")
+
+def repartir(tmp_path, partes=3):
+    """Divide Base_datos_final.txt en varios ficheros y devuelve el directorio."""
+    perfiles = [p for p in split_profiles(read_txt_file(TXT_PATH)) if p.strip()]
+    carpeta = tmp_path / "cvs"
+    carpeta.mkdir()
+    for i in range(partes):
+        (carpeta / f"parte_{i}.txt").write_text("".join(perfiles[i::partes]), encoding="utf-8")
+    return carpeta
+
+def test_carga_en_paralelo(tmp_path):
+    carpeta = repartir(tmp_path)
+    db = str(tmp_path / "cv.db")
+    informes = ingest_paths([str(carpeta)], db_name=db, workers=2, chunk_size=20, reset=True)
+    assert len(informes) == 3
+    assert not any(i["error"] for i in informes.values())
+
+    escritos = sum(i["escritos"] for i in informes.values())
+    conn = sqlite3.connect(db)
+    assert conn.execute("SELECT COUNT(*) FROM cv").fetchone()[0] == escritos > 100
+    conn.close()
+
+    # Repetir la carga no duplica: todo queda sin cambios
+    informes = ingest_paths([str(carpeta)], db_name=db, workers=2, chunk_size=20)
+    assert sum(i["escritos"] for i in informes.values()) == 0
+
+def test_fallo_del_escritor_no_bloquea(tmp_path, monkeypatch):
+    carpeta = repartir(tmp_path)
+
+    def fallar(conn, rows):
+        raise sqlite3.OperationalError("disco lleno")
+
+    monkeypatch.setattr(load_txt_to_db, "insert_batch", fallar)
+    # Cola de un solo lote y lotes de una fila: los procesos quedan bloqueados en cola.put
+    with pytest.raises(sqlite3.OperationalError):
+        ingest_paths([str(carpeta)], db_name=str(tmp_path / "cv.db"), workers=2,
+                     chunk_size=1, reset=True, max_queued_batches=1)
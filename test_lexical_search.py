@@ -0,0 +1,33 @@
+import os
+import sqlite3
+from load_txt_to_db import ingest_file
+from lexical_search import buscar_bm25, fusion_rrf
+
+TXT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Base_datos_final.txt")
+
+def test_fts_sincronizado_con_cv(tmp_path):
+    db = str(tmp_path / "cv.db")
+    ingest_file(TXT_PATH, db_name=db)
+    conn = sqlite3.connect(db)
+    try:
+        con_python = {str(i) for (i,) in conn.execute("SELECT id FROM cv WHERE habilidades LIKE '%python%'")}
+        assert con_python
+        assert con_python <= {cv_id for cv_id, _ in buscar_bm25("Python", top_k=500, db_name=db)}
+
+        # Los triggers mantienen el índice al actualizar y borrar filas
+        conn.execute("UPDATE cv SET habilidades = 'Xilografía' WHERE id = 1")
+        conn.commit()
+        assert [cv_id for cv_id, _ in buscar_bm25("xilografia", db_name=db)] == ["1"]
+        conn.execute("DELETE FROM cv WHERE id = 1")
+        conn.commit()
+        assert buscar_bm25("xilografia", db_name=db) == []
+    finally:
+        conn.close()
+
+def test_fusion_rrf():
+    vectorial = ["1", "2", "3"]
+    lexico = ["3", "4"]
+    assert [i for i, _ in fusion_rrf(vectorial, lexico, peso_lexico=0)] == vectorial
+    assert [i for i, _ in fusion_rrf(vectorial, lexico, peso_lexico=1)] == lexico
+    # "3" aparece en ambas listas y sube al primer puesto con pesos iguales
+    assert fusion_rrf(vectorial, lexico, peso_lexico=0.5)[0][0] == "3"
@@ -0,0 +1,31 @@
+import llm_cache
+from llm_cache import LLMResponseCache
+
+MENSAJES = [{"role": "user", "content": "Rankea estos candidatos"}]
+
+def test_caducidad(tmp_path, monkeypatch):
+    cache = LLMResponseCache(db_name=str(tmp_path / "llm_cache.db"), ttl=60, max_entries=10)
+    monkeypatch.setattr(llm_cache.time, "time", lambda: 1000.0)
+    cache.put("modelo", 0.5, MENSAJES, "respuesta")
+    assert cache.get("modelo", 0.5, MENSAJES) == "respuesta"
+    # Otra temperatura es otra clave
+    assert cache.get("modelo", 0.0, MENSAJES) is None
+
+    monkeypatch.setattr(llm_cache.time, "time", lambda: 1061.0)
+    assert cache.get("modelo", 0.5, MENSAJES) is None
+
+def test_desalojo_lru_y_contadores(tmp_path, monkeypatch):
+    cache = LLMResponseCache(db_name=str(tmp_path / "llm_cache.db"), ttl=3600, max_entries=2)
+    reloj = iter(range(1000, 2000))
+    monkeypatch.setattr(llm_cache.time, "time", lambda: float(next(reloj)))
+    mensajes = [[{"role": "user", "content": f"prompt {i}"}] for i in range(3)]
+
+    cache.put("modelo", 0.5, mensajes[0], "r0")
+    cache.put("modelo", 0.5, mensajes[1], "r1")
+    # Leer r0 lo convierte en el más reciente: al pasar del máximo se desaloja r1
+    assert cache.get("modelo", 0.5, mensajes[0], sitio="rerank") == "r0"
+    cache.put("modelo", 0.5, mensajes[2], "r2")
+    assert cache.get("modelo", 0.5, mensajes[1], sitio="chat") is None
+    assert cache.get("modelo", 0.5, mensajes[2], sitio="chat") == "r2"
+
+    assert cache.stats() == {"chat": {"hits": 1, "misses": 1}, "rerank": {"hits": 1, "misses": 0}}
@@ -0,0 +1,161 @@
+import json
+import time
+import asyncio
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+import llm_client
+from llm_client import LLMClient, LLMError
+
+MENSAJES = [{"role": "user", "content": "hola"}]
+
+async def con_servidor(respuestas, prueba):
+    """Levanta un servidor /v1/chat/completions que devuelve 'respuestas' en orden."""
+    llamadas = []
+
+    async def completions(request):
+        llamadas.append(time.monotonic())
+        estado, cabeceras, espera = respuestas[min(len(llamadas), len(respuestas)) - 1]
+        await asyncio.sleep(espera)
+        if estado == 200:
+            return web.json_response({"choices": [{"message": {"content": "respuesta"}}]})
+        return web.json_response({"error": "ocupado"}, status=estado, headers=cabeceras)
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", completions)
+    async with TestServer(app) as servidor:
+        return await prueba(str(servidor.make_url("/v1")), llamadas)
+
+def test_reintenta_429_y_5xx_con_retry_after():
+    async def prueba(url, llamadas):
+        cliente = LLMClient(base_url=url, timeout=5, max_retries=3, backoff_base=0.01)
+        try:
+            assert await cliente.chat(MENSAJES, "modelo") == "respuesta"
+        finally:
+            await cliente.aclose()
+        # Retry-After: 0.2 tras el 429; el 503 sin cabecera usa el backoff corto
+        assert len(llamadas) == 3
+        assert llamadas[1] - llamadas[0] >= 0.2
+
+    asyncio.run(con_servidor([(429, {"Retry-After": "0.2"}, 0), (503, {}, 0), (200, {}, 0)], prueba))
+
+def test_plazo_total_incluye_reintentos():
+    async def espera_mayor_que_el_plazo(url, llamadas):
+        cliente = LLMClient(base_url=url, timeout=1, max_retries=5, backoff_max=10)
+        try:
+            with pytest.raises(LLMError) as error:
+                await cliente.chat(MENSAJES, "modelo")
+        finally:
+            await cliente.aclose()
+        # Un Retry-After que no cabe en el plazo corta los reintentos
+        assert error.value.status == 503 and len(llamadas) == 1
+
+    asyncio.run(con_servidor([(503, {"Retry-After": "5"}, 0)], espera_mayor_que_el_plazo))
+
+    async def servidor_lento(url, llamadas):
+        cliente = LLMClient(base_url=url, timeout=0.5, max_retries=10, backoff_base=0.01)
+        inicio = time.monotonic()
+        try:
+            with pytest.raises(LLMError):
+                await cliente.chat(MENSAJES, "modelo")
+        finally:
+            await cliente.aclose()
+        # Cada intento tarda 0.2s: sin plazo total serían 11 intentos y más de 2s
+        assert time.monotonic() - inicio < 0.8
+        assert len(llamadas) <= 3
+
+    asyncio.run(con_servidor([(503, {}, 0.2)], servidor_lento))
+
+def test_cuerpo_inesperado_es_llmerror():
+    async def completions(request):
+        return web.json_response({"choices": []})
+
+    async def prueba():
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", completions)
+        async with TestServer(app) as servidor:
+            cliente = LLMClient(base_url=str(servidor.make_url("/v1")), timeout=5)
+            try:
+                with pytest.raises(LLMError) as error:
+                    await cliente.chat(MENSAJES, "modelo")
+            finally:
+                await cliente.aclose()
+        assert error.value.status == 200
+
+    asyncio.run(prueba())
+
+def test_ejecutar_cierra_la_sesion_compartida(monkeypatch):
+    cliente = LLMClient(base_url="http://127.0.0.1:9/v1")
+    monkeypatch.setattr(llm_client, "_client", cliente)
+    sesiones = []
+
+    async def usar_cliente():
+        sesiones.append(cliente._get_session())
+        return "hecho"
+
+    assert llm_client.ejecutar(usar_cliente()) == "hecho"
+    assert sesiones[0].closed
+
+def evento(texto):
+    return ('data: {"choices": [{"delta": {"content": %s}}]}\n\n' % json.dumps(texto)).encode("utf-8")
+
+async def con_servidor_sse(respuestas, prueba):
+    """Cada respuesta es una lista de trozos SSE; None en lugar de trozo corta la conexión."""
+    llamadas = []
+
+    async def completions(request):
+        llamadas.append(time.monotonic())
+        trozos = respuestas[min(len(llamadas), len(respuestas)) - 1]
+        if isinstance(trozos, int):
+            return web.json_response({"error": "ocupado"}, status=trozos)
+        respuesta = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await respuesta.prepare(request)
+        for trozo in trozos:
+            if trozo is None:
+                request.transport.close()
+                return respuesta
+            await respuesta.write(trozo)
+            await asyncio.sleep(0.01)
+        await respuesta.write_eof()
+        return respuesta
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", completions)
+    async with TestServer(app) as servidor:
+        return await prueba(str(servidor.make_url("/v1")), llamadas)
+
+def test_stream_sse_con_trozos_partidos_y_done():
+    primero, segundo = evento("Ho"), evento("la")
+    trozos = [
+        b": comentario\n\n",
+        primero + segundo[:15],
+        segundo[15:],
+        b"data: {no es json}\n\n",
+        b"data: [DONE]\n\n",
+        evento(" ignorado"),
+    ]
+
+    async def prueba(url, llamadas):
+        cliente = LLMClient(base_url=url, timeout=5)
+        try:
+            return [f async for f in cliente.stream(MENSAJES, "modelo")]
+        finally:
+            await cliente.aclose()
+
+    assert asyncio.run(con_servidor_sse([trozos], prueba)) == ["Ho", "la"]
+
+def test_stream_solo_reintenta_antes_del_primer_fragmento():
+    async def prueba(url, llamadas):
+        cliente = LLMClient(base_url=url, timeout=5, max_retries=3, backoff_base=0.01)
+        recibidos = []
+        try:
+            with pytest.raises(LLMError):
+                async for fragmento in cliente.stream(MENSAJES, "modelo"):
+                    recibidos.append(fragmento)
+        finally:
+            await cliente.aclose()
+        # El 503 se reintenta; el corte tras "Hola" no, porque ya se había emitido texto
+        assert recibidos == ["Hola"]
+        assert len(llamadas) == 2
+
+    asyncio.run(con_servidor_sse([503, [evento("Hola"), None], [evento("repetido")]], prueba))
@@ -0,0 +1,119 @@
+import asyncio
+from smtp_stub import SMTPStub
+from outbox import EmailOutbox, ESTADO_APROBACION, ESTADO_ENVIADO, ESTADO_PENDIENTE, ESTADO_FALLIDO, ESTADO_ENVIANDO
+
+def test_idempotencia_y_entrega(tmp_path, monkeypatch):
+    monkeypatch.setenv("SMTP_FROM_EMAIL", "rrhh@example.com")
+
+    async def entregar():
+        async with SMTPStub() as stub:
+            outbox = EmailOutbox(db_name=str(tmp_path / "outbox.db"),
+                                 smtp={"hostname": stub.host, "port": stub.port, "start_tls": False})
+            fila, nueva = outbox.encolar("ana@example.com", "Entrevista", "Hola Ana")
+            repetida, nueva_repetida = outbox.encolar("ANA@example.com", "Entrevista", "Hola Ana")
+            assert nueva and not nueva_repetida and repetida["id"] == fila["id"]
+
+            espera, _ = outbox.encolar("luis@example.com", "Entrevista", "Hola Luis", aprobado=False)
+            assert await outbox.procesar_pendientes() == 1
+            assert outbox.solicitud(espera["id"])["status"] == ESTADO_APROBACION
+            outbox.aprobar(espera["id"])
+            assert await outbox.procesar_pendientes() == 1
+            return outbox, fila, stub
+
+    outbox, fila, stub = asyncio.run(entregar())
+    assert len(stub.mensajes) == 2
+    assert outbox.solicitud(fila["id"])["status"] == ESTADO_ENVIADO
+    filas, total = outbox.recientes(pagina=1, por_pagina=1)
+    assert total == 2 and len(filas) == 1
+
+def test_reintentos_con_espera(tmp_path, monkeypatch):
+    monkeypatch.setenv("SMTP_FROM_EMAIL", "rrhh@example.com")
+    # Puerto sin servidor: la conexión falla siempre
+    outbox = EmailOutbox(db_name=str(tmp_path / "outbox.db"), max_intentos=2, espera_base=60,
+                         smtp={"hostname": "127.0.0.1", "port": 9, "start_tls": False, "timeout": 2})
+    fila, _ = outbox.encolar("ana@example.com", "Entrevista", "Hola Ana")
+
+    asyncio.run(outbox.procesar_pendientes())
+    reintento = outbox.solicitud(fila["id"])
+    assert reintento["status"] == ESTADO_PENDIENTE and reintento["attempts"] == 1
+    assert reintento["next_attempt_at"] > reintento["updated_at"] + 40
+
+    # Al vencer la espera, el segundo fallo agota los intentos
+    outbox._actualizar(fila["id"], ESTADO_PENDIENTE, next_attempt_at=0)
+    asyncio.run(outbox.procesar_pendientes())
+    assert outbox.solicitud(fila["id"])["status"] == ESTADO_FALLIDO
+
+def test_recuperar_solo_reclamos_vencidos(tmp_path):
+    db = str(tmp_path / "outbox.db")
+    caido = EmailOutbox(db_name=db, plazo=300)
+    vivo = EmailOutbox(db_name=db, plazo=300)
+    antigua, _ = caido.encolar("ana@example.com", "Entrevista", "Hola Ana")
+    caido._reclamar()
+    # El reclamo de 'caido' es de hace diez minutos; el de 'vivo', de ahora
+    caido._actualizar(antigua["id"], ESTADO_ENVIANDO, claimed_at=antigua["created_at"] - 600)
+    reciente, _ = vivo.encolar("luis@example.com", "Entrevista", "Hola Luis")
+    vivo._reclamar()
+
+    vivo._recuperar()
+    recuperada = vivo.solicitud(antigua["id"])
+    # La recuperación cuenta como intento: un correo que tumba al worker no se reintenta sin fin
+    assert recuperada["status"] == ESTADO_PENDIENTE and recuperada["attempts"] == 1
+    en_curso = vivo.solicitud(reciente["id"])
+    assert en_curso["status"] == ESTADO_ENVIANDO and en_curso["claimed_by"] == vivo.worker_id
+    assert en_curso["attempts"] == 0
+
+def test_reclamo_vencido_durante_el_envio(tmp_path):
+    db = str(tmp_path / "outbox.db")
+    lento = EmailOutbox(db_name=db, plazo=300, max_intentos=2)
+    otro = EmailOutbox(db_name=db, plazo=300, max_intentos=2)
+    fila, _ = lento.encolar("ana@example.com", "Entrevista", "Hola Ana")
+    lento._reclamar()
+    lento._actualizar(fila["id"], ESTADO_ENVIANDO, claimed_at=fila["created_at"] - 600)
+    otro._recuperar()
+    assert otro.solicitud(fila["id"])["status"] == ESTADO_PENDIENTE
+
+    # El worker lento termina el envío: nadie la ha vuelto a reclamar, así que sigue siendo suya
+    assert lento._actualizar(fila["id"], (ESTADO_ENVIANDO, ESTADO_PENDIENTE), reclamado_por=lento.worker_id,
+                             status=ESTADO_ENVIADO)
+    assert otro.solicitud(fila["id"])["status"] == ESTADO_ENVIADO
+
+    # Si otro worker ya la reclamó, el primero no pisa su estado
+    segunda, _ = lento.encolar("luis@example.com", "Entrevista", "Hola Luis")
+    lento._reclamar()
+    lento._actualizar(segunda["id"], ESTADO_ENVIANDO, claimed_at=segunda["created_at"] - 600)
+    otro._recuperar()
+    otro._reclamar()
+    assert not lento._actualizar(segunda["id"], (ESTADO_ENVIANDO, ESTADO_PENDIENTE), reclamado_por=lento.worker_id,
+                                 status=ESTADO_ENVIADO)
+    assert otro.solicitud(segunda["id"])["claimed_by"] == otro.worker_id
+
+    # Al agotar los intentos con reclamos vencidos, el correo queda como fallido
+    otro._actualizar(segunda["id"], ESTADO_ENVIANDO, claimed_at=segunda["created_at"] - 600)
+    lento._recuperar()
+    agotada = lento.solicitud(segunda["id"])
+    assert agotada["status"] == ESTADO_FALLIDO and agotada["attempts"] == 2
+
+def test_renovar_mantiene_el_reclamo(tmp_path):
+    outbox = EmailOutbox(db_name=str(tmp_path / "outbox.db"), plazo=300)
+    fila, _ = outbox.encolar("ana@example.com", "Entrevista", "Hola Ana")
+    outbox._reclamar()
+    outbox._actualizar(fila["id"], ESTADO_ENVIANDO, claimed_at=fila["created_at"] - 600)
+    outbox._renovar([fila["id"]])
+    outbox._recuperar()
+    assert outbox.solicitud(fila["id"])["status"] == ESTADO_ENVIANDO
+
+def test_un_correo_enviado_se_puede_repetir_fuera_de_la_ventana(tmp_path):
+    outbox = EmailOutbox(db_name=str(tmp_path / "outbox.db"), ventana=600)
+    fila, _ = outbox.encolar("ana@example.com", "Avance", "Hola Ana")
+    outbox._reclamar()
+    outbox._actualizar(fila["id"], ESTADO_ENVIANDO, status=ESTADO_ENVIADO, sent_at=fila["created_at"] - 60)
+
+    # Dentro de la ventana es un doble clic: no se encola otra vez
+    repetida, nueva = outbox.encolar("ana@example.com", "Avance", "Hola Ana")
+    assert not nueva and repetida["status"] == ESTADO_ENVIADO
+
+    # Semanas después, el mismo correo es un envío nuevo con otro id (y otro Message-ID)
+    outbox._actualizar(fila["id"], ESTADO_ENVIADO, sent_at=fila["created_at"] - 30 * 86400)
+    otra, nueva = outbox.encolar("ana@example.com", "Avance", "Hola Ana")
+    assert nueva and otra["status"] == ESTADO_PENDIENTE and otra["id"] != fila["id"]
+    assert otra["attempts"] == 0 and otra["sent_at"] is None
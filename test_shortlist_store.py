@@ -0,0 +1,49 @@
+import json
+from types import SimpleNamespace
+from shortlist_store import ShortlistStore, clave_sesion, SESION_LOCAL
+
+CANDIDATOS = [{"ID": " 1 ", "Nombre": "Ana"}, {"ID": 2, "Nombre": "Luis"}]
+
+def test_sesiones_aisladas():
+    store = ShortlistStore(archivo="", max_sesiones=2)
+    store.guardar("a", CANDIDATOS, "Desarrollador Python")
+    store.guardar("b", CANDIDATOS[:1])
+    assert store.candidato("a", "1")["Nombre"] == "Ana"
+    assert store.candidato("b", "2") is None
+    assert store.descripcion("a") == "Desarrollador Python"
+    assert store.ids("a") == ["1", "2"]
+
+    # Se descarta la sesión menos reciente; sin lista propia ve la última búsqueda
+    store.guardar("c", CANDIDATOS[1:])
+    assert store.ids("b") == ["1"]
+    assert store.ids("a") == ["2"]
+    assert clave_sesion(SimpleNamespace(session_hash="xyz")) == "xyz"
+    assert clave_sesion(None) == SESION_LOCAL
+
+def test_persistencia(tmp_path):
+    archivo = str(tmp_path / "shortlists.json")
+    store = ShortlistStore(archivo=archivo, intervalo=0)
+    store.guardar("a", CANDIDATOS, "Contable")
+    store.flush()
+    with open(archivo, encoding="utf-8") as f:
+        assert json.load(f)["a"]["descripcion"] == "Contable"
+
+    restaurado = ShortlistStore(archivo=archivo)
+    assert restaurado.candidato("a", "2")["Nombre"] == "Luis"
+
+def test_apps_en_procesos_distintos_comparten_la_ultima_busqueda(tmp_path):
+    archivo = str(tmp_path / "shortlists.json")
+    busqueda = ShortlistStore(archivo=archivo, intervalo=0)
+    # El chat arranca antes de que haya ninguna búsqueda
+    chat = ShortlistStore(archivo=archivo)
+    assert chat.candidatos("sesion-del-chat") == []
+
+    busqueda.guardar("sesion-de-main", CANDIDATOS, "Contable")
+    busqueda.flush()
+    assert chat.candidato("sesion-del-chat", "2")["Nombre"] == "Luis"
+    assert chat.descripcion("sesion-del-chat") == "Contable"
+
+    # Una búsqueda posterior se ve sin reiniciar el chat
+    busqueda.guardar("sesion-de-main", CANDIDATOS[:1], "Auditor")
+    busqueda.flush()
+    assert chat.ids("sesion-del-chat") == ["1"]
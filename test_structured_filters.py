@@ -0,0 +1,63 @@
+import os
+import sqlite3
+from load_txt_to_db import ingest_file, CV_FIELDS
+from structured_filters import (
+    anios_experiencia,
+    dividir_ubicacion,
+    niveles_idioma,
+    construir_filtros,
+    ids_permitidos,
+    asegurar_filtros,
+)
+
+TXT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Base_datos_final.txt")
+
+def test_campos_derivados():
+    assert anios_experiencia("- ibm, 2018-2024, ... - accenture, 2016-2018, ...") == 8
+    # Los periodos solapados se cuentan una vez; "actualidad" es el año en curso
+    assert anios_experiencia("a, 2015-2019. b, 2018-actualidad. c, 2001-2003", anio_actual=2025) == 12
+    assert anios_experiencia("sin fechas") == 0
+    assert dividir_ubicacion("São Paulo, Brasil ----------------") == ("sao paulo", "brasil")
+    assert niveles_idioma("español (nativo), inglés (fluido), francés (intermedio)") == [
+        ["espanol", 5], ["ingles", 4], ["frances", 2]
+    ]
+
+def test_filtros_sobre_la_base_de_datos(tmp_path):
+    db = str(tmp_path / "cv.db")
+    ingest_file(TXT_PATH, db_name=db)
+    filtros = construir_filtros(ubicacion="Madrid", idioma="Inglés", nivel_idioma="Fluido", anios_min=5)
+    permitidos = ids_permitidos(filtros, db_name=db)
+    assert permitidos
+
+    conn = sqlite3.connect(db)
+    try:
+        for (cv_id, ubicacion, idiomas, experiencia) in conn.execute(
+            "SELECT id, ubicacion, idiomas, experiencia FROM cv"
+        ):
+            cumple = (
+                "madrid" in ubicacion
+                and any(idioma == "ingles" and nivel >= 4 for idioma, nivel in niveles_idioma(idiomas))
+                and anios_experiencia(experiencia) >= 5
+            )
+            assert (str(cv_id) in permitidos) == cumple
+    finally:
+        conn.close()
+    assert ids_permitidos({}, db_name=db) is None
+
+def test_migracion_de_tabla_sin_columnas_derivadas(tmp_path):
+    db = str(tmp_path / "antigua.db")
+    conn = sqlite3.connect(db)
+    conn.execute(f"CREATE TABLE cv (id INTEGER PRIMARY KEY AUTOINCREMENT, {', '.join(CV_FIELDS)})")
+    conn.execute(
+        f"INSERT INTO cv ({', '.join(CV_FIELDS)}) VALUES ({', '.join('?' * len(CV_FIELDS))})",
+        ("ana", "ana@email.com", "600", "universidad de sevilla, medicina, 2010",
+         "- hospital, médica, 2012-2020", "cirugía", "español (nativo), alemán (fluido)",
+         "resumen", "sevilla, españa ----")
+    )
+    conn.commit()
+    asegurar_filtros(conn)
+    assert conn.execute("SELECT anios_experiencia, ciudad, nivel_educativo FROM cv").fetchone() == (8, "sevilla", 2)
+    assert conn.execute("SELECT idioma, nivel FROM cv_idioma ORDER BY idioma").fetchall() == [
+        ("aleman", 4), ("espanol", 5)
+    ]
+    conn.close()
@@ -0,0 +1,52 @@
+import os
+import json
+import asyncio
+import utils
+from load_txt_to_db import ingest_file
+from vector_index import documentos_de_cv
+from utils import objetos_json_completos, rerank_stream, formatear_documento, textos_candidatos
+
+TXT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Base_datos_final.txt")
+
+CANDIDATOS = [
+    {"ID": str(i), "Nombre": f"Candidato {i}", "Descripción": f"CV {i}", "Correo": f"c{i}@example.com"}
+    for i in range(1, 4)
+]
+
+def test_objetos_json_completos_sobre_un_array_parcial():
+    texto = '```json\n[{"ID": "1", "Justificación": "usa {llaves} y \\"comillas\\""}, {"ID": "2", "Justif'
+    assert objetos_json_completos(texto) == [{"ID": "1", "Justificación": 'usa {llaves} y "comillas"'}]
+    assert objetos_json_completos(texto + 'icación": "b"}, ') == [
+        {"ID": "1", "Justificación": 'usa {llaves} y "comillas"'}, {"ID": "2", "Justificación": "b"}
+    ]
+    assert objetos_json_completos("Pensando...") == []
+    assert objetos_json_completos("[") == []
+
+def test_rerank_stream_emite_cada_candidato_al_cerrarse(monkeypatch):
+    respuesta = json.dumps([
+        {"ID": "2", "Justificación": "Encaja"},
+        {"ID": "3", "Justificación": "También"},
+    ], ensure_ascii=False)
+
+    async def stream_falso(prompt, timeout=None, cache=None, validar=None):
+        # Trozos de 7 caracteres: los objetos se cierran a mitad de un fragmento
+        for i in range(0, len(respuesta), 7):
+            yield respuesta[i:i + 7]
+
+    monkeypatch.setattr(utils, "generar_respuesta_stream", stream_falso)
+
+    async def recoger():
+        return [[c["ID"] for c in parcial] async for parcial in rerank_stream(CANDIDATOS, "puesto")]
+
+    # Un parcial por objeto cerrado y el ranking completo al final
+    assert asyncio.run(recoger()) == [["2"], ["2", "3"], ["2", "3"]]
+
+def test_el_texto_del_cv_no_viaja_en_los_candidatos(tmp_path):
+    db = str(tmp_path / "cv.db")
+    ingest_file(TXT_PATH, db_name=db)
+    documentos = documentos_de_cv(["1", "2"], db)
+    candidatos = [formatear_documento(documentos["2"], 0.5), formatear_documento(documentos["1"], 0.7)]
+    assert all(doc.page_content not in c.values() for doc, c in zip((documentos["2"], documentos["1"]), candidatos))
+    # El cross-encoder recibe el texto completo aparte, en el orden de los candidatos
+    candidatos.append({"ID": "999999"})
+    assert textos_candidatos(candidatos, db) == [documentos["2"].page_content, documentos["1"].page_content, None]
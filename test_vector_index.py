@@ -0,0 +1,176 @@
+import os
+import hashlib
+import sqlite3
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain.docstore.document import Document
+import vector_index
+from load_txt_to_db import ingest_file
+from query_cache import SEARCH_RESULTS_CACHE
+from vector_index import (
+    VectorIndexManager, SQLiteDocstore, TIPOS_INDICE, cargar_documentos, construir_indice,
+    sincronizar_indice, cargar_manifest, escribir_manifest, crear_index_faiss, buscar_lote
+)
+
+TXT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Base_datos_final.txt")
+DIM = 16
+
+def vector_de(texto):
+    semilla = int(hashlib.sha256(texto.encode("utf-8")).hexdigest()[:8], 16)
+    return np.random.default_rng(semilla).standard_normal(DIM).astype("float32").tolist()
+
+class EmbeddingsFalsos(Embeddings):
+    """Vector determinista por texto; 'textos' guarda lo que se ha embebido."""
+    def __init__(self):
+        self.textos = []
+
+    def embed_documents(self, texts):
+        self.textos.extend(texts)
+        return [vector_de(t) for t in texts]
+
+    def embed_query(self, text):
+        return vector_de(text)
+
+def base_de_datos(tmp_path):
+    db = str(tmp_path / "cv.db")
+    ingest_file(TXT_PATH, db_name=db)
+    return db
+
+def vectores(indice):
+    return {doc_id: indice.index.reconstruct(pos) for pos, doc_id in indice.index_to_docstore_id.items()}
+
+def test_editar_un_cv_solo_cambia_su_vector(tmp_path):
+    db = base_de_datos(tmp_path)
+    ruta = str(tmp_path / "indice")
+    conn = sqlite3.connect(db)
+    embeddings = EmbeddingsFalsos()
+    indice = construir_indice(cargar_documentos(conn.cursor()), embeddings, ruta, mmap=False)
+    antes = vectores(indice)
+    version = cargar_manifest(ruta)["version"]
+
+    conn.execute("UPDATE cv SET resumen = 'Xilógrafo con taller propio' WHERE id = 3")
+    conn.commit()
+    embeddings.textos.clear()
+    nuevo = sincronizar_indice(cargar_documentos(conn.cursor()), embeddings, ruta, indice=indice, mmap=False)
+    conn.close()
+
+    assert len(embeddings.textos) == 1 and "Xilógrafo" in embeddings.textos[0]
+    despues = vectores(nuevo)
+    assert despues.keys() == antes.keys()
+    assert [i for i in antes if not np.array_equal(antes[i], despues[i])] == ["3"]
+    assert cargar_manifest(ruta)["version"] != version
+    # El store recibido no se modifica: las búsquedas en curso siguen viendo el anterior
+    assert nuevo is not indice
+    assert "Xilógrafo" not in indice.docstore.search("3").page_content
+
+def test_borrar_un_cv_lo_quita_de_los_resultados(tmp_path):
+    db = base_de_datos(tmp_path)
+    ruta = str(tmp_path / "indice")
+    conn = sqlite3.connect(db)
+    embeddings = EmbeddingsFalsos()
+    indice = construir_indice(cargar_documentos(conn.cursor()), embeddings, ruta, mmap=False)
+    consulta = indice.docstore.search("5").page_content
+    assert indice.similarity_search_with_score(consulta, k=1)[0][0].metadata["id"] == 5
+
+    conn.execute("DELETE FROM cv WHERE id = 5")
+    conn.commit()
+    nuevo = sincronizar_indice(cargar_documentos(conn.cursor()), embeddings, ruta, indice=indice, mmap=False)
+    conn.close()
+
+    assert nuevo.index.ntotal == indice.index.ntotal - 1
+    assert 5 not in [doc.metadata["id"] for doc, _ in nuevo.similarity_search_with_score(consulta, k=10)]
+    assert "5" not in cargar_manifest(ruta)["hashes"]
+
+def test_manifest_incompatible_reconstruye(tmp_path):
+    db = base_de_datos(tmp_path)
+    ruta = str(tmp_path / "indice")
+    conn = sqlite3.connect(db)
+    documentos = cargar_documentos(conn.cursor())
+    conn.close()
+    embeddings = EmbeddingsFalsos()
+    construir_indice(documentos, embeddings, ruta, mmap=False)
+
+    embeddings.textos.clear()
+    sincronizar_indice(documentos, embeddings, ruta, mmap=False)
+    assert embeddings.textos == []
+
+    escribir_manifest({**cargar_manifest(ruta), "dimension": DIM + 1}, ruta)
+    indice = sincronizar_indice(documentos, embeddings, ruta, mmap=False)
+    assert len(embeddings.textos) == len(documentos)
+    assert cargar_manifest(ruta)["dimension"] == DIM and indice.index.ntotal == len(documentos)
+
+def test_carga_con_reset_sincroniza_e_invalida_el_cache(tmp_path, monkeypatch):
+    db = base_de_datos(tmp_path)
+    embeddings = EmbeddingsFalsos()
+    monkeypatch.setattr(vector_index, "crear_embeddings", lambda model_name: embeddings)
+    gestor = VectorIndexManager(index_path=str(tmp_path / "indice"), db_name=db)
+    conn = sqlite3.connect(db)
+    indice = gestor.get_index(conn.cursor())
+    version = gestor.version
+    # Sin cambios en 'cv' se devuelve el mismo store sin leer la tabla
+    assert gestor.get_index(conn.cursor()) is indice
+    conn.close()
+    SEARCH_RESULTS_CACHE.set(("consulta", version, 5, ()), [("1", 0.0)])
+
+    # Mismo número de filas y mismo id máximo: solo el contador de cambios delata el reset
+    texto = open(TXT_PATH, encoding="utf-8").read()
+    modificado = tmp_path / "modificado.txt"
+    modificado.write_text(texto.replace("Ingeniero de software con más de 7 años", "Xilógrafo con más de 7 años", 1),
+                          encoding="utf-8")
+    embeddings.textos.clear()
+    ingest_file(str(modificado), db_name=db, reset=True)
+
+    conn = sqlite3.connect(db)
+    nuevo = gestor.get_index(conn.cursor())
+    conn.close()
+    assert nuevo is not indice and gestor.version != version
+    # El resto de vectores sale del caché de embeddings (la carga pasa el texto a minúsculas)
+    assert len(embeddings.textos) == 1 and "xilógrafo" in embeddings.textos[0]
+    assert SEARCH_RESULTS_CACHE.get(("consulta", version, 5, ())) is None
+
+def test_buscar_lote_con_filtro_solo_devuelve_permitidos(tmp_path):
+    db = base_de_datos(tmp_path)
+    conn = sqlite3.connect(db)
+    documentos = cargar_documentos(conn.cursor())
+    conn.close()
+    indice = construir_indice(documentos, EmbeddingsFalsos(), str(tmp_path / "indice"), mmap=False)
+    gestor = VectorIndexManager(index_path=str(tmp_path / "indice"), db_name=db)
+
+    permitidos = ["2", "7", "11"]
+    consultas = [vector_de(documentos["1"].page_content), vector_de(documentos["2"].page_content)]
+    resultados = buscar_lote(indice, consultas, 10, gestor.posiciones(permitidos, indice))
+    assert [sorted(str(doc.metadata["id"]) for doc, _ in fila) for fila in resultados] == [sorted(permitidos)] * 2
+    assert resultados[1][0][0].metadata["id"] == 2
+    assert buscar_lote(indice, consultas, 10, []) == [[], []]
+
+def test_modo_mmap_lee_los_documentos_de_sqlite(tmp_path):
+    db = base_de_datos(tmp_path)
+    ruta = str(tmp_path / "indice")
+    conn = sqlite3.connect(db)
+    embeddings = EmbeddingsFalsos()
+    indice = construir_indice(cargar_documentos(conn.cursor()), embeddings, ruta, mmap=True, db_name=db)
+    assert isinstance(indice.docstore, SQLiteDocstore)
+    assert not os.path.exists(os.path.join(ruta, "index.pkl"))
+    assert set(indice.docstore.mget(["1", "2", "999999"])) == {"1", "2"}
+
+    conn.execute("UPDATE cv SET habilidades = 'Xilografía' WHERE id = 4")
+    conn.commit()
+    documentos = cargar_documentos(conn.cursor())
+    conn.close()
+    nuevo = sincronizar_indice(documentos, embeddings, ruta, indice=indice, mmap=True, db_name=db)
+    doc, _ = buscar_lote(nuevo, [vector_de(documentos["4"].page_content)], 1)[0][0]
+    assert isinstance(doc, Document) and "Xilografía" in doc.page_content
+
+def test_tipos_de_indice():
+    matriz = np.random.default_rng(0).standard_normal((1200, DIM)).astype("float32")
+    descriptores = {}
+    for tipo in TIPOS_INDICE:
+        index, descriptores[tipo] = crear_index_faiss(matriz, tipo, hnsw_m=8, nlist=8, pq_m=4, pq_nbits=4)
+        assert index.ntotal == len(matriz)
+        if tipo != "IVFPQ":
+            # nprobe >= nlist: los IVF sin compresión encuentran el propio vector
+            _, encontrados = index.search(matriz[:20], 1)
+            assert encontrados[:, 0].tolist() == list(range(20))
+    assert descriptores == {"Flat": "Flat", "HNSW": "HNSW8", "IVFFlat": "IVF8,Flat", "IVFPQ": "IVF8,PQ4x4"}
+    # Con pocos vectores un IVF no se entrena bien: se usa Flat
+    assert crear_index_faiss(matriz[:100], "IVFFlat")[1] == "Flat"
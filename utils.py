@@ -1,20 +1,27 @@
 import os
+import time
 import asyncio
-import aiohttp
 import json
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_community.vectorstores import FAISS
-from langchain.docstore.document import Document
 from collections import namedtuple
 from database import connect_db, close_db
+from config import (
+    MODO_RAG_LLM, MODO_RAG_LLM_PARALELO, MODO_CROSS_ENCODER, HYBRID_LEXICAL_WEIGHT,
+    RERANK_SHARD_SIZE, RERANK_SHARD_TOP, RERANK_CONCURRENCY
+)
+from vector_index import VectorIndexManager, buscar_filtrado, documentos_por_id, documentos_de_cv
+from cross_encoder_rerank import CrossEncoderReranker
+from lexical_search import buscar_bm25, fusion_rrf
+from structured_filters import ids_permitidos, clave_filtros
+from query_cache import QUERY_VECTOR_CACHE, SEARCH_RESULTS_CACHE, normalizar_consulta
+from langchain.docstore.document import Document
+from llm_client import get_llm_client, LLMError, ejecutar
+from llm_cache import get_llm_cache
 from dotenv import load_dotenv
 load_dotenv("key.env", override=True)
 import re
 
 # Configuración global
 DEEPSEEK_MODEL = "deepseek/deepseek-r1:free"
-FAISS_INDEX_PATH = "faiss_index"
-EMBEDDING_MODEL = "sentence-transformers/distiluse-base-multilingual-cased-v2"
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_MODEL = "gpt-3.5-turbo"
@@ -35,99 +42,80 @@ def verificar_base_datos():
 
 # =============================================================================
 # Función para construir o cargar el índice FAISS.
+# El modelo y el índice se cargan una vez por proceso (VectorIndexManager);
+# cada llamada solo re-embebe las filas de 'cv' que han cambiado.
 # =============================================================================
-def build_or_load_vector_index(conn, cursor, rebuild=True, batch_size=10):
-    if rebuild or not os.path.exists(os.path.join(FAISS_INDEX_PATH, "index.faiss")):
-        print("🔨 Creando nuevo índice FAISS...")
-        # Ajustamos la consulta para incluir la columna 'habilidades'
-        cursor.execute("""
-            SELECT id, nombre, COALESCE(resumen, ''), email, telefono,
-            COALESCE(idiomas, ''), COALESCE(habilidades, ''),
-            COALESCE(experiencia, ''), COALESCE(ubicacion, ''), COALESCE(educacion, '')
-            FROM cv
-        """)
-
-
-        documentos = []
-        rows = cursor.fetchall()
-        for cv_id, nombre, resumen, email, telefono, idiomas, habilidades, experiencia, ubicacion, educacion in rows:
-            if resumen.strip() == "":
-                print(f"⚠️ El resumen está vacío para el CV de {nombre} (ID: {cv_id})")
-            
-            page_content = f"""
-                RESUMEN: {resumen.strip()}
-                IDIOMAS: {idiomas.strip()}
-                HABILIDADES: {habilidades.strip()}
-                EXPERIENCIA: {experiencia.strip()}
-                UBICACIÓN: {ubicacion.strip()}
-                EDUCACIÓN: {educacion.strip()}
-                """
-            metadata = {
-                "id": cv_id,
-                "name": nombre.strip(),
-                "email": email.strip() if email else "",
-                "telefono": telefono.strip() if telefono else "",
-                "idiomas": idiomas.strip() if idiomas else "No disponible",
-                "habilidades": habilidades.strip() if habilidades else "No disponible",
-                "experiencia": experiencia.strip() if experiencia else "No disponible",
-                "ubicacion": ubicacion.strip() if ubicacion else "No disponible",
-                "educacion": educacion.strip() if educacion else "No disponible"
-            }
-
-                
-            # Crear un objeto Document por cada fila
-            doc = Document(page_content=page_content, metadata=metadata)
-            documentos.append(doc)
-
-        print(f"Cantidad de documentos procesados: {len(documentos)}")
-        if not documentos:
-            print("⚠️ No hay documentos válidos para crear el índice.")
-            return None
-
-        embeddings = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
-        indice = None
-
-        # Procesar documentos por lotes (batch_size)
-        for i in range(0, len(documentos), batch_size):
-            batch = documentos[i : i + batch_size]
-            print(f"🔄 Procesando batch {i} a {i + len(batch)}...")
-            if indice is None:
-                indice = FAISS.from_documents(batch, embeddings)
-            else:
-                indice.add_documents(batch)
-
-        os.makedirs(FAISS_INDEX_PATH, exist_ok=True)
-        indice.save_local(FAISS_INDEX_PATH)
-        print(f"Total documentos en el índice: {indice.index.ntotal}")
-        return indice
+def build_or_load_vector_index(conn, cursor, rebuild=False):
+    return VectorIndexManager.get_instance().get_index(cursor, rebuild=rebuild)
 
+# =============================================================================
+# Búsqueda en FAISS con caché de vectores de consulta y de resultados top-k.
+# =============================================================================
+def _buscar_con_cache(query_text, docsearch, top_k, index_version, permitidos=None, clave_filtro=()):
+    consulta = normalizar_consulta(query_text)
+    clave_resultados = (consulta, index_version, top_k, clave_filtro)
+    if index_version is not None:
+        pares = SEARCH_RESULTS_CACHE.get(clave_resultados)
+        if pares is not None:
+            # Todos los documentos del caché se leen de una vez (una consulta en modo mmap)
+            por_id = documentos_por_id(docsearch.docstore, [doc_id for doc_id, _ in pares])
+            documentos = [(por_id.get(doc_id), dist) for doc_id, dist in pares]
+            if all(isinstance(doc, Document) for doc, _ in documentos):
+                print("⚡ Resultados de FAISS obtenidos del caché.")
+                return documentos
+
+    modelo = getattr(docsearch.embedding_function, "model_name", "")
+    clave_vector = (modelo, consulta)
+    vector = QUERY_VECTOR_CACHE.get(clave_vector)
+    if vector is None:
+        vector = docsearch.embedding_function.embed_query(query_text)
+        QUERY_VECTOR_CACHE.set(clave_vector, vector)
+
+    if permitidos is None:
+        resultados = docsearch.similarity_search_with_score_by_vector(vector, k=top_k)
     else:
-        print("♻️ Cargando índice existente...")
-        return FAISS.load_local(
-            FAISS_INDEX_PATH,
-            HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL),
-            allow_dangerous_deserialization=True
+        # Solo se evalúan los CVs que cumplen los filtros estructurados
+        posiciones = VectorIndexManager.get_instance().posiciones(permitidos, docsearch)
+        resultados = buscar_filtrado(docsearch, vector, top_k, posiciones)
+    if index_version is not None:
+        SEARCH_RESULTS_CACHE.set(
+            clave_resultados,
+            [(str(doc.metadata.get("id")), float(dist)) for doc, dist in resultados]
         )
+    return resultados
+
+# =============================================================================
+# Candidato en el formato de la interfaz a partir de un documento del índice.
+# dist=None para los que solo aparecen en la búsqueda léxica.
+# =============================================================================
+def formatear_documento(doc, dist):
+    return {
+        "Nombre": doc.metadata.get('name', 'Sin Nombre').title(),
+        "ID": str(doc.metadata.get('id', 'Desconocido')),
+        "Distancia": round(float(dist), 2) if dist is not None else None,
+        "Descripción": doc.page_content[:100] + "...",
+        "Correo": doc.metadata.get('email', ""),
+        "Teléfono": doc.metadata.get('telefono', ""),
+        "Idiomas": doc.metadata.get('idiomas', "No disponible"),
+        "Habilidades": doc.metadata.get('habilidades', "No disponible")
+    }
 
 # =============================================================================
 # Función para realizar búsqueda semántica en FAISS.
 # =============================================================================
-def embed_and_search_in_faiss(query_text, docsearch, top_k=40):
+def embed_and_search_in_faiss(query_text, docsearch, top_k=40, index_version=None, permitidos=None, clave_filtro=()):
+    """
+    Búsqueda semántica con caché LRU: el vector de la consulta se cachea por
+    (modelo, texto normalizado) y la lista top-k (id, distancia) por
+    (texto normalizado, versión del índice, k, filtros). Sin index_version no se cachean resultados.
+    Con 'permitidos' (ids de 'cv') la búsqueda se limita a esos CVs.
+    """
     resultados_legibles = []
     try:
-        resultados = docsearch.similarity_search_with_score(query_text, k=top_k)
+        resultados = _buscar_con_cache(query_text, docsearch, top_k, index_version, permitidos, clave_filtro)
         print(f"Número de resultados devueltos por similarity_search_with_score: {len(resultados)}")
         for doc, dist in resultados:
-            resultado = {
-                "Nombre": doc.metadata.get('name', 'Sin Nombre').title(),
-                "ID": str(doc.metadata.get('id', 'Desconocido')),
-                "Distancia": round(float(dist), 2),
-                "Descripción": doc.page_content[:100] + "...",
-                "Correo": doc.metadata.get('email', ""),
-                "Teléfono": doc.metadata.get('telefono', ""),
-                "Idiomas": doc.metadata.get('idiomas', "No disponible"),
-                "Habilidades": doc.metadata.get('habilidades', "No disponible")
-            }
+            resultado = formatear_documento(doc, dist)
             resultados_legibles.append(resultado)
         print(f"🔎 Resultado FAISS (formateado): {resultado}")
         print("\n=== Resultado Final embed_and_search_in_faiss (formateado) ===")
@@ -143,13 +131,7 @@ def embed_and_search_in_faiss(query_text, docsearch, top_k=40):
 # Función de reordenamiento para RAG + LLM.
 # Toma los 20 resultados de FAISS y usa el LLM para reordenarlos.
 # =============================================================================
-async def rerank(candidatos, descripcion_puesto):
-    def limpiar_variables_globales():
-        global ranking_final, resultados_formateados
-        ranking_final = []
-        resultados_formateados = []
-    limpiar_variables_globales()
-
+def construir_prompt_rerank(candidatos, descripcion_puesto, seleccionar=5):
     # Construir la lista de CVs con el formato adecuado
     resumenes = []
     valid_ids = ", ".join(str(c['ID']) for c in candidatos)
@@ -194,10 +176,10 @@ Criterios clave de evaluación (ejemplos):
 - Idiomas (si son necesarios).
 - Ubicación y disponibilidad geográfica (si corresponde).
 
-Se presentan 20 CVs resumidos.
+Se presentan {len(candidatos)} CVs resumidos.
 Objetivo:
-Selecciona únicamente a los 5 candidatos que mejor cumplan los criterios anteriores.
-Ordénalos del 1 al 5 en un ranking y **no modifiques los IDs**; utiliza exactamente los que se han proporcionado.
+Selecciona únicamente a los {seleccionar} candidatos que mejor cumplan los criterios anteriores.
+Ordénalos del 1 al {seleccionar} en un ranking y **no modifiques los IDs**; utiliza exactamente los que se han proporcionado.
 Justifica brevemente tu elección para cada candidato, mencionando años de experiencia, habilidades, idiomas, etc.
 
 **Devuelve la respuesta en formato JSON**, con la siguiente estructura:
@@ -208,27 +190,42 @@ Justifica brevemente tu elección para cada candidato, mencionando años de expe
 
 ]
     """
-    
-    print("=== Prompt enviado al LLM ===")
-    print(prompt)
-    ranking_text = await generar_respuesta(prompt)
+    return prompt
 
-    # Limpiar la respuesta para remover delimitadores de código si existen
+def limpiar_respuesta_json(ranking_text):
+    """Quita los delimitadores de bloque de código (```json ... ```) si existen."""
     ranking_text = ranking_text.strip()
     if ranking_text.startswith("```"):
         # Remover la primera línea (delimitador) y la última línea si es también un delimitador
         ranking_text = "\n".join(ranking_text.splitlines()[1:])
         if ranking_text.endswith("```"):
             ranking_text = "\n".join(ranking_text.splitlines()[:-1])
-    ranking_text = ranking_text.strip()
+    return ranking_text.strip()
 
-    # Procesar la respuesta JSON recibida
-    try:
-        ranking_json = json.loads(ranking_text)
-    except json.JSONDecodeError as e:
-        print("❌ Error al decodificar JSON:", e)
-        return [{"Error": "No se pudo procesar la respuesta del LLM. Verifica el formato JSON."}]
-    
+def objetos_json_completos(texto):
+    """
+    Devuelve los objetos ya cerrados de un array JSON que aún se está recibiendo,
+    p. ej. '[{"ID": "1", ...}, {"ID": "2", "Justif' -> [{"ID": "1", ...}].
+    """
+    inicio = texto.find("[")
+    if inicio < 0:
+        return []
+    decoder = json.JSONDecoder()
+    objetos = []
+    pos = inicio + 1
+    while True:
+        while pos < len(texto) and texto[pos] in " \t\r\n,":
+            pos += 1
+        if pos >= len(texto) or texto[pos] != "{":
+            return objetos
+        try:
+            objeto, pos = decoder.raw_decode(texto, pos)
+        except json.JSONDecodeError:
+            return objetos
+        objetos.append(objeto)
+
+def formatear_ranking(ranking_json, candidatos):
+    """Asocia cada entrada del ranking del LLM a su candidato y la formatea para la interfaz."""
     # Asociar cada entrada JSON al candidato correspondiente
     ranking_final = []
     for item in ranking_json:
@@ -240,11 +237,7 @@ Justifica brevemente tu elección para cada candidato, mencionando años de expe
             ranking_final.append(candidato)
         else:
             print(f"⚠️ No se encontró candidato con ID: {current_id}")
-    
-    if not ranking_final:
-        print("⚠️ No se encontraron coincidencias de IDs.")
-        return [{"Error": "No se encontraron coincidencias. Revisa el formato de los IDs o la lógica de matching."}]
-    
+
     # Formatear los resultados en un formato estructurado para la interfaz gráfica
     resultados_formateados = []
     for idx, candidato in enumerate(ranking_final, start=1):
@@ -257,51 +250,243 @@ Justifica brevemente tu elección para cada candidato, mencionando años de expe
             "Correo": candidato.get('Correo', 'No disponible'),
             "Teléfono": candidato.get('Teléfono', 'No disponible')
         })
-    
     return resultados_formateados
 
+def procesar_ranking(ranking_text, candidatos):
+    """Interpreta la respuesta completa del LLM; devuelve el ranking o [{"Error": ...}]."""
+    # Procesar la respuesta JSON recibida
+    try:
+        ranking_json = json.loads(limpiar_respuesta_json(ranking_text))
+    except json.JSONDecodeError as e:
+        print("❌ Error al decodificar JSON:", e)
+        return [{"Error": "No se pudo procesar la respuesta del LLM. Verifica el formato JSON."}]
+
+    resultados_formateados = formatear_ranking(ranking_json, candidatos)
+    if not resultados_formateados:
+        print("⚠️ No se encontraron coincidencias de IDs.")
+        return [{"Error": "No se encontraron coincidencias. Revisa el formato de los IDs o la lógica de matching."}]
+    return resultados_formateados
+
+def ranking_valido(ranking_text, candidatos):
+    """
+    True si la respuesta es un array JSON con al menos un ID de la lista. Las
+    respuestas que no lo cumplen no se guardan en el caché: reintentar la
+    búsqueda vuelve a consultar al LLM en lugar de servir la misma respuesta mala.
+    """
+    try:
+        ranking_json = json.loads(limpiar_respuesta_json(ranking_text))
+    except json.JSONDecodeError:
+        return False
+    ids = {str(c["ID"]).strip() for c in candidatos}
+    return isinstance(ranking_json, list) and any(
+        isinstance(item, dict) and str(item.get("ID", "")).strip() in ids for item in ranking_json
+    )
+
+async def rerank(candidatos, descripcion_puesto, cache="rerank"):
+    def limpiar_variables_globales():
+        global ranking_final, resultados_formateados
+        ranking_final = []
+        resultados_formateados = []
+    limpiar_variables_globales()
+
+    prompt = construir_prompt_rerank(candidatos, descripcion_puesto)
+    print("=== Prompt enviado al LLM ===")
+    print(prompt)
+    ranking_text = await generar_respuesta(prompt, cache=cache, validar=lambda t: ranking_valido(t, candidatos))
+    return procesar_ranking(ranking_text, candidatos)
+
+# =============================================================================
+# Rerank en paralelo: la lista de FAISS se divide en grupos de tam_grupo
+# candidatos, el LLM elige los por_grupo mejores de cada grupo (como mucho
+# "concurrencia" peticiones a la vez) y una ronda final con rerank ordena a
+# los ganadores. Los prompts son más cortos y se resuelven a la vez.
+# =============================================================================
+async def seleccionar_finalistas(candidatos, descripcion_puesto, tam_grupo=RERANK_SHARD_SIZE,
+                                 por_grupo=RERANK_SHARD_TOP, concurrencia=RERANK_CONCURRENCY,
+                                 cache="rerank_grupo"):
+    grupos = [candidatos[i:i + tam_grupo] for i in range(0, len(candidatos), tam_grupo)]
+    if len(grupos) <= 1:
+        return list(candidatos)
+    semaforo = asyncio.Semaphore(concurrencia)
+
+    async def puntuar(grupo):
+        try:
+            async with semaforo:
+                prompt = construir_prompt_rerank(grupo, descripcion_puesto, seleccionar=por_grupo)
+                ranking_text = await generar_respuesta(prompt, cache=cache, validar=lambda t: ranking_valido(t, grupo))
+            ranking = procesar_ranking(ranking_text, grupo)
+        except Exception as e:
+            # Un grupo que falla (timeout, JSON inesperado...) no tumba a los demás
+            print(f"⚠️ Error al rankear un grupo ({type(e).__name__}: {e}); se usan los {por_grupo} más cercanos.")
+            return grupo[:por_grupo]
+        if len(ranking) == 1 and "Error" in ranking[0]:
+            # Si el LLM falla en un grupo, pasan los mejores por distancia de FAISS
+            print(f"⚠️ Grupo sin ranking del LLM; se usan los {por_grupo} más cercanos.")
+            return grupo[:por_grupo]
+        por_id = {str(c["ID"]).strip(): c for c in grupo}
+        # El LLM a veces repite un ID: cuenta una sola vez
+        ids = list(dict.fromkeys(str(r["ID"]).strip() for r in ranking))
+        return [por_id[cv_id] for cv_id in ids[:por_grupo]]
+
+    ganadores = await asyncio.gather(*(puntuar(g) for g in grupos))
+    # Sin repetidos entre grupos, en el orden de los grupos
+    finalistas = list({str(c["ID"]).strip(): c for grupo in ganadores for c in grupo}.values())
+    print(f"🏁 {len(finalistas)} finalistas de {len(grupos)} grupos pasan a la ronda final.")
+    return finalistas
+
+async def rerank_paralelo(candidatos, descripcion_puesto, tam_grupo=RERANK_SHARD_SIZE,
+                          por_grupo=RERANK_SHARD_TOP, concurrencia=RERANK_CONCURRENCY, cache=True):
+    finalistas = await seleccionar_finalistas(
+        candidatos, descripcion_puesto, tam_grupo=tam_grupo, por_grupo=por_grupo,
+        concurrencia=concurrencia, cache="rerank_grupo" if cache else None
+    )
+    return await rerank(finalistas, descripcion_puesto, cache="rerank" if cache else None)
+
+# =============================================================================
+# Reordenamiento en streaming: genera el ranking parcial cada vez que el LLM
+# termina de escribir un objeto del array JSON, y el ranking definitivo al final.
+# =============================================================================
+async def rerank_stream(candidatos, descripcion_puesto):
+    prompt = construir_prompt_rerank(candidatos, descripcion_puesto)
+    print("=== Prompt enviado al LLM (streaming) ===")
+    print(prompt)
+    texto = ""
+    completos = 0
+    async for fragmento in generar_respuesta_stream(prompt, cache="rerank",
+                                                    validar=lambda t: ranking_valido(t, candidatos)):
+        texto += fragmento
+        objetos = objetos_json_completos(texto)
+        if len(objetos) > completos:
+            completos = len(objetos)
+            parcial = formatear_ranking(objetos, candidatos)
+            if parcial:
+                yield parcial
+    yield procesar_ranking(texto, candidatos)
+
+# =============================================================================
+# Reordenación local con cross-encoder (sin LLM ni red). Se ejecuta en CPU;
+# desde código asíncrono conviene llamarla con asyncio.to_thread.
+# =============================================================================
+def textos_candidatos(candidatos, db_name="cv_database.db"):
+    """
+    Texto indexado de cada candidato (None si ya no está en 'cv'), leído en una
+    sola consulta. No se guarda en los candidatos: acabaría en el ShortlistStore.
+    """
+    documentos = documentos_de_cv([c["ID"] for c in candidatos if str(c["ID"]).isdigit()], db_name)
+    return [documentos[c["ID"]].page_content if c["ID"] in documentos else None for c in candidatos]
 
+def rerank_cross_encoder(candidatos, descripcion_puesto, top_n=None):
+    inicio = time.perf_counter()
+    ranking = CrossEncoderReranker.get_instance().reordenar(
+        descripcion_puesto, candidatos, top_n=top_n, textos=textos_candidatos(candidatos)
+    )
+    print(f"🧠 Cross-encoder: {len(candidatos)} candidatos puntuados en {time.perf_counter() - inicio:.2f}s.")
+    return ranking
+
+# =============================================================================
+# Recuperación (parte RAG de la búsqueda): FAISS y BM25 (FTS5) se consultan a
+# la vez y sus rankings se fusionan con RRF ponderada (peso_lexico). Con
+# filtros, ambas búsquedas se limitan a los CVs que los cumplen. Devuelve
+# los candidatos sin pasar por el LLM.
+# =============================================================================
+def cargar_indice():
+    conn = None
+    try:
+        conn, cursor = connect_db(db_name="cv_database.db")
+        if not conn:
+            print("❌ Error: No se pudo conectar a la base de datos.")
+            return None
+        return build_or_load_vector_index(conn, cursor)
+    finally:
+        if conn:
+            close_db(conn)
+
+def fusionar_candidatos(candidatos, lexicos, indice, peso_lexico, top_k):
+    """Combina los candidatos de FAISS con los ids de BM25; los que solo da BM25 se leen del docstore."""
+    por_id = {c["ID"]: c for c in candidatos}
+    fusion = fusion_rrf([c["ID"] for c in candidatos], [cv_id for cv_id, _ in lexicos], peso_lexico)
+    fusion = fusion[:top_k]
+    faltan = documentos_por_id(indice.docstore, [cv_id for cv_id, _ in fusion if cv_id not in por_id])
+    resultado = []
+    solo_lexicos = 0
+    for cv_id, puntuacion in fusion:
+        candidato = por_id.get(cv_id)
+        if candidato is None:
+            doc = faltan.get(cv_id)
+            if not isinstance(doc, Document):
+                continue
+            candidato = formatear_documento(doc, None)
+            solo_lexicos += 1
+        candidato["RRF"] = round(puntuacion, 5)
+        resultado.append(candidato)
+    print(f"🔀 Búsqueda híbrida: {len(candidatos)} de FAISS, {len(lexicos)} de BM25, "
+          f"{solo_lexicos} añadidos solo por coincidencia léxica.")
+    return resultado
+
+async def recuperar_candidatos(descripcion_puesto, top_k=40, peso_lexico=HYBRID_LEXICAL_WEIGHT, filtros=None):
+    verificar_base_datos()
+    indice, permitidos = await asyncio.gather(
+        asyncio.to_thread(cargar_indice),
+        asyncio.to_thread(ids_permitidos, filtros)
+    )
+    if not indice:
+        print("⚠️ Advertencia: No se pudo construir/cargar el índice FAISS.")
+        return []
+    if permitidos is not None:
+        print(f"🎯 Filtros {filtros}: {len(permitidos)} CVs elegibles.")
+        if not permitidos:
+            return []
+    # Se busca sin el lock del gestor: una sincronización posterior crea otro
+    # store y deja intacto 'indice', con su propia versión para el caché
+    busqueda_vectorial = asyncio.to_thread(
+        embed_and_search_in_faiss, descripcion_puesto, indice, top_k,
+        getattr(indice, "version", None), permitidos, clave_filtros(filtros)
+    )
+    if peso_lexico <= 0:
+        candidatos = await busqueda_vectorial
+    else:
+        candidatos, lexicos = await asyncio.gather(
+            busqueda_vectorial,
+            asyncio.to_thread(buscar_bm25, descripcion_puesto, top_k, "cv_database.db", filtros)
+        )
+        candidatos = fusionar_candidatos(candidatos, lexicos, indice, peso_lexico, top_k)
+    print(f"🔍 Se encontraron {len(candidatos)} candidatos.")
+    if not candidatos:
+        print("⚠️ Advertencia: No se encontraron candidatos en la búsqueda.")
+    return candidatos
 
 # =============================================================================
 # Función principal de búsqueda.
 # =============================================================================
-async def buscar_cvs(descripcion_puesto, option_toggle):
+async def buscar_cvs(descripcion_puesto, option_toggle, filtros=None):
     def limpiar_variables_globales():
         global ranking_final, resultados_formateados
         ranking_final = []
         resultados_formateados = []
 
     limpiar_variables_globales()
-    verificar_base_datos()
     resultados = []
     try:
-        conn, cursor = connect_db(db_name="cv_database.db")
-        if not conn:
-            print("❌ Error: No se pudo conectar a la base de datos.")
-            return []
-        indice = build_or_load_vector_index(conn, cursor)
-        if not indice:
-            print("⚠️ Advertencia: No se pudo construir/cargar el índice FAISS.")
-            return []
-        candidatos = embed_and_search_in_faiss(descripcion_puesto, indice, top_k=40)
-        print(f"🔍 Se encontraron {len(candidatos)} candidatos con FAISS.")
+        candidatos = await recuperar_candidatos(descripcion_puesto, top_k=40, filtros=filtros)
         if not candidatos:
-            print("⚠️ Advertencia: No se encontraron candidatos en la búsqueda semántica.")
             return []
         print(f"Valor de option_toggle: '{option_toggle}'")
-        if option_toggle == "🤖 RAG + LLM (IA Avanzada)":
+        if option_toggle == MODO_RAG_LLM:
             print("🔄 Seleccionando y rankeando los mejores candidatos con el LLM...")
             ranking = await rerank(candidatos, descripcion_puesto)
             resultados = ranking
+        elif option_toggle == MODO_RAG_LLM_PARALELO:
+            print("🔄 Rankeando los candidatos con el LLM por grupos en paralelo...")
+            resultados = await rerank_paralelo(candidatos, descripcion_puesto)
+        elif option_toggle == MODO_CROSS_ENCODER:
+            print("🔄 Reordenando los candidatos con el cross-encoder local...")
+            resultados = await asyncio.to_thread(rerank_cross_encoder, candidatos, descripcion_puesto)
         else:
             print("✅ Resultados obtenidos con Solo RAG.")
             resultados = candidatos or []
     except Exception as e:
         print(f"❌ Error crítico en buscar_cvs: {str(e)}")
         resultados = []
-    finally:
-        if conn:
-            close_db(conn)
 
     print("\n=== Resultado Final buscar_cvs ===")
     print(resultados)
@@ -324,8 +509,10 @@ def mostrar_resultados_texto(resultados):
                 f"ID: {match.get('ID', 'Desconocido')}\n"
                 f"Descripción: {match.get('Descripción', 'Sin Contenido')}\n"
                 f"Justificación: {match.get('Justificación', 'Sin Justificación')}\n"
-                "-------------------------\n"
             )
+            if "Puntuación" in match:
+                texto += f"Puntuación: {match['Puntuación']}\n"
+            texto += "-------------------------\n"
         return texto
     elif isinstance(resultados, str):
         return resultados
@@ -334,51 +521,97 @@ def mostrar_resultados_texto(resultados):
 
 # =============================================================================
 # Función para generar respuesta de OpenAI de forma asíncrona.
+# Con cache="<sitio>" la llamada usa el caché en disco de respuestas
+# (clave: modelo, temperatura y prompt); sin él, siempre se consulta la API.
+# Con validar=<función>, la respuesta solo se guarda si validar(texto) es True.
 # =============================================================================
-async def generar_respuesta(prompt):
+LLM_TEMPERATURE = 0.5
+
+def mensajes_llm(prompt):
+    return [
+        {"role": "system", "content": "Eres un experto en selección de personal."},
+        {"role": "user", "content": prompt}
+    ]
+
+async def generar_respuesta(prompt, timeout=None, cache=None, validar=None):
     if not OPENAI_API_KEY:
         raise ValueError("❌ Error: La API Key de OpenAI no está configurada.")
-    api_key = OPENAI_API_KEY.strip()
 
-    url = "https://api.openai.com/v1/chat/completions"
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
-    payload = {
-        "model": OPENAI_MODEL,
-        "messages": [
-            {"role": "system", "content": "Eres un experto en selección de personal."},
-            {"role": "user", "content": prompt}
-        ],
-        "max_tokens": 800,
-        "temperature": 0.5
-    }
+    temperature = LLM_TEMPERATURE
+    messages = mensajes_llm(prompt)
+    if cache:
+        cacheada = get_llm_cache().get(OPENAI_MODEL, temperature, messages, sitio=cache)
+        if cacheada is not None:
+            print(f"⚡ Respuesta del LLM obtenida del caché ({cache}).")
+            return cacheada
+
     print("=== Solicitud a la API ===")
-    print(json.dumps(payload, indent=4))
-
-    async with aiohttp.ClientSession() as session:
-        async with session.post(url, headers=headers, json=payload) as response:
-            response_text = await response.text()
-            if response.status == 200:
-                response_json = await response.json()
-                content = response_json['choices'][0]['message']['content']
-                print("=== Respuesta de la API ===")
-                print(json.dumps(response_json, indent=4))
-                return content.strip()
-            else:
-                try:
-                    error_json = await response.json()
-                except Exception:
-                    error_json = {"error": response_text}
-                print(f"❌ Error en OpenAI: {json.dumps(error_json, indent=4)}")
-                return f"Error en la API: {json.dumps(error_json, indent=4)}"
+    print(json.dumps({"model": OPENAI_MODEL, "messages": messages}, indent=4, ensure_ascii=False))
+
+    # Cliente compartido: reutiliza conexiones y reintenta ante 429/5xx
+    try:
+        content = await get_llm_client().chat(
+            messages, model=OPENAI_MODEL, max_tokens=800, temperature=temperature, timeout=timeout
+        )
+    except LLMError as e:
+        print(f"❌ Error en OpenAI: {json.dumps(e.detalle, indent=4, ensure_ascii=False)}")
+        return f"Error en la API: {json.dumps(e.detalle, indent=4)}"
+    print("=== Respuesta de la API ===")
+    print(content)
+    content = content.strip()
+    if cache and (validar is None or validar(content)):
+        get_llm_cache().put(OPENAI_MODEL, temperature, messages, content)
+    return content
+
+# =============================================================================
+# Versión en streaming de generar_respuesta: produce los fragmentos de texto
+# según llegan. Si la respuesta está en caché se entrega de una vez; al terminar
+# se guarda la respuesta completa en el caché. Ante un error de la API antes
+# del primer fragmento se produce el mismo mensaje "Error en la API: ..." que
+# la versión no streaming; si ya se había enviado parte de la respuesta, se
+# relanza el LLMError para que quien consume sustituya el texto parcial en
+# lugar de añadirle el error.
+# =============================================================================
+async def generar_respuesta_stream(prompt, timeout=None, cache=None, validar=None):
+    if not OPENAI_API_KEY:
+        raise ValueError("❌ Error: La API Key de OpenAI no está configurada.")
+
+    temperature = LLM_TEMPERATURE
+    messages = mensajes_llm(prompt)
+    if cache:
+        cacheada = get_llm_cache().get(OPENAI_MODEL, temperature, messages, sitio=cache)
+        if cacheada is not None:
+            print(f"⚡ Respuesta del LLM obtenida del caché ({cache}).")
+            yield cacheada
+            return
+
+    print("=== Solicitud a la API (streaming) ===")
+    print(json.dumps({"model": OPENAI_MODEL, "messages": messages}, indent=4, ensure_ascii=False))
+
+    partes = []
+    try:
+        async for fragmento in get_llm_client().stream(
+            messages, model=OPENAI_MODEL, max_tokens=800, temperature=temperature, timeout=timeout
+        ):
+            partes.append(fragmento)
+            yield fragmento
+    except LLMError as e:
+        print(f"❌ Error en OpenAI: {json.dumps(e.detalle, indent=4, ensure_ascii=False)}")
+        if partes:
+            raise
+        yield f"Error en la API: {json.dumps(e.detalle, indent=4)}"
+        return
+    content = "".join(partes).strip()
+    print("=== Respuesta de la API ===")
+    print(content)
+    if cache and content and (validar is None or validar(content)):
+        get_llm_cache().put(OPENAI_MODEL, temperature, messages, content)
 
 # =============================================================================
 # Bloque principal (para pruebas locales)
 # =============================================================================
 async def main():
-    modo = "🤖 RAG + LLM (IA Avanzada)"
+    modo = MODO_RAG_LLM
     resultados = await buscar_cvs(
         descripcion_puesto="Desarrollador Python con experiencia en machine learning",
         option_toggle=modo
@@ -392,4 +625,4 @@ async def main():
         print(resultados)
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    ejecutar(main())
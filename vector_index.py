@@ -0,0 +1,692 @@
+import os
+import math
+import json
+import shutil
+import sqlite3
+import hashlib
+import tempfile
+import threading
+import time
+import faiss
+import numpy as np
+from langchain_huggingface import HuggingFaceEmbeddings
+from langchain_community.vectorstores import FAISS
+from langchain_community.docstore.base import Docstore, AddableMixin
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain.docstore.document import Document
+from config import (
+    FAISS_INDEX_PATH, EMBEDDING_MODEL, FAISS_MANIFEST_FILE,
+    EMBEDDING_BATCH_SIZE, EMBEDDING_MULTI_PROCESS,
+    FAISS_INDEX_TYPE, INDEX_TRAIN_SAMPLE, HNSW_M, HNSW_EF_CONSTRUCTION, HNSW_EF_SEARCH,
+    IVF_NLIST, IVF_NPROBE, PQ_M, PQ_NBITS, FAISS_MMAP
+)
+from database import connect_db, close_db
+from embedding_cache import EmbeddingCache, CachedEmbeddings
+from query_cache import SEARCH_RESULTS_CACHE
+from cambios_cv import asegurar_contador_cambios, huella_cv
+
+# Consulta usada para construir los documentos del índice a partir de la tabla 'cv'
+CV_QUERY = """
+    SELECT id, nombre, COALESCE(resumen, ''), email, telefono,
+    COALESCE(idiomas, ''), COALESCE(habilidades, ''),
+    COALESCE(experiencia, ''), COALESCE(ubicacion, ''), COALESCE(educacion, '')
+    FROM cv
+"""
+
+# =============================================================================
+# Construcción de documentos a partir de la base de datos.
+# =============================================================================
+def documento_desde_fila(fila, avisar=True):
+    """Convierte una fila de CV_QUERY en un Document de LangChain."""
+    cv_id, nombre, resumen, email, telefono, idiomas, habilidades, experiencia, ubicacion, educacion = fila
+    if avisar and resumen.strip() == "":
+        print(f"⚠️ El resumen está vacío para el CV de {nombre} (ID: {cv_id})")
+
+    page_content = f"""
+                RESUMEN: {resumen.strip()}
+                IDIOMAS: {idiomas.strip()}
+                HABILIDADES: {habilidades.strip()}
+                EXPERIENCIA: {experiencia.strip()}
+                UBICACIÓN: {ubicacion.strip()}
+                EDUCACIÓN: {educacion.strip()}
+                """
+    metadata = {
+        "id": cv_id,
+        "name": nombre.strip(),
+        "email": email.strip() if email else "",
+        "telefono": telefono.strip() if telefono else "",
+        "idiomas": idiomas.strip() if idiomas else "No disponible",
+        "habilidades": habilidades.strip() if habilidades else "No disponible",
+        "experiencia": experiencia.strip() if experiencia else "No disponible",
+        "ubicacion": ubicacion.strip() if ubicacion else "No disponible",
+        "educacion": educacion.strip() if educacion else "No disponible"
+    }
+    return Document(page_content=page_content, metadata=metadata)
+
+def cargar_documentos(cursor):
+    """Lee la tabla 'cv' y devuelve un diccionario {id del documento: Document}."""
+    cursor.execute(CV_QUERY)
+    documentos = {}
+    for fila in cursor.fetchall():
+        doc = documento_desde_fila(fila)
+        documentos[str(doc.metadata["id"])] = doc
+    return documentos
+
+def leer_documentos(conn, ids):
+    """{id: Document} de los CVs indicados, en una sola consulta; los que no existen se omiten."""
+    ids = [int(i) for i in ids]
+    if not ids:
+        return {}
+    marcas = ", ".join("?" * len(ids))
+    filas = conn.execute(f"{CV_QUERY} WHERE id IN ({marcas})", ids).fetchall()
+    return {str(fila[0]): documento_desde_fila(fila, avisar=False) for fila in filas}
+
+def documentos_de_cv(ids, db_name="cv_database.db"):
+    """Como leer_documentos, con una conexión propia a 'db_name'."""
+    conn = sqlite3.connect(db_name, timeout=30)
+    try:
+        return leer_documentos(conn, ids)
+    finally:
+        conn.close()
+
+# =============================================================================
+# Docstore perezoso sobre la tabla 'cv' (modo FAISS_MMAP): en lugar de
+# deserializar index.pkl con todos los Document en memoria, cada resultado se
+# lee de SQLite por su id. add/delete no hacen nada: el contenido ya vive en 'cv'.
+# =============================================================================
+class SQLiteDocstore(Docstore, AddableMixin):
+    def __init__(self, db_name="cv_database.db"):
+        self.db_name = db_name
+        # sqlite3 no comparte conexiones entre hilos: una por hilo
+        self._local = threading.local()
+
+    def _conexion(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_name, timeout=30)
+            self._local.conn = conn
+        return conn
+
+    def mget(self, ids):
+        """Lee varios CVs en una sola consulta. Devuelve {id: Document}."""
+        return leer_documentos(self._conexion(), ids)
+
+    def search(self, search):
+        doc = self.mget([search]).get(str(search))
+        return doc if doc is not None else f"ID {search} not found."
+
+    def add(self, texts):
+        pass
+
+    def delete(self, ids):
+        pass
+
+def documentos_por_id(docstore, ids):
+    """{id: Document} de varios ids; con SQLiteDocstore, en una sola consulta."""
+    if hasattr(docstore, "mget"):
+        return docstore.mget(ids)
+    return {doc_id: docstore.search(doc_id) for doc_id in ids}
+
+def hash_documento(doc):
+    """Hash del contenido indexado y de la metadata de un documento."""
+    contenido = doc.page_content + json.dumps(doc.metadata, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(contenido.encode("utf-8")).hexdigest()
+
+# =============================================================================
+# Manifest del índice persistido.
+# =============================================================================
+def ruta_manifest(index_path=FAISS_INDEX_PATH):
+    return os.path.join(index_path, FAISS_MANIFEST_FILE)
+
+def version_indice(model_name, hashes):
+    """Identificador estable del contenido del índice; cambia con cualquier alta, baja o edición."""
+    h = hashlib.sha256(model_name.encode("utf-8"))
+    for doc_id in sorted(hashes):
+        h.update(f"{doc_id}:{hashes[doc_id]};".encode("utf-8"))
+    return h.hexdigest()[:16]
+
+# Último manifest leído por ruta, para no re-parsear el JSON en cada búsqueda
+_MANIFEST_CACHE = {}
+
+def cargar_manifest(index_path=FAISS_INDEX_PATH):
+    """Devuelve el manifest del índice o None si no existe o está corrupto."""
+    ruta = ruta_manifest(index_path)
+    try:
+        stat = os.stat(ruta)
+    except OSError:
+        return None
+    firma = (stat.st_mtime_ns, stat.st_size)
+    cacheado = _MANIFEST_CACHE.get(ruta)
+    if cacheado and cacheado[0] == firma:
+        return cacheado[1]
+    try:
+        with open(ruta, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"⚠️ Manifest del índice ilegible ({ruta}): {e}")
+        return None
+    _MANIFEST_CACHE[ruta] = (firma, manifest)
+    return manifest
+
+def escribir_archivos(indice, index_path):
+    """
+    Escribe index.faiss (e index.pkl si el docstore está en memoria) en una carpeta
+    temporal y los mueve con os.replace: un proceso que tenga mapeado el archivo
+    anterior sigue leyendo el inodo viejo en lugar de ver un archivo truncado.
+    """
+    tmp = tempfile.mkdtemp(dir=index_path)
+    try:
+        if isinstance(indice.docstore, SQLiteDocstore):
+            faiss.write_index(indice.index, os.path.join(tmp, "index.faiss"))
+            pkl = os.path.join(index_path, "index.pkl")
+            if os.path.exists(pkl):
+                os.remove(pkl)
+        else:
+            indice.save_local(tmp)
+        for nombre in os.listdir(tmp):
+            os.replace(os.path.join(tmp, nombre), os.path.join(index_path, nombre))
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+def guardar_indice(indice, hashes, index_path=FAISS_INDEX_PATH, model_name=EMBEDDING_MODEL,
+                   tipo=FAISS_INDEX_TYPE, descriptor="Flat", huella=None):
+    """Guarda el índice FAISS junto con su manifest."""
+    os.makedirs(index_path, exist_ok=True)
+    escribir_archivos(indice, index_path)
+    return escribir_manifest({
+        "embedding_model": model_name,
+        "index_type": tipo,
+        "index_factory": descriptor,
+        "dimension": indice.index.d,
+        "count": indice.index.ntotal,
+        "version": version_indice(model_name, hashes),
+        "hashes": hashes,
+        # Orden de las posiciones de FAISS: permite cargar sin index.pkl
+        "ids": [indice.index_to_docstore_id[i] for i in range(indice.index.ntotal)],
+        # Huella de 'cv' con la que se sincronizó (ver huella_cv)
+        "huella_cv": huella
+    }, index_path)
+
+def escribir_manifest(manifest, index_path=FAISS_INDEX_PATH):
+    # Escritura atómica para no dejar un manifest a medias si el proceso muere
+    ruta = ruta_manifest(index_path)
+    tmp = ruta + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(tmp, ruta)
+    stat = os.stat(ruta)
+    _MANIFEST_CACHE[ruta] = ((stat.st_mtime_ns, stat.st_size), manifest)
+    return manifest
+
+# =============================================================================
+# Construcción completa y sincronización incremental.
+# =============================================================================
+def embeber_textos(embeddings, textos):
+    """Embebe todos los textos en una sola pasada y devuelve una matriz float32 contigua."""
+    if hasattr(embeddings, "embed_documents_array"):
+        return embeddings.embed_documents_array(textos)
+    return np.ascontiguousarray(np.asarray(embeddings.embed_documents(textos), dtype=np.float32))
+
+# =============================================================================
+# Tipos de índice: Flat (exacto, coste lineal), HNSW (grafo), IVFFlat e IVFPQ
+# (particiones con vectores completos o comprimidos). Los IVF se entrenan con
+# una muestra de INDEX_TRAIN_SAMPLE vectores. nprobe/efSearch se aplican al
+# crear y al cargar el índice, así se pueden ajustar sin reconstruirlo.
+# =============================================================================
+TIPOS_INDICE = ("Flat", "HNSW", "IVFFlat", "IVFPQ")
+# Por debajo de este tamaño un IVF no se entrena bien y Flat es igual de rápido
+MIN_VECTORES_IVF = 1000
+
+def descriptor_indice(tipo, dim, n, hnsw_m=HNSW_M, nlist=IVF_NLIST, pq_m=PQ_M, pq_nbits=PQ_NBITS):
+    """Cadena de faiss.index_factory para el tipo de índice y el tamaño del corpus."""
+    if tipo not in TIPOS_INDICE:
+        raise ValueError(f"Tipo de índice desconocido: {tipo!r} (opciones: {', '.join(TIPOS_INDICE)})")
+    if tipo == "Flat":
+        return "Flat"
+    if tipo == "HNSW":
+        return f"HNSW{hnsw_m}"
+    if n < MIN_VECTORES_IVF:
+        print(f"ℹ️ Solo {n} vectores: se usa un índice Flat en lugar de {tipo}.")
+        return "Flat"
+    # faiss recomienda al menos ~39 vectores de entrenamiento por partición
+    nlist = nlist or int(4 * math.sqrt(n))
+    nlist = max(1, min(nlist, n // 39))
+    if tipo == "IVFFlat":
+        return f"IVF{nlist},Flat"
+    while dim % pq_m:
+        pq_m -= 1
+    return f"IVF{nlist},PQ{pq_m}x{pq_nbits}"
+
+def extraer_ivf(index):
+    try:
+        return faiss.extract_index_ivf(index)
+    except RuntimeError:
+        return None
+
+def extraer_hnsw(index):
+    return getattr(faiss.downcast_index(index), "hnsw", None)
+
+def ajustar_busqueda(index, nprobe=IVF_NPROBE, ef_search=HNSW_EF_SEARCH):
+    """Aplica los parámetros de búsqueda (nprobe de IVF, efSearch de HNSW)."""
+    ivf = extraer_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = min(nprobe, ivf.nlist)
+    hnsw = extraer_hnsw(index)
+    if hnsw is not None:
+        hnsw.efSearch = ef_search
+
+def parametros_busqueda(index, selector):
+    """SearchParameters con el selector de ids y los parámetros actuales del índice."""
+    ivf = extraer_ivf(index)
+    if ivf is not None:
+        return faiss.SearchParametersIVF(sel=selector, nprobe=ivf.nprobe)
+    hnsw = extraer_hnsw(index)
+    if hnsw is not None:
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=hnsw.efSearch)
+    return faiss.SearchParameters(sel=selector)
+
+def soporta_borrado(index):
+    """
+    Solo el índice Flat compacta sus posiciones al borrar como espera LangChain;
+    HNSW no admite remove_ids y en IVF los ids no se renumeran.
+    """
+    return isinstance(faiss.downcast_index(index), faiss.IndexFlat)
+
+def entrenar_indice(index, matriz, muestra=INDEX_TRAIN_SAMPLE):
+    if index.is_trained:
+        return
+    n = matriz.shape[0]
+    if n > muestra:
+        seleccion = np.random.default_rng(0).choice(n, muestra, replace=False)
+        matriz = matriz[np.sort(seleccion)]
+    inicio = time.perf_counter()
+    index.train(matriz)
+    print(f"🎓 Índice entrenado con {matriz.shape[0]} vectores en {time.perf_counter() - inicio:.1f}s")
+
+def crear_index_faiss(matriz, tipo=FAISS_INDEX_TYPE, muestra=INDEX_TRAIN_SAMPLE, **kwargs):
+    """Crea, entrena y llena un índice FAISS del tipo indicado. Devuelve (index, descriptor)."""
+    n, dim = matriz.shape
+    descriptor = descriptor_indice(tipo, dim, n, **kwargs)
+    index = faiss.index_factory(dim, descriptor, faiss.METRIC_L2)
+    hnsw = extraer_hnsw(index)
+    if hnsw is not None:
+        hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+    entrenar_indice(index, matriz, muestra)
+    ajustar_busqueda(index)
+    index.add(matriz)
+    return index, descriptor
+
+def flags_mmap():
+    """
+    IO_FLAG_MMAP mapea las listas invertidas de los IVF; IO_FLAG_MMAP_IFC
+    (faiss >= 1.10) también los vectores de Flat y HNSW. Con versiones
+    anteriores esos dos tipos se leen a memoria, pero sin pasar por index.pkl.
+    """
+    return faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY | getattr(faiss, "IO_FLAG_MMAP_IFC", 0)
+
+def abrir_indice_mmap(index_path, embeddings, manifest, db_name="cv_database.db"):
+    """Abre index.faiss mapeado en memoria con el docstore perezoso sobre 'cv'."""
+    index = faiss.read_index(os.path.join(index_path, "index.faiss"), flags_mmap())
+    ajustar_busqueda(index)
+    return FAISS(embeddings, index, SQLiteDocstore(db_name), dict(enumerate(manifest["ids"])))
+
+def copiar_store(indice, index_file=None):
+    """
+    Copia editable del vector store. sincronizar_indice edita la copia y el
+    gestor la sustituye al terminar: las búsquedas en curso en otros hilos
+    siguen con el índice anterior, que nadie modifica. Con 'index_file' (modo
+    FAISS_MMAP) el índice se lee del archivo en lugar de clonar el mapeado.
+    """
+    index = faiss.read_index(index_file) if index_file else faiss.clone_index(indice.index)
+    ajustar_busqueda(index)
+    docstore = indice.docstore
+    if isinstance(docstore, InMemoryDocstore):
+        docstore = InMemoryDocstore(dict(docstore._dict))
+    return FAISS(indice.embedding_function, index, docstore, dict(indice.index_to_docstore_id))
+
+def crear_store(embeddings, matriz, documentos, ids, tipo=FAISS_INDEX_TYPE):
+    """Crea el vector store de LangChain con un único index.add de la matriz completa."""
+    index, descriptor = crear_index_faiss(matriz, tipo)
+    docstore = InMemoryDocstore(dict(zip(ids, documentos)))
+    store = FAISS(embeddings, index, docstore, dict(enumerate(ids)))
+    store.descriptor = descriptor
+    return store
+
+def construir_indice(documentos, embeddings, index_path=FAISS_INDEX_PATH, model_name=EMBEDDING_MODEL,
+                     tipo=FAISS_INDEX_TYPE, mmap=FAISS_MMAP, db_name="cv_database.db", huella=None):
+    """
+    Construye el índice desde cero: una pasada de embeddings por lotes grandes
+    (EMBEDDING_BATCH_SIZE) y una sola inserción en FAISS.
+    Los IDs del docstore son los IDs de la tabla 'cv'.
+    """
+    print(f"🔨 Creando nuevo índice FAISS ({tipo})...")
+    print(f"Cantidad de documentos procesados: {len(documentos)}")
+    if not documentos:
+        print("⚠️ No hay documentos válidos para crear el índice.")
+        return None
+
+    ids = list(documentos.keys())
+    docs = [documentos[doc_id] for doc_id in ids]
+    inicio = time.perf_counter()
+    matriz = embeber_textos(embeddings, [doc.page_content for doc in docs])
+    print(f"🧮 {len(ids)} embeddings calculados en {time.perf_counter() - inicio:.1f}s")
+    indice = crear_store(embeddings, matriz, docs, ids, tipo)
+
+    hashes = {doc_id: hash_documento(doc) for doc_id, doc in documentos.items()}
+    if mmap:
+        indice.docstore = SQLiteDocstore(db_name)
+    manifest = guardar_indice(indice, hashes, index_path, model_name, tipo, indice.descriptor, huella)
+    print(f"Total documentos en el índice: {indice.index.ntotal}")
+    if mmap:
+        # Se libera la copia en memoria y se sirve desde el archivo mapeado
+        return abrir_indice_mmap(index_path, embeddings, manifest, db_name)
+    return indice
+
+def sincronizar_indice(documentos, embeddings, index_path=FAISS_INDEX_PATH,
+                       model_name=EMBEDDING_MODEL, indice=None, tipo=FAISS_INDEX_TYPE,
+                       mmap=FAISS_MMAP, db_name="cv_database.db", huella=None):
+    """
+    Carga el índice persistido (o reutiliza 'indice' si ya está en memoria) y lo pone
+    al día comparando los hashes del manifest con el contenido actual de la tabla 'cv':
+    solo se re-embeben las filas nuevas o modificadas y se eliminan las borradas.
+    Si el manifest falta o no es compatible, se reconstruye el índice completo.
+    Con mmap=True el índice se mapea en memoria y los documentos se leen de 'cv'.
+    Un 'indice' recibido no se modifica: los cambios se aplican a una copia.
+    'huella' (ver huella_cv) se guarda en el manifest para la próxima comprobación.
+    """
+    def reconstruir():
+        return construir_indice(documentos, embeddings, index_path, model_name, tipo, mmap, db_name, huella)
+
+    manifest = cargar_manifest(index_path)
+    index_file = os.path.join(index_path, "index.faiss")
+    if manifest is None or not os.path.exists(index_file):
+        print("ℹ️ No hay manifest del índice; se reconstruye completo.")
+        return reconstruir()
+    if manifest.get("embedding_model") != model_name:
+        print(f"ℹ️ El índice se creó con '{manifest.get('embedding_model')}'; se reconstruye con '{model_name}'.")
+        return reconstruir()
+    if manifest.get("index_type", "Flat") != tipo:
+        print(f"ℹ️ El índice es de tipo '{manifest.get('index_type', 'Flat')}'; se reconstruye como '{tipo}'.")
+        return reconstruir()
+
+    # Un índice ya cargado puede estar sirviendo búsquedas en otros hilos
+    compartido = indice is not None
+    if indice is None:
+        print("♻️ Cargando índice existente...")
+        if mmap:
+            if len(manifest.get("ids", [])) != manifest.get("count"):
+                print("ℹ️ El manifest no tiene el orden de los ids; se reconstruye completo.")
+                return reconstruir()
+            indice = abrir_indice_mmap(index_path, embeddings, manifest, db_name)
+        elif not os.path.exists(os.path.join(index_path, "index.pkl")):
+            print("ℹ️ El índice se guardó sin index.pkl (modo FAISS_MMAP); se reconstruye completo.")
+            return reconstruir()
+        else:
+            indice = FAISS.load_local(index_path, embeddings, allow_dangerous_deserialization=True)
+            ajustar_busqueda(indice.index)
+    descriptor = manifest.get("index_factory", "Flat")
+
+    hashes_previos = manifest.get("hashes", {})
+    if indice.index.ntotal != len(hashes_previos) or indice.index.d != manifest.get("dimension"):
+        print("⚠️ El índice no coincide con su manifest; se reconstruye completo.")
+        return reconstruir()
+
+    if not documentos:
+        print("⚠️ No hay documentos válidos para crear el índice.")
+        return None
+
+    hashes_actuales = {doc_id: hash_documento(doc) for doc_id, doc in documentos.items()}
+    nuevos = [doc_id for doc_id in hashes_actuales if doc_id not in hashes_previos]
+    modificados = [
+        doc_id for doc_id, h in hashes_actuales.items()
+        if doc_id in hashes_previos and hashes_previos[doc_id] != h
+    ]
+    eliminados = [doc_id for doc_id in hashes_previos if doc_id not in hashes_actuales]
+
+    if not (nuevos or modificados or eliminados):
+        print(f"✅ Índice al día ({indice.index.ntotal} documentos).")
+        if huella is not None and manifest.get("huella_cv") != huella:
+            # Cambios en 'cv' que no afectan al índice: basta con anotar la huella nueva
+            escribir_manifest({**manifest, "huella_cv": huella}, index_path)
+        return indice
+
+    print(f"🔄 Actualizando índice: {len(nuevos)} nuevos, {len(modificados)} modificados, {len(eliminados)} eliminados.")
+    if (modificados or eliminados) and not soporta_borrado(indice.index):
+        # Los vectores sin cambios salen del caché de embeddings: reconstruir solo re-embebe lo nuevo
+        print(f"ℹ️ El índice {descriptor} no admite borrados; se reconstruye desde el caché de embeddings.")
+        return reconstruir()
+    if mmap:
+        # El archivo mapeado es de solo lectura: se edita una copia en memoria y se vuelve a mapear al guardar
+        indice = copiar_store(indice, index_file)
+    elif compartido:
+        indice = copiar_store(indice)
+    if modificados or eliminados:
+        indice.delete(modificados + eliminados)
+    pendientes = nuevos + modificados
+    if pendientes:
+        indice.add_documents([documentos[doc_id] for doc_id in pendientes], ids=pendientes)
+
+    manifest = guardar_indice(indice, hashes_actuales, index_path, model_name, tipo, descriptor, huella)
+    print(f"Total documentos en el índice: {indice.index.ntotal}")
+    if mmap:
+        return abrir_indice_mmap(index_path, embeddings, manifest, db_name)
+    return indice
+
+def crear_embeddings(model_name=EMBEDDING_MODEL, batch_size=EMBEDDING_BATCH_SIZE,
+                     multi_process=EMBEDDING_MULTI_PROCESS):
+    return HuggingFaceEmbeddings(
+        model_name=model_name,
+        encode_kwargs={"batch_size": batch_size},
+        multi_process=multi_process
+    )
+
+# =============================================================================
+# Búsqueda de varias consultas en una sola llamada a FAISS. Con 'posiciones'
+# solo se evalúan esas posiciones (IDSelectorBatch), así devuelve k resultados
+# elegibles en una sola pasada en lugar de sobrebuscar y filtrar después.
+# =============================================================================
+def buscar_lote(indice, matriz, k, posiciones=None):
+    """Devuelve una lista [(Document, distancia)] por fila de 'matriz'."""
+    consultas = np.ascontiguousarray(np.asarray(matriz, dtype="float32"))
+    if posiciones is None:
+        distancias, encontradas = indice.index.search(consultas, min(k, indice.index.ntotal))
+    elif not posiciones:
+        return [[] for _ in range(len(consultas))]
+    else:
+        seleccion = np.asarray(sorted(posiciones), dtype="int64")
+        selector = faiss.IDSelectorBatch(len(seleccion), faiss.swig_ptr(seleccion))
+        distancias, encontradas = indice.index.search(
+            consultas, min(k, len(seleccion)), params=parametros_busqueda(indice.index, selector)
+        )
+
+    # Los documentos de todas las consultas se leen de una vez
+    ids = {indice.index_to_docstore_id[int(p)] for fila in encontradas for p in fila if p >= 0}
+    documentos = documentos_por_id(indice.docstore, ids)
+
+    resultados = []
+    for fila_distancias, fila_posiciones in zip(distancias, encontradas):
+        fila = []
+        for distancia, posicion in zip(fila_distancias, fila_posiciones):
+            if posicion < 0:
+                continue
+            doc = documentos.get(indice.index_to_docstore_id[int(posicion)])
+            if isinstance(doc, Document):
+                fila.append((doc, float(distancia)))
+        resultados.append(fila)
+    return resultados
+
+def buscar_filtrado(indice, vector, k, posiciones):
+    if not posiciones:
+        return []
+    return buscar_lote(indice, [vector], k, posiciones)[0]
+
+# =============================================================================
+# Gestor único por proceso del modelo de embeddings y del índice FAISS.
+# Todas las apps (main.py, search_ui.py, interface.py) lo comparten a través
+# de utils.build_or_load_vector_index.
+# =============================================================================
+class VectorIndexManager:
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = VectorIndexManager()
+        return cls._instance
+
+    def __init__(self, index_path=FAISS_INDEX_PATH, model_name=EMBEDDING_MODEL, db_name="cv_database.db"):
+        self.index_path = index_path
+        self.model_name = model_name
+        self.db_name = db_name
+        self._embeddings = None
+        self._indice = None
+        self._lock = threading.RLock()
+        self._listo = threading.Event()
+        self._warmup_thread = None
+        self.error = None
+        self.version = None
+        self._posiciones = (None, {})
+        self._posiciones_lock = threading.Lock()
+
+    @property
+    def listo(self):
+        """True cuando el modelo y el índice están cargados en memoria."""
+        return self._listo.is_set()
+
+    def esperar(self, timeout=None):
+        """Bloquea hasta que el calentamiento termine (o venza el timeout)."""
+        return self._listo.wait(timeout)
+
+    def get_embeddings(self):
+        """
+        Carga el modelo de embeddings una sola vez por proceso, envuelto en el
+        caché persistente de vectores (tabla embedding_cache).
+        """
+        with self._lock:
+            if self._embeddings is None:
+                print(f"🧠 Cargando modelo de embeddings '{self.model_name}'...")
+                cache = EmbeddingCache(self.db_name)
+                borrados = cache.evict_other_models([self.model_name])
+                if borrados:
+                    print(f"🧹 Eliminados {borrados} embeddings en caché de modelos no configurados.")
+                self._embeddings = CachedEmbeddings(crear_embeddings(self.model_name), cache, self.model_name)
+            return self._embeddings
+
+    def get_index(self, cursor, rebuild=False):
+        """
+        Devuelve el índice compartido, sincronizado con el contenido actual de 'cv'.
+        La primera llamada lo carga de disco. Las siguientes comparan la huella de
+        'cv' con la del manifest y solo si difiere leen los CVs y comprueban hashes.
+        """
+        with self._lock:
+            asegurar_contador_cambios(cursor.connection)
+            # La huella se lee antes que los CVs: un cambio entre ambas lecturas fuerza otra sincronización
+            huella = huella_cv(cursor)
+            index_file = os.path.join(self.index_path, "index.faiss")
+            if not rebuild and os.path.exists(index_file):
+                indice = self._indice_sin_cambios(huella)
+                if indice is not None:
+                    indice.version = self.version
+                    self._indice = indice
+                    self._listo.set()
+                    return indice
+
+            documentos = cargar_documentos(cursor)
+            embeddings = self.get_embeddings()
+            if rebuild or not os.path.exists(index_file):
+                indice = construir_indice(documentos, embeddings, self.index_path, self.model_name,
+                                          db_name=self.db_name, huella=huella)
+            else:
+                indice = sincronizar_indice(documentos, embeddings, self.index_path, self.model_name,
+                                            indice=self._indice, db_name=self.db_name, huella=huella)
+            self._indice = indice
+            if indice is not None:
+                manifest = cargar_manifest(self.index_path)
+                version = manifest.get("version") if manifest else None
+                if version != self.version:
+                    # Los resultados cacheados de la versión anterior ya no sirven
+                    SEARCH_RESULTS_CACHE.clear()
+                    self.version = version
+                # Versión del contenido de este store: la búsqueda la usa como clave de caché
+                indice.version = version
+                self._listo.set()
+            return indice
+
+    def _indice_sin_cambios(self, huella):
+        """
+        El índice actual si 'cv' no ha cambiado desde la última sincronización
+        (misma huella que el manifest), sin leer la tabla. En modo FAISS_MMAP la
+        primera carga también se resuelve así: basta con mapear index.faiss.
+        """
+        manifest = cargar_manifest(self.index_path)
+        if huella is None or manifest is None or manifest.get("huella_cv") != huella:
+            return None
+        if manifest.get("version") != self.version and self._indice is not None:
+            # Otro proceso reescribió el índice: hay que volver a cargarlo
+            return None
+        if self._indice is not None:
+            return self._indice
+        compatible = (manifest.get("embedding_model") == self.model_name
+                      and manifest.get("index_type", "Flat") == FAISS_INDEX_TYPE
+                      and len(manifest.get("ids", [])) == manifest.get("count"))
+        if not (FAISS_MMAP and compatible):
+            return None
+        print("♻️ Mapeando índice existente (sin cambios en 'cv')...")
+        indice = abrir_indice_mmap(self.index_path, self.get_embeddings(), manifest, self.db_name)
+        if manifest.get("version") != self.version:
+            SEARCH_RESULTS_CACHE.clear()
+            self.version = manifest.get("version")
+        return indice
+
+    def posiciones(self, ids, indice=None):
+        """
+        Posiciones internas de FAISS de los ids de 'cv' indicados (los que no
+        estén se ignoran) en 'indice', por defecto el actual. Una sincronización
+        crea otro store, así que el mapa se cachea por store y no toma _lock.
+        """
+        indice = indice if indice is not None else self._indice
+        with self._posiciones_lock:
+            if self._posiciones[0] is not indice:
+                mapa = indice.index_to_docstore_id if indice is not None else {}
+                self._posiciones = (indice, {doc_id: pos for pos, doc_id in mapa.items()})
+            por_id = self._posiciones[1]
+        return [por_id[i] for i in ids if i in por_id]
+
+    def warm_up(self):
+        """Carga modelo e índice en un hilo en segundo plano (idempotente)."""
+        with self._lock:
+            if self._warmup_thread is not None:
+                return self._warmup_thread
+            self._warmup_thread = threading.Thread(
+                target=self._warm_up, name="faiss-warmup", daemon=True
+            )
+            self._warmup_thread.start()
+            return self._warmup_thread
+
+    def _warm_up(self):
+        conn = None
+        try:
+            embeddings = self.get_embeddings()
+            # Una consulta de prueba inicializa los pesos y el runtime de torch
+            embeddings.embed_query("calentamiento")
+            conn, cursor = connect_db(db_name=self.db_name)
+            if self.get_index(cursor) is None:
+                self.error = "no hay CVs en la base de datos"
+                return
+            print("✅ Modelo de embeddings e índice FAISS listos.")
+        except Exception as e:
+            self.error = e
+            print(f"❌ Error al precargar el índice FAISS: {e}")
+        finally:
+            if conn:
+                close_db(conn)
+
+    def estado(self):
+        """Texto breve con el estado de carga, para mostrar en la interfaz."""
+        if self.listo:
+            return f"✅ Índice listo ({self._indice.index.ntotal} CVs)."
+        if self.error is not None:
+            return f"❌ Error al cargar el índice: {self.error}"
+        return "⏳ Cargando modelo e índice..."